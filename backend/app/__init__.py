@@ -3,10 +3,21 @@ from flask_cors import CORS
 from .config import Config
 from .routes import register_blueprints
 from .models import db
+from .utils.compression import init_compression
+from .utils.json_provider import init_json_provider
 import os
 
 
-def create_app():
+def create_app(preload_models=None, warmup=None):
+    """
+    Create the Flask application.
+
+    Args:
+        preload_models: Load every phase's models before returning (for
+            forking servers, see wsgi.py). Defaults to Config.MODELS_PRELOAD.
+        warmup: Warm up every phase's prediction path at startup (see
+            services/model_warmup.py). Defaults to Config.MODELS_WARMUP.
+    """
     app = Flask(
         __name__,
         instance_relative_config=True,
@@ -25,6 +36,10 @@ def create_app():
 
     app.config.from_object(Config)
 
+    # NumPy-aware JSON (orjson when installed) and opt-in response compression
+    init_json_provider(app)
+    init_compression(app)
+
     # Ensure instance folder exists
     os.makedirs(app.config['INSTANCE_DIR'], exist_ok=True)
 
@@ -37,4 +52,15 @@ def create_app():
 
     register_blueprints(app)
 
+    if preload_models is None:
+        preload_models = Config.MODELS_PRELOAD
+    if warmup is None:
+        warmup = Config.MODELS_WARMUP
+    if preload_models:
+        from .services.model_preload import preload_models as preload
+        preload(app, warmup=warmup)
+    elif warmup:
+        from .services.model_warmup import start_warmup
+        start_warmup(app)
+
     return app
@@ -11,14 +11,39 @@ Future improvements:
 - Implement model versioning and A/B testing
 """
 
+import hashlib
+import os
 import pickle
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from abc import ABC, abstractmethod
 import pandas as pd
 
+from app.config import Config
 from app.services import ModelsManagement
-from app.models import Fase
+from app.services.models_management import (
+    FASE_I_TARGETS,
+    FASE_II_TARGETS,
+    FASE_III_BASIC_TARGETS,
+    FASE_III_CHAINED_TARGETS
+)
+from app.services.uf_schema import UFBatch
+from app.models import db, Fase
+from app.adapters.model_registry import model_registry
+from app.adapters.serving_artifact import (
+    ServingArtifactError,
+    file_digest,
+    read_serving_artifact,
+    remove_serving_artifact,
+    serving_manifest_path,
+    write_serving_artifact
+)
+from app.utils.compiled_models import compile_models
+from app.utils import ml_utils
 
 
 class ModelAdapterInterface(ABC):
@@ -29,12 +54,13 @@ class ModelAdapterInterface(ABC):
     """
     
     @abstractmethod
-    def train_models(self, fase_id: int) -> Dict[str, Any]:
+    def train_models(self, fase_id: int, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
         """
         Train models for a specific phase.
         
         Args:
             fase_id: Phase ID from database
+            progress_callback: Optional function(completed, total, target) called after each target
             
         Returns:
             Dictionary containing trained models and metadata
@@ -56,6 +82,34 @@ class ModelAdapterInterface(ABC):
         """
         pass
     
+    def predict_batch(self, fase_id: int, models: Dict[str, Any], batch: UFBatch) -> List[Dict[str, float]]:
+        """
+        Make predictions for many functional units at once.
+        Adapters without a vectorized path fall back to one predict() call per row.
+        
+        Args:
+            fase_id: Phase ID from database
+            models: Trained models dictionary
+            batch: Functional units as feature columns
+            
+        Returns:
+            List with one predictions dict per UF, in the same order
+        """
+        return [self.predict(fase_id, models, **row) for row in batch.to_params()]
+    
+    def get_model_version(self, fase_id: int) -> Optional[str]:
+        """
+        Get an identifier of the currently stored models for a phase.
+        Adapters without versioning return None.
+        
+        Args:
+            fase_id: Phase ID from database
+            
+        Returns:
+            Version string or None
+        """
+        return None
+    
     @abstractmethod
     def save_models(self, fase_id: int, models: Dict[str, Any], metadata: Optional[Dict] = None, summary_df=None) -> str:
         """
@@ -127,6 +181,40 @@ class ModelAdapterInterface(ABC):
         pass
 
 
+@dataclass(frozen=True)
+class PhaseDescriptor:
+    """Resolved legacy configuration of a phase, shared by every request."""
+    fase_id: int
+    nombre: str
+    code: str
+
+
+# Seconds a cached descriptor is trusted before the fase name is checked again
+# (renames made by other workers or outside the API)
+PHASE_DESCRIPTOR_CHECK_SECONDS = 2.0
+
+# fase_id -> (PhaseDescriptor, monotonic time of the last check), shared by
+# every adapter instance in the process
+_phase_descriptors: Dict[int, Tuple[PhaseDescriptor, float]] = {}
+_phase_descriptors_lock = threading.Lock()
+
+
+def invalidate_phase_descriptors(fase_id: Optional[int] = None) -> None:
+    """
+    Drop cached phase descriptors of this process (call after creating,
+    renaming or deleting a fase; other processes notice within
+    PHASE_DESCRIPTOR_CHECK_SECONDS).
+    
+    Args:
+        fase_id: Phase to drop; drops everything if None
+    """
+    with _phase_descriptors_lock:
+        if fase_id is None:
+            _phase_descriptors.clear()
+        else:
+            _phase_descriptors.pop(fase_id, None)
+
+
 class LegacyModelAdapter(ModelAdapterInterface):
     """
     Adapter for legacy ModelsManagement service.
@@ -141,6 +229,16 @@ class LegacyModelAdapter(ModelAdapterInterface):
         'Diseño Detallado': 'III'
     }
     
+    # Targets each legacy phase is expected to predict
+    PHASE_REQUIRED_TARGETS = {
+        'I': tuple(FASE_I_TARGETS),
+        'II': tuple(FASE_II_TARGETS),
+        'III': tuple(FASE_III_BASIC_TARGETS + FASE_III_CHAINED_TARGETS)
+    }
+    
+    # Legacy code -> batch predictor, created once per process
+    _predictors: Dict[str, Callable] = {}
+    
     def __init__(self, models_dir: str = "data/models"):
         """
         Initialize the legacy model adapter.
@@ -164,31 +262,72 @@ class LegacyModelAdapter(ModelAdapterInterface):
         Raises:
             ValueError: If fase not found or not supported
         """
+        return self.get_phase_descriptor(fase_id).code
+    
+    def get_phase_descriptor(self, fase_id: int) -> PhaseDescriptor:
+        """
+        Get the resolved phase descriptor. The database is queried on the first
+        call, and then at most every PHASE_DESCRIPTOR_CHECK_SECONDS to check
+        that the fase still has the same name.
+        
+        Args:
+            fase_id: Phase ID from database
+            
+        Returns:
+            PhaseDescriptor with the fase name and legacy code
+            
+        Raises:
+            ValueError: If fase not found or not supported (not cached)
+        """
+        now = time.monotonic()
+        cached = _phase_descriptors.get(fase_id)
+        if cached is not None:
+            descriptor, checked_at = cached
+            if now - checked_at < PHASE_DESCRIPTOR_CHECK_SECONDS:
+                return descriptor
+            nombre = db.session.query(Fase.nombre).filter_by(id=fase_id).scalar()
+            if nombre is not None and nombre == descriptor.nombre:
+                with _phase_descriptors_lock:
+                    _phase_descriptors[fase_id] = (descriptor, now)
+                return descriptor
+        
+        descriptor = self._resolve_phase(fase_id)
+        with _phase_descriptors_lock:
+            _phase_descriptors[fase_id] = (descriptor, now)
+        return descriptor
+    
+    def _resolve_phase(self, fase_id: int) -> PhaseDescriptor:
+        """Look up the fase in the database and map its name to a legacy code."""
         fase = Fase.query.get(fase_id)
         if not fase:
+            with _phase_descriptors_lock:
+                _phase_descriptors.pop(fase_id, None)
             raise ValueError(f"Fase con ID '{fase_id}' no encontrada.")
         
         # Try to map fase name to code
         for name_key, code in self.PHASE_NAME_TO_CODE.items():
             if name_key.lower() in fase.nombre.lower():
-                return code
+                return PhaseDescriptor(fase_id=fase_id, nombre=fase.nombre, code=code)
         
+        with _phase_descriptors_lock:
+            _phase_descriptors.pop(fase_id, None)
         raise ValueError(f"Fase '{fase.nombre}' no está soportada para predicciones.")
     
     # Implementation of ModelAdapterInterface
-    def train_models(self, fase_id: int) -> Dict[str, Any]:
+    def train_models(self, fase_id: int, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
         """
         Train models using fase_id from database.
         Implements ModelAdapterInterface.
         
         Args:
             fase_id: Phase ID from database
+            progress_callback: Optional function(completed, total, target) called after each target
             
         Returns:
             Dictionary with 'models', 'summary_df', and 'metadata'
         """
         fase_code = self._map_fase_id_to_code(fase_id)
-        return self._train_models_legacy(fase_code)
+        return self._train_models_legacy(fase_code, progress_callback=progress_callback)
     
     def load_models(self, fase_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -220,6 +359,41 @@ class LegacyModelAdapter(ModelAdapterInterface):
         fase_code = self._map_fase_id_to_code(fase_id)
         return self._predict_legacy(fase_code, models, **kwargs)
     
+    def predict_batch(self, fase_id: int, models: Dict[str, Any], batch: UFBatch) -> List[Dict[str, float]]:
+        """
+        Make vectorized predictions for many functional units using fase_id.
+        Overrides the per-row fallback of ModelAdapterInterface.
+        
+        Args:
+            fase_id: Phase ID from database
+            models: Trained models dictionary
+            batch: Functional units as feature columns
+            
+        Returns:
+            List with one predictions dict per UF
+        """
+        fase_code = self._map_fase_id_to_code(fase_id)
+        return self._predict_legacy_batch(fase_code, models, batch)
+    
+    def get_model_version(self, fase_id: int) -> Optional[str]:
+        """
+        Get the on-disk version (mtime + size) of the phase models artifact.
+        
+        Args:
+            fase_id: Phase ID from database
+            
+        Returns:
+            Version string or None if the artifact does not exist
+        """
+        fase_code = self._map_fase_id_to_code(fase_id)
+        # Predictions are served from the serving artifact when it matches the pickle
+        if self._load_serving_artifact(fase_code) is not None:
+            filepath = serving_manifest_path(self.models_dir, fase_code)
+        else:
+            filepath = self.models_dir / f"fase_{fase_code}_models.pkl"
+        version = model_registry.get_version(str(filepath))
+        return str(version) if version is not None else None
+    
     def save_models(self, fase_id: int, models: Dict[str, Any], metadata: Optional[Dict] = None, summary_df=None) -> str:
         """
         Save trained models to disk using fase_id.
@@ -237,6 +411,24 @@ class LegacyModelAdapter(ModelAdapterInterface):
         fase_code = self._map_fase_id_to_code(fase_id)
         return self._save_models_legacy(fase_code, models, metadata, summary_df)
     
+    def load_diagnostics(self, fase_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Load the full training output (fitted estimators, X / y / y_predicted per
+        target) from the diagnostics artifact. Read from disk on every call;
+        predictions use load_models instead.
+        
+        Args:
+            fase_id: Phase ID from database
+            
+        Returns:
+            Dictionary with 'models', 'metadata' and 'summary' or None if not found
+        """
+        fase_code = self._map_fase_id_to_code(fase_id)
+        filepath = self.models_dir / f"fase_{fase_code}_models.pkl"
+        if not filepath.exists():
+            return None
+        return self._read_pickle(str(filepath))
+    
     def get_historical_data(self, fase_id: int) -> pd.DataFrame:
         """
         Get historical project data with standardized column names.
@@ -316,12 +508,15 @@ class LegacyModelAdapter(ModelAdapterInterface):
         }
     
     # Legacy implementation methods (private)
-    def _train_models_legacy(self, fase: str) -> Dict[str, Any]:
+    def _train_models_legacy(self, fase: str, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
         """
         Train models using legacy ModelsManagement service.
+        With TRAINING_INCREMENTAL, targets and alcances whose training data did
+        not change since the saved training are reused instead of retrained.
         
         Args:
-            fase: Phase identifier ('II' or 'III')
+            fase: Phase identifier ('I', 'II' or 'III')
+            progress_callback: Optional function(completed, total, target) called after each target
             
         Returns:
             Dictionary with 'models', 'summary_df', and 'metadata'
@@ -329,20 +524,33 @@ class LegacyModelAdapter(ModelAdapterInterface):
         mm = ModelsManagement(fase)
         df_vp = mm.prepare_data()
         
-        if fase == 'III':
-            results, summary_df = mm.train_models()
-        elif fase == 'II' or fase == 'I':
-            raise NotImplementedError(f"Fase '{fase}' training not yet implemented")
-        else:
+        if fase not in self.PHASE_REQUIRED_TARGETS:
             raise ValueError(f"Fase '{fase}' no soportada")
         
+        previous = None
+        if Config.TRAINING_INCREMENTAL:
+            filepath = self.models_dir / f"fase_{fase}_models.pkl"
+            if filepath.exists():
+                data = self._read_pickle(str(filepath))
+                if isinstance(data, dict) and isinstance(data.get('models'), dict):
+                    previous = data['models']
+        
+        results, summary_df = mm.train_models(progress_callback=progress_callback, previous=previous)
+        compile_models(results)
+        
+        report = mm.reuse_report
+        print(f"Entrenamiento incremental: {len(report['reused'])} reutilizados, {len(report['retrained'])} reentrenados")
+        
         return {
             'models': results,
             'summary_df': summary_df,
             'metadata': {
                 'fase': fase,
                 'n_samples': len(df_vp),
-                'training_date': pd.Timestamp.now().isoformat()
+                'training_date': pd.Timestamp.now().isoformat(),
+                'incremental': report,
+                'selection': dict(zip(('mode', 'time_budget'), ml_utils.get_selection_mode())),
+                'outliers': {'mode': ml_utils.get_outlier_mode(), 'slices': mm.outlier_report}
             }
         }
     
@@ -367,33 +575,50 @@ class LegacyModelAdapter(ModelAdapterInterface):
         Returns:
             Dictionary with item predictions
         """
-        mm = ModelsManagement(fase)
+        return self._predict_legacy_batch(fase, models, UFBatch.from_params([kwargs]))[0]
+    
+    def _predict_legacy_batch(self, fase: str, models: Dict[str, Any], batch: UFBatch) -> List[Dict[str, float]]:
+        """
+        Make predictions for many functional units with a single feature matrix.
         
-        if fase == 'III':
-            predictions = mm.predict_fase_III(
-                codigo=kwargs.get('codigo', ''),
-                longitud_km=kwargs['longitud_km'],
-                puentes_vehiculares_und=kwargs['puentes_vehiculares_und'],
-                puentes_vehiculares_m2=kwargs['puentes_vehiculares_m2'],
-                puentes_peatonales_und=kwargs['puentes_peatonales_und'],
-                puentes_peatonales_m2=kwargs['puentes_peatonales_m2'],
-                tuneles_und=kwargs['tuneles_und'],
-                tuneles_km=kwargs['tuneles_km'],
-                alcance=kwargs['alcance'],
-                models=models
-            )
-            # TODO: Remove this when the models are updated
-            predictions['3.1 - GEOLOGÍA'] = predictions['3 - GEOLOGÍA']
-        elif fase == 'II':
-            raise NotImplementedError("Fase II prediction not yet implemented")
-        else:
+        Args:
+            fase: Phase identifier
+            models: Trained models dictionary
+            batch: Functional units as feature columns
+                
+        Returns:
+            List with one predictions dict per UF
+        """
+        if not len(batch):
+            return []
+        
+        predictor = self._get_predictor(fase)
+        if predictor is None:
             raise ValueError(f"Fase '{fase}' no soportada")
         
-        return predictions
+        # Items named after a different target (TARGET_ALIASES) are resolved by the item/model index
+        return predictor(batch.feature_frame(), models)
+    
+    @classmethod
+    def _get_predictor(cls, fase: str) -> Optional[Callable]:
+        """
+        Get the batch predictor for a legacy phase code.
+        
+        Returns:
+            Function (features, models) -> list of predictions dicts, or None if
+            the phase has no prediction implementation
+        """
+        if fase not in cls._predictors:
+            if fase in cls.PHASE_REQUIRED_TARGETS:
+                cls._predictors[fase] = ModelsManagement(fase).predict_batch
+            else:
+                return None
+        return cls._predictors[fase]
     
     def _save_models_legacy(self, fase: str, models: Dict[str, Any], metadata: Optional[Dict] = None, summary_df=None) -> str:
         """
-        Save trained models to disk as pickle file.
+        Save trained models to disk: the full training output as a pickle
+        (diagnostics artifact) and the compiled evaluators as a serving artifact.
         
         Args:
             fase: Phase identifier
@@ -402,7 +627,7 @@ class LegacyModelAdapter(ModelAdapterInterface):
             summary_df: Optional training summary DataFrame with metrics
             
         Returns:
-            Path to saved model file
+            Path to saved model file (diagnostics pickle)
         """
         # Create filename based on fase
         filename = f"fase_{fase}_models.pkl"
@@ -415,31 +640,102 @@ class LegacyModelAdapter(ModelAdapterInterface):
             'summary': summary_df.to_dict('records') if summary_df is not None else None
         }
         
-        # Save as pickle
-        with open(filepath, 'wb') as f:
-            pickle.dump(save_data, f)
-        
+        # Save as pickle, writing to a temp file first so readers never see a partial artifact
+        blob = pickle.dumps(save_data)
+        fd, tmp_path = tempfile.mkstemp(dir=self.models_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(blob)
+            # mkstemp creates files readable by the owner only
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        
+        model_registry.invalidate(str(filepath))
+        self._save_serving_artifact(fase, models, save_data['metadata'], save_data['summary'],
+                                    hashlib.sha256(blob).hexdigest())
         return str(filepath)
     
+    def _save_serving_artifact(self, fase: str, models: Dict[str, Any], metadata: Dict, summary,
+                               pickle_digest: str) -> None:
+        """
+        Write the serving artifact next to the pickle. If it cannot be written
+        (a model without compiled evaluator, or any other error), the previous
+        serving artifact is removed so the new pickle is served instead of
+        stale models.
+        """
+        manifest_path = serving_manifest_path(self.models_dir, fase)
+        try:
+            compile_models(models)
+            write_serving_artifact(self.models_dir, fase, models, metadata, summary, pickle_digest)
+            print(f"✓ Serving artifact saved: {manifest_path}")
+        except ServingArtifactError as e:
+            print(f"✗ Serving artifact not written ({e}); predictions will use the pickle")
+            remove_serving_artifact(self.models_dir, fase)
+        except Exception as e:
+            print(f"✗ Error writing serving artifact: {e}; predictions will use the pickle")
+            remove_serving_artifact(self.models_dir, fase)
+        model_registry.invalidate(str(manifest_path))
+    
     def _load_models_legacy(self, fase: str) -> Optional[Dict[str, Any]]:
         """
-        Load trained models from disk.
+        Load the models used for prediction through the process-wide model registry.
+        The serving artifact is preferred; the pickle is the fallback for phases
+        trained before serving artifacts existed (or with non-compilable models).
+        Artifacts are only read from disk when they changed since the last load.
         
         Args:
             fase: Phase identifier
             
         Returns:
-            Dictionary with 'models' and 'metadata' or None if not found
+            Dictionary with 'models' and 'metadata' or None if not found.
+            The dictionary is shared across requests and must not be modified.
         """
+        data = self._load_serving_artifact(fase)
+        if data is not None:
+            return data
+        
         filename = f"fase_{fase}_models.pkl"
         filepath = self.models_dir / filename
         
-        if not filepath.exists():
+        return model_registry.get(str(filepath), self._read_pickle)
+    
+    def _load_serving_artifact(self, fase: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the serving artifact through the model registry, or None if it
+        does not exist, failed to load, or was built from another pickle than
+        the one next to it (a retrain whose serving artifact was not replaced).
+        """
+        manifest_path = serving_manifest_path(self.models_dir, fase)
+        if not manifest_path.exists():
+            return None
+        data = model_registry.get(str(manifest_path), read_serving_artifact)
+        if data is None:
             return None
+        pickle_digest = file_digest(self.models_dir / f"fase_{fase}_models.pkl")
+        if pickle_digest is not None and data.get('pickle_sha256') != pickle_digest:
+            return None
+        return data
+    
+    @staticmethod
+    def _read_pickle(filepath: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a model artifact from disk.
         
+        Args:
+            filepath: Path to the pickle file
+            
+        Returns:
+            Unpickled data or None if loading failed
+        """
         try:
             with open(filepath, 'rb') as f:
                 data = pickle.load(f)
+            # Backfill closed-form evaluators for artifacts saved before they existed
+            if isinstance(data, dict) and isinstance(data.get('models'), dict):
+                compile_models(data['models'])
             return data
         except Exception as e:
             print(f"Error loading models: {e}")
@@ -0,0 +1,157 @@
+"""
+Process-wide registry of loaded model artifacts.
+
+Unpickling a phase artifact is the most expensive step of a prediction, so
+artifacts are loaded once per process and shared by every request. Each
+entry is keyed by the artifact path and its on-disk version (mtime + size),
+so a retrain that rewrites the file is picked up on the next access without
+restarting the workers.
+
+Loaded artifacts are shared between threads and must be treated as read-only.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.config import Config
+
+
+@dataclass(frozen=True)
+class ArtifactVersion:
+    """On-disk version of an artifact file."""
+    mtime_ns: int
+    size: int
+
+    def __str__(self) -> str:
+        return f"{self.mtime_ns}-{self.size}"
+
+
+class ModelRegistry:
+    """
+    Thread-safe LRU cache of loaded artifacts, revalidated by file mtime/size.
+    """
+
+    def __init__(self, max_versions: int = 4):
+        """
+        Initialize the registry.
+
+        Args:
+            max_versions: Maximum number of artifact versions kept in memory
+        """
+        self.max_versions = max(1, max_versions)
+        self._entries: "OrderedDict[Tuple[str, ArtifactVersion], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_version(path: str) -> Optional[ArtifactVersion]:
+        """
+        Get the current on-disk version of an artifact.
+
+        Returns:
+            ArtifactVersion or None if the file does not exist
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return ArtifactVersion(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+
+    def get(self, path: str, loader: Callable[[str], Optional[Any]]) -> Optional[Any]:
+        """
+        Return the artifact at path, loading it with loader on a miss.
+
+        Concurrent misses for the same path wait for a single load instead of
+        unpickling the same file several times.
+
+        Args:
+            path: Artifact file path
+            loader: Function that loads the artifact (returns None on failure)
+
+        Returns:
+            Loaded artifact or None if the file does not exist or failed to load
+        """
+        path = os.path.abspath(path)
+        version = self.get_version(path)
+        if version is None:
+            return None
+
+        key = (path, version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            load_lock = self._load_locks.setdefault(path, threading.Lock())
+
+        with load_lock:
+            # Another thread may have loaded it while we were waiting
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+
+            data = loader(path)
+            if data is None:
+                return None
+
+            # The file changed while loading: serve it but don't cache a stale version
+            if self.get_version(path) != version:
+                return data
+
+            with self._lock:
+                self.misses += 1
+                # Superseded versions of this artifact can never be requested again
+                for stale_key in [k for k in self._entries if k[0] == path]:
+                    del self._entries[stale_key]
+                self._entries[key] = data
+                while len(self._entries) > self.max_versions:
+                    self._entries.popitem(last=False)
+
+        return data
+
+    def _reset_locks(self) -> None:
+        """Recreate the locks in a forked child (a parent thread may have held them)."""
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """
+        Drop cached artifacts.
+
+        Args:
+            path: Artifact path to drop; drops everything if None
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            path = os.path.abspath(path)
+            for key in [k for k in self._entries if k[0] == path]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return registry counters and the artifacts currently in memory."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'max_versions': self.max_versions,
+                'loaded': [
+                    {'path': path, 'version': str(version)}
+                    for path, version in self._entries.keys()
+                ]
+            }
+
+
+# Shared by every adapter instance in the process
+model_registry = ModelRegistry(max_versions=Config.MODEL_REGISTRY_MAX_VERSIONS)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=model_registry._reset_locks)
@@ -0,0 +1,278 @@
+"""
+Serving artifact - lean, pickle-free model format used for predictions
+
+Training writes two artifacts per phase:
+
+- Diagnostics (fase_<code>_models.pkl): everything training produced, including
+  fitted sklearn estimators and the X / y / y_predicted arrays, for charts,
+  metrics and re-compiling. Read on demand only.
+- Serving (fase_<code>_serving.json + fase_<code>_serving-<token>.npy): only what
+  prediction needs. The JSON manifest holds the structure, metadata and training
+  summary; every evaluator array is a slice of a single float64 .npy file that
+  is memory-mapped, so workers share its pages and loading does not depend on
+  sklearn pickle compatibility.
+
+The arrays file name is unique per write and the manifest is replaced
+atomically, so readers never see a manifest pointing to missing or partial
+arrays. The manifest records the SHA-256 of the pickle it was built from;
+a manifest that does not match the pickle next to it is stale and must not
+be served (see file_digest).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.utils.compiled_models import evaluator_from_spec
+
+
+FORMAT_NAME = 'road-cost-serving'
+FORMAT_VERSION = 1
+
+
+class ServingArtifactError(Exception):
+    """The models cannot be represented in the serving format."""
+    pass
+
+
+def serving_manifest_path(models_dir: Path, fase: str) -> Path:
+    return Path(models_dir) / f"fase_{fase}_serving.json"
+
+
+# (path, mtime_ns, size) -> SHA-256, so unchanged files are hashed once
+_digests: Dict[tuple, str] = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path) -> Optional[str]:
+    """
+    SHA-256 of a file's contents, cached while its mtime and size do not change.
+
+    Returns:
+        Hex digest or None if the file does not exist
+    """
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _digests_lock:
+            for stale in [k for k in _digests if k[0] == path]:
+                del _digests[stale]
+            _digests[key] = digest
+    return digest
+
+
+class _ArrayPacker:
+    """Concatenates arrays into one float64 buffer, remembering offset and shape."""
+
+    def __init__(self):
+        self.chunks: List[np.ndarray] = []
+        self.size = 0
+
+    def add(self, array: np.ndarray) -> Dict[str, Any]:
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        ref = {'offset': self.size, 'shape': list(array.shape)}
+        self.chunks.append(array.ravel())
+        self.size += array.size
+        return ref
+
+    def buffer(self) -> np.ndarray:
+        if not self.chunks:
+            return np.zeros(0, dtype=np.float64)
+        return np.concatenate(self.chunks)
+
+
+def _pack_entry(entry: Dict[str, Any], packer: _ArrayPacker, name: str) -> Dict[str, Any]:
+    """Serialize one models entry ({'compiled', 'log_transform', ...})."""
+    compiled = entry.get('compiled')
+    if compiled is None:
+        raise ServingArtifactError(f"El modelo '{name}' no tiene evaluador compilado")
+    params, arrays = compiled.to_spec()
+    return {
+        'log_transform': entry.get('log_transform', 'none'),
+        'evaluator': {
+            'kind': compiled.kind,
+            'params': params,
+            'arrays': {array_name: packer.add(array) for array_name, array in arrays.items()}
+        }
+    }
+
+
+def _build_manifest(models: Dict[str, Any], packer: _ArrayPacker) -> Dict[str, Any]:
+    """Serialize the models dictionary (per-alcance and single-model targets)."""
+    manifest_models = {}
+    for target, result in models.items():
+        if not isinstance(result, dict):
+            continue
+        if isinstance(result.get('models'), dict):
+            manifest_models[target] = {
+                'models': {
+                    alcance: _pack_entry(entry, packer, f"{target} / {alcance}")
+                    for alcance, entry in result['models'].items()
+                    if isinstance(entry, dict)
+                }
+            }
+        elif 'model' in result or 'compiled' in result:
+            manifest_models[target] = _pack_entry(result, packer, target)
+    return manifest_models
+
+
+def write_serving_artifact(models_dir: Path, fase: str, models: Dict[str, Any],
+                           metadata: Optional[Dict] = None, summary: Optional[List] = None,
+                           pickle_digest: Optional[str] = None) -> str:
+    """
+    Write the serving artifact of a phase.
+
+    Args:
+        models_dir: Models directory
+        fase: Phase identifier
+        models: Trained models dictionary with 'compiled' evaluators (see compile_models)
+        metadata: Training metadata
+        summary: Training summary records
+        pickle_digest: SHA-256 of the diagnostics pickle holding the same models
+
+    Returns:
+        Path to the manifest
+
+    Raises:
+        ServingArtifactError: If a model has no compiled evaluator
+    """
+    models_dir = Path(models_dir)
+    packer = _ArrayPacker()
+    manifest_models = _build_manifest(models, packer)
+
+    arrays_file = f"fase_{fase}_serving-{uuid.uuid4().hex[:12]}.npy"
+    manifest = {
+        'format': FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'fase': fase,
+        'arrays_file': arrays_file,
+        'pickle_sha256': pickle_digest,
+        'metadata': metadata or {},
+        'summary': summary,
+        'models': manifest_models
+    }
+
+    manifest_path = serving_manifest_path(models_dir, fase)
+    previous_arrays = _referenced_arrays_file(manifest_path)
+
+    np.save(models_dir / arrays_file, packer.buffer())
+    fd, tmp_path = tempfile.mkstemp(dir=models_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, default=_json_default)
+        # mkstemp creates files readable by the owner only
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, manifest_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        os.unlink(models_dir / arrays_file)
+        raise
+
+    # Readers that already mapped the previous arrays keep their mapping
+    if previous_arrays and previous_arrays != arrays_file:
+        try:
+            os.unlink(models_dir / previous_arrays)
+        except OSError:
+            pass
+
+    return str(manifest_path)
+
+
+def remove_serving_artifact(models_dir: Path, fase: str) -> None:
+    """Delete the serving artifact of a phase (so a stale one is never served)."""
+    manifest_path = serving_manifest_path(models_dir, fase)
+    arrays_file = _referenced_arrays_file(manifest_path)
+    for path in (manifest_path, Path(models_dir) / arrays_file if arrays_file else None):
+        if path is not None:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def _referenced_arrays_file(manifest_path: Path) -> Optional[str]:
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f).get('arrays_file')
+    except (OSError, ValueError):
+        return None
+
+
+def _json_default(value):
+    """Convert NumPy scalars found in metadata or summary records."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _unpack_entry(spec: Dict[str, Any], buffer: np.ndarray) -> Dict[str, Any]:
+    evaluator = spec['evaluator']
+    arrays = {}
+    for name, ref in evaluator['arrays'].items():
+        shape = tuple(ref['shape'])
+        size = int(np.prod(shape)) if shape else 1
+        arrays[name] = buffer[ref['offset']:ref['offset'] + size].reshape(shape)
+    return {
+        'log_transform': spec['log_transform'],
+        'compiled': evaluator_from_spec(evaluator['kind'], evaluator['params'], arrays)
+    }
+
+
+def read_serving_artifact(manifest_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read a serving artifact.
+
+    Args:
+        manifest_path: Path to the manifest JSON
+
+    Returns:
+        Dictionary with 'models', 'metadata' and 'summary' (same shape as the
+        diagnostics pickle, with only 'compiled' and 'log_transform' per model)
+        and 'pickle_sha256', or None if the artifact is missing, unreadable or
+        of another format version
+    """
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != FORMAT_NAME or manifest.get('format_version') != FORMAT_VERSION:
+            print(f"Unsupported serving artifact format in {manifest_path}")
+            return None
+
+        buffer = np.load(Path(manifest_path).parent / manifest['arrays_file'], mmap_mode='r')
+
+        models = {}
+        for target, spec in manifest['models'].items():
+            if 'models' in spec:
+                models[target] = {
+                    'models': {alcance: _unpack_entry(entry, buffer) for alcance, entry in spec['models'].items()}
+                }
+            else:
+                models[target] = _unpack_entry(spec, buffer)
+
+        return {
+            'models': models,
+            'metadata': manifest.get('metadata') or {},
+            'summary': manifest.get('summary'),
+            'pickle_sha256': manifest.get('pickle_sha256')
+        }
+    except Exception as e:
+        print(f"Error loading serving artifact: {e}")
+        return None
+
@@ -36,6 +36,44 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = os.getenv("SQLALCHEMY_ECHO", "false").lower() == "true"
 
+    # Modelos ML
+    MODEL_REGISTRY_MAX_VERSIONS = int(os.getenv("MODEL_REGISTRY_MAX_VERSIONS", "4"))
+    # Cargar los modelos de todas las fases al crear la app (antes del fork de gunicorn)
+    MODELS_PRELOAD = os.getenv("MODELS_PRELOAD", "false").lower() == "true"
+    # Calentar modelos, árboles de items y una predicción sintética por fase al iniciar
+    MODELS_WARMUP = os.getenv("MODELS_WARMUP", "false").lower() == "true"
+    PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "10000"))
+    PREDICTION_CACHE_PERSIST = os.getenv("PREDICTION_CACHE_PERSIST", "false").lower() == "true"
+    PREDICTION_CACHE_DB = os.getenv(
+        "PREDICTION_CACHE_DB", os.path.join(INSTANCE_DIR, "prediction_cache.db"))
+    PREDICTION_SWEEP_MAX_POINTS = int(os.getenv("PREDICTION_SWEEP_MAX_POINTS", "2000"))
+    PREDICTION_TIMING_ENABLED = os.getenv("PREDICTION_TIMING_ENABLED", "false").lower() == "true"
+
+    # Serialización JSON: auto (orjson si está instalado), orjson o stdlib
+    JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+    # Comprimir (br/gzip) respuestas JSON y de texto desde cierto tamaño
+    RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "false").lower() == "true"
+    RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "8192"))
+    RESPONSE_COMPRESSION_GZIP_LEVEL = int(os.getenv("RESPONSE_COMPRESSION_GZIP_LEVEL", "1"))
+    RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.getenv("RESPONSE_COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # Entrenamiento en segundo plano
+    TRAINING_MAX_WORKERS = int(os.getenv("TRAINING_MAX_WORKERS", "1"))
+    TRAINING_CPU_BUDGET = int(os.getenv("TRAINING_CPU_BUDGET", str(max(1, (os.cpu_count() or 2) // 2))))
+    TRAINING_JOBS_KEEP = int(os.getenv("TRAINING_JOBS_KEEP", "50"))
+    # Reutilizar los targets/alcances cuyos datos no cambiaron desde el último entrenamiento
+    TRAINING_INCREMENTAL = os.getenv("TRAINING_INCREMENTAL", "true").lower() == "true"
+    # Selección de modelos: full (grilla completa) o halving (sucesivas mitades)
+    TRAINING_SELECTION_MODE = os.getenv("TRAINING_SELECTION_MODE", "full").lower()
+    # Segundos por búsqueda de target en modo halving (0 = sin límite)
+    TRAINING_TIME_BUDGET = float(os.getenv("TRAINING_TIME_BUDGET", "0"))
+    # Detección de outliers: ensemble o auto (solo estadísticos robustos en cortes pequeños)
+    TRAINING_OUTLIER_MODE = os.getenv("TRAINING_OUTLIER_MODE", "ensemble").lower()
+    # Caché en disco de los resultados por fold de la validación cruzada
+    CV_CACHE_ENABLED = os.getenv("CV_CACHE_ENABLED", "true").lower() == "true"
+    CV_CACHE_DB = os.getenv("CV_CACHE_DB", os.path.join(INSTANCE_DIR, "cv_cache.db"))
+    CV_CACHE_MAX_MB = int(os.getenv("CV_CACHE_MAX_MB", "512"))
+
     BASE_DIR = BASE_DIR
     PROJECT_ROOT = PROJECT_ROOT
     INSTANCE_DIR = INSTANCE_DIR
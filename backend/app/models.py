@@ -70,39 +70,18 @@ class Proyecto(db.Model):
     def _calculate_costo_total(self):
         """Calculate total cost considering only items from the project's phase.
         Excludes parent items to avoid double counting."""
-        # Use raw SQL to get:
-        # 1. All item_tipo_ids from the project's phase
-        # 2. Parent item_tipo_ids (items that have children)
-        query = """
-            SELECT DISTINCT 
-                fir.item_tipo_id,
-                CASE WHEN EXISTS (
-                    SELECT 1 FROM fase_item_requerido fir_child 
-                    WHERE fir_child.parent_id = fir.id
-                ) THEN 1 ELSE 0 END as is_parent
-            FROM fase_item_requerido fir
-            WHERE fir.fase_id = :fase_id
-        """
+        # Local import: the tree module imports these models
+        from app.services.fase_item_tree import get_fase_item_tree
         
-        result = db.session.execute(text(query), {'fase_id': self.fase_id})
-        
-        # Build set of parent item_tipo_ids and set of valid item_tipo_ids for this phase
-        parent_item_tipo_ids = set()
-        valid_item_tipo_ids = set()
-        
-        for row in result:
-            item_tipo_id, is_parent = row
-            valid_item_tipo_ids.add(item_tipo_id)
-            if is_parent:
-                parent_item_tipo_ids.add(item_tipo_id)
+        # Leaf items of the phase (cached hierarchy, no query per project)
+        leaf_item_tipo_ids = get_fase_item_tree(self.fase_id).leaf_item_tipo_ids
         
         # Sum only costs from:
         # 1. Items that belong to this phase's required items
         # 2. Items that are NOT parent items
         total = 0
         for costo in self.costos:
-            if (costo.item_tipo_id in valid_item_tipo_ids and 
-                costo.item_tipo_id not in parent_item_tipo_ids):
+            if costo.item_tipo_id in leaf_item_tipo_ids:
                 total += costo.valor
         
         return total
@@ -7,6 +7,7 @@ from .predict import predict_bp
 from .enums import enums_bp
 from .charts import charts_bp
 from .auth import auth_bp
+from .health import health_bp
 
 
 def register_v1_blueprints(app):
@@ -21,5 +22,6 @@ def register_v1_blueprints(app):
     api_v1.register_blueprint(enums_bp, url_prefix="/enums")
     api_v1.register_blueprint(charts_bp, url_prefix="/charts")
     api_v1.register_blueprint(auth_bp, url_prefix="/auth")
+    api_v1.register_blueprint(health_bp, url_prefix="/health")
 
     app.register_blueprint(api_v1)
@@ -8,7 +8,9 @@ import numpy as np
 import unicodedata
 from math import sqrt
 from app.services import ModelService
-from app.utils.charts_utils import calculate_present_value, normalize_key, get_predictor_config, calculate_predictor_value
+from app.services.uf_schema import UFBatch
+from app.utils.charts_utils import calculate_present_value, get_predictor_config, calculate_predictor_value
+from app.utils.item_model_index import resolve_target_key
 
 charts_bp = Blueprint("charts_v1", __name__)
 
@@ -526,16 +528,7 @@ def get_item_real_vs_predicted():
         print(f"Found item column: {item_column}")
         print(f"Available models: {list(target_models.keys())}")
         # Buscar modelo correspondiente al ítem
-        target_key = None
-        # TODO: Remove this when the models are updated
-        if fase_item_req.descripcion == '3.1 - GEOLOGÍA':
-            normalized_item_name = normalize_key('3 - GEOLOGÍA')
-        else:
-            normalized_item_name = normalize_key(fase_item_req.descripcion)
-        for key in target_models.keys():
-            if normalize_key(key) == normalized_item_name:
-                target_key = key
-                break
+        target_key = resolve_target_key(fase_item_req.descripcion, target_models.keys())
 
         if not target_key:
             return jsonify({
@@ -549,7 +542,9 @@ def get_item_real_vs_predicted():
         real_values = []
         predicted_values = []
 
-        # Calcular valores reales vs predichos usando columnas normalizadas
+        # Filas con valor real válido y sus parámetros de predicción
+        rows = []
+        params_list = []
         for _, row in df.iterrows():
             actual_value = row.get(item_column)
             if actual_value is None or (isinstance(actual_value, float) and np.isnan(actual_value)):
@@ -558,7 +553,8 @@ def get_item_real_vs_predicted():
             if float(actual_value) == 0:
                 continue
 
-            pred_params = {
+            rows.append(row)
+            params_list.append({
                 'codigo': row.get('codigo', ''),
                 'longitud_km': float(row.get('longitud_km') or 0),
                 'puentes_vehiculares_und': int(row.get('puentes_vehiculares_und') or 0),
@@ -568,19 +564,22 @@ def get_item_real_vs_predicted():
                 'tuneles_und': int(row.get('tuneles_und') or 0),
                 'tuneles_km': float(row.get('tuneles_km') or 0),
                 'alcance': row.get('alcance', '') or ''
-            }
+            })
 
-            predictions = model_service.adapter.predict(
-                fase_id=fase_id,
-                models=target_models,
-                **pred_params
-            )
+        # Predicción de todas las filas en un solo lote
+        predictions_list = model_service.adapter.predict_batch(
+            fase_id=fase_id,
+            models=target_models,
+            batch=UFBatch.from_params(params_list)
+        )
 
+        # Calcular valores reales vs predichos usando columnas normalizadas
+        for row, predictions in zip(rows, predictions_list):
             predicted_value = predictions.get(target_key)
             if predicted_value is None or (isinstance(predicted_value, float) and np.isnan(predicted_value)):
                 continue
 
-            valor_real = float(actual_value)
+            valor_real = float(row.get(item_column))
             valor_predicho = float(predicted_value)
 
             points.append({
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.models import db, Fase, FaseItemRequerido, ItemTipo
 from app.utils import sort_items_by_description
+from app.adapters.model_adapter import invalidate_phase_descriptors
 
 fases_bp = Blueprint('fases', __name__)
 
@@ -56,6 +57,7 @@ def create_fase():
     )
     db.session.add(fase)
     db.session.commit()
+    invalidate_phase_descriptors(fase.id)
     
     return jsonify({'id': fase.id, 'message': 'Fase creada', 'fase': fase.to_dict()}), 201
 
@@ -74,6 +76,8 @@ def update_fase(fase_id):
         fase.descripcion = data['descripcion']
     
     db.session.commit()
+    # The legacy phase code is derived from the name
+    invalidate_phase_descriptors(fase_id)
     return jsonify({'message': 'Fase actualizada', 'fase': fase.to_dict()})
 
 @fases_bp.route('/<int:fase_id>', methods=['DELETE'])
@@ -85,4 +89,5 @@ def delete_fase(fase_id):
     
     db.session.delete(fase)
     db.session.commit()
+    invalidate_phase_descriptors(fase_id)
     return jsonify({'message': 'Fase eliminada'})
\ No newline at end of file
@@ -0,0 +1,34 @@
+from flask import Blueprint, jsonify
+from app.services.model_warmup import readiness
+import traceback
+
+health_bp = Blueprint("health_v1", __name__)
+
+
+@health_bp.route("/ready", methods=["GET"])
+def ready():
+    """
+    Readiness check for the load balancer: 200 once the startup warm-up
+    (MODELS_WARMUP=true) finished, 503 while it is still running.
+    Liveness stays at /api/v1/charts/health.
+    
+    Response:
+    {
+        "ready": true,
+        "status": "ready",  // warming_up | ready | degraded (a phase failed to warm up)
+        "warmup": {"status": "completed", "started_at": "...", "finished_at": "...", "elapsed_ms": 850.2, "error": null},
+        "fases": [
+            {"fase_id": 3, "fase": "III", "status": "ready", "model_version": "1792218035753171675-21763",
+             "load_ms": 20.4, "prediction_ms": 95.1, "error": null},
+            {"fase_id": 1, "fase": "I", "status": "not_trained", ...}
+        ]
+    }
+    """
+    try:
+        result = readiness()
+        return jsonify(result), 200 if result['ready'] else 503
+    
+    except Exception as e:
+        print(f"Error checking readiness: {e}")
+        print(traceback.format_exc())
+        return jsonify({'ready': False, 'status': 'error', 'error': str(e)}), 503
@@ -1,7 +1,14 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
 from app.services import PredictionService
 from app.services import ModelService
+from app.services.prediction_cache import prediction_cache
+from app.services.training_jobs import training_jobs
+from app.services.model_preload import get_preload_report
+from app.adapters.model_registry import model_registry
+from app.utils.memory import process_memory
+from app.utils import timing
 from app.services.exceptions import PhaseNotFoundError, MissingItemsError
+from app.services.exceptions import BadRequest as InvalidPredictionRequest
 from werkzeug.exceptions import BadRequest
 import traceback
 
@@ -11,6 +18,29 @@ predict_bp = Blueprint("predict_v1", __name__)
 prediction_service = PredictionService()
 model_service = ModelService()
 
+
+@predict_bp.before_request
+def start_timing():
+    g.timing_token = timing.start_request()
+
+
+@predict_bp.after_request
+def add_server_timing(response):
+    """Return the stage spans of the request as a Server-Timing header (when timing is enabled)."""
+    spans = timing.finish_request(g.pop('timing_token', None))
+    if spans:
+        response.headers['Server-Timing'] = timing.server_timing_header(spans)
+    return response
+
+
+def _error_body(error: Exception) -> dict:
+    """Error response body; invalid fields are listed in 'detalles'."""
+    body = {'error': str(error)}
+    if getattr(error, 'errors', None):
+        body['detalles'] = error.errors
+    return body
+
+
 @predict_bp.route("/", methods=["POST"])
 def predict_cost():
     """
@@ -25,10 +55,12 @@ def predict_cost():
 
     try:
         result = prediction_service.predict_cost(data)
-        return jsonify(result), 200
+        with timing.span('predict.serialize'):
+            response = jsonify(result)
+        return response, 200
 
-    except (BadRequest, MissingItemsError) as e:
-        return jsonify({'error': str(e)}), 400
+    except (BadRequest, InvalidPredictionRequest, MissingItemsError) as e:
+        return jsonify(_error_body(e)), 400
     
     except (PhaseNotFoundError, FileNotFoundError) as e:
         return jsonify({'error': str(e)}), 404
@@ -39,6 +71,83 @@ def predict_cost():
         return jsonify({'error': f"Error al realizar la predicción: {str(e)}"}), 500
 
 
+@predict_bp.route("/batch", methods=["POST"])
+def predict_cost_batch():
+    """
+    Predict many projects in one request, streaming NDJSON (one line per project).
+    
+    Request body:
+    {
+        "proyectos": [ {...payload de /predict...}, ... ]  // can mix fases
+    }
+    
+    Each line is emitted as soon as its project is ready:
+    {"index": 0, "proyecto_nombre": "...", "status": "ok", "resultado": {...}}
+    {"index": 1, "proyecto_nombre": "...", "status": "error", "error": "..."}
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'El cuerpo de la solicitud debe ser un JSON válido.'}), 400
+    
+    proyectos = data.get('proyectos')
+    if not isinstance(proyectos, list) or not proyectos:
+        return jsonify({'error': "El campo 'proyectos' debe ser una lista no vacía."}), 400
+    
+    @stream_with_context
+    def generate():
+        for line in prediction_service.predict_cost_batch(proyectos):
+            yield current_app.json.dumps(line) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+@predict_bp.route("/sweep", methods=["POST"])
+def predict_cost_sweep():
+    """
+    Predict one functional unit over a grid of one or two swept fields
+    (cost vs. longitud_km per alcance, vs. puentes_vehiculares_mt2, ...).
+    
+    Request body:
+    {
+        "fase_id": 3,
+        "unidad_funcional": {"longitud_km": 10, "alcance": "Segunda calzada", ...},
+        "variables": [
+            {"campo": "longitud_km", "inicio": 1, "fin": 50, "pasos": 50},
+            {"campo": "alcance", "valores": ["Segunda calzada", "Mejoramiento"]}
+        ]
+    }
+    
+    Response (arrays in grid order, the last variable varies fastest):
+    {
+        "fase_id": 3,
+        "variables": ["longitud_km", "alcance"],
+        "num_puntos": 100,
+        "grid": {"longitud_km": [1.0, 1.0, ...], "alcance": ["Segunda calzada", "Mejoramiento", ...]},
+        "costo_total": [...],
+        "items": [{"item": "...", "item_tipo_id": 1, "is_parent": false, "predicted": true, "causacion_estimada": [...]}],
+        "items_sin_modelo": []
+    }
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'El cuerpo de la solicitud debe ser un JSON válido.'}), 400
+
+    try:
+        result = prediction_service.predict_sweep(data)
+        return jsonify(result), 200
+
+    except (BadRequest, InvalidPredictionRequest, MissingItemsError) as e:
+        return jsonify(_error_body(e)), 400
+
+    except (PhaseNotFoundError, FileNotFoundError) as e:
+        return jsonify({'error': str(e)}), 404
+
+    except Exception as e:
+        print(f"Error in sweep prediction: {e}")
+        print(traceback.format_exc())
+        return jsonify({'error': f"Error al realizar la predicción: {str(e)}"}), 500
+
+
 @predict_bp.route("/models/available", methods=["GET"])
 def get_available_models():
     """
@@ -62,6 +171,78 @@ def get_available_models():
         return jsonify({'error': str(e)}), 500
 
 
+@predict_bp.route("/cache/stats", methods=["GET"])
+def get_prediction_cache_stats():
+    """
+    Get hit/miss counters of the per-UF prediction cache.
+    
+    Response:
+    {
+        "memory_hits": 120,
+        "persistent_hits": 4,
+        "misses": 40,
+        "hit_rate": 0.7561,
+        "memory_entries": 44,
+        "max_entries": 10000,
+        "persistent": false
+    }
+    """
+    return jsonify(prediction_cache.stats()), 200
+
+
+@predict_bp.route("/timing", methods=["GET"])
+def get_prediction_timing():
+    """
+    Get latency histograms per prediction stage (PREDICTION_TIMING_ENABLED=true).
+    
+    Response:
+    {
+        "enabled": true,
+        "buckets_ms": [0.1, 0.25, ...],
+        "stages": [  // sorted by total_ms
+            {"stage": "predict.models", "count": 12, "total_ms": 85.1, "mean_ms": 7.09, "max_ms": 14.2,
+             "p50_ms": 10, "p95_ms": 25, "p99_ms": 25, "buckets": [...]},
+            {"stage": "model.1 - TRANSPORTE.Segunda calzada", ...}
+        ]
+    }
+    """
+    return jsonify(timing.histograms.snapshot()), 200
+
+
+@predict_bp.route("/timing", methods=["DELETE"])
+def reset_prediction_timing():
+    """Reset the latency histograms."""
+    timing.histograms.reset()
+    return jsonify({'success': True}), 200
+
+
+@predict_bp.route("/memory", methods=["GET"])
+def get_worker_memory():
+    """
+    Get the memory of the worker process that served the request.
+    
+    RSS includes pages shared with the other workers; PSS splits shared pages
+    among the processes using them. Compare workers with memory_report.py.
+    
+    Response:
+    {
+        "process": {"pid": 4312, "rss_kb": 183000, "pss_kb": 61000, "shared_kb": 131000, ...},
+        "preload": {  // null if the models were not preloaded
+            "fases": [{"fase_id": 3, "fase": "III", "loaded": true, "error": null}],
+            "elapsed_ms": 42.5,
+            "memory_before": {...},  // master process, before loading
+            "memory_after": {...}
+        },
+        "models": {"hits": 10, "misses": 0, "loaded": [...]}
+    }
+    """
+    return jsonify({
+        'process': process_memory(),
+        'preload': get_preload_report(),
+        'models': model_registry.stats()
+    }), 200
+
+
 @predict_bp.route("/example", methods=["GET"])
 def predict_cost_example():
     """
@@ -94,6 +275,9 @@ def train_models():
     """
     Train models for a specific phase and save them to disk.
     
+    Training runs in the background process pool (see /train/jobs); this
+    endpoint waits for the job to finish and returns its result.
+    
     Request body:
     {
         "fase_id": 3  // Phase ID from database
@@ -118,27 +302,23 @@ def train_models():
         raise BadRequest("El campo 'fase_id' es requerido.")
     
     try:
-        result = model_service.train_models(fase_id)
+        job, _ = training_jobs.submit(fase_id)
+        job = training_jobs.wait(job['job_id'])
         
-        # Convert summary DataFrame to dict if present
-        summary = None
-        if result.get('summary') is not None:
-            summary = result['summary'].to_dict(orient='records')
+        if job['status'] == 'completed':
+            return jsonify({"success": True, **job['result']}), 200
         
-        return jsonify({
-            "success": True,
-            "fase": result['fase'],
-            "fase_id": result['fase_id'],
-            "models_path": result['models_path'],
-            "summary": summary,
-            "metadata": result.get('metadata')
-        }), 200
+        if job['error_type'] == 'NotImplementedError':
+            return jsonify({
+                "success": False,
+                "error": job['error']
+            }), 501
         
-    except NotImplementedError as e:
+        print(f"Error training models: {job['error']}")
         return jsonify({
             "success": False,
-            "error": str(e)
-        }), 501
+            "error": f"Error al entrenar modelos: {job['error']}"
+        }), 500
         
     except Exception as e:
         print(f"Error training models: {e}")
@@ -146,4 +326,61 @@ def train_models():
         return jsonify({
             "success": False,
             "error": f"Error al entrenar modelos: {str(e)}"
-        }), 500        
\ No newline at end of file
+        }), 500
+
+
+@predict_bp.route("/train/jobs", methods=["POST"])
+def create_training_job():
+    """
+    Start training a phase in the background.
+    
+    Request body:
+    {
+        "fase_id": 3
+    }
+    
+    Response (202): the job; if the fase is already being trained, the
+    running job is returned with "deduplicated": true.
+    {
+        "job_id": "9f1c...",
+        "fase_id": 3,
+        "status": "pending",  // pending | running | completed | failed
+        "progress": {"completed": 4, "total": 18, "target": "5 - TALUDES"},
+        "deduplicated": false,
+        ...
+    }
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'El cuerpo de la solicitud debe ser un JSON válido.'}), 400
+    
+    fase_id = data.get("fase_id")
+    if not fase_id:
+        return jsonify({'error': "El campo 'fase_id' es requerido."}), 400
+    
+    try:
+        # Fail fast on unknown or unsupported fases
+        model_service.adapter._map_fase_id_to_code(fase_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    job, created = training_jobs.submit(fase_id)
+    return jsonify({**job, 'deduplicated': not created}), 202
+
+
+@predict_bp.route("/train/jobs", methods=["GET"])
+def list_training_jobs():
+    """List recent training jobs (without results), newest first."""
+    return jsonify({'jobs': training_jobs.list()}), 200
+
+
+@predict_bp.route("/train/jobs/<job_id>", methods=["GET"])
+def get_training_job(job_id):
+    """
+    Get status, progress and (when completed) result of a training job.
+    The result has the same fields as the /train response.
+    """
+    job = training_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': f"Trabajo de entrenamiento '{job_id}' no encontrado."}), 404
+    return jsonify(job), 200
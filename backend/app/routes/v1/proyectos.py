@@ -2,9 +2,10 @@ import json
 import os
 import tempfile
 import zipfile
-from flask import Blueprint, jsonify, request, send_file
-from app.models import db, Proyecto, UnidadFuncional, CostoItem, FaseItemRequerido
+from flask import Blueprint, current_app, jsonify, request, send_file
+from app.models import db, Proyecto, UnidadFuncional, CostoItem
 from app.services import GeometryProcessor, GeometryAssigner
+from app.services.fase_item_tree import get_fase_item_tree
 
 proyectos_bp = Blueprint("proyectos_v1", __name__)
 
@@ -123,27 +124,27 @@ def get_costos(codigo):
     if not proyecto:
         return jsonify({'error': f'Proyecto {codigo} no encontrado'}), 404
     
-    items_requeridos = FaseItemRequerido.query.filter_by(
-        fase_id=proyecto.fase_id
-    ).all()
+    item_tree = get_fase_item_tree(proyecto.fase_id)
     
     costos = {
         c.item_tipo_id: c
         for c in CostoItem.query.filter_by(proyecto_id=proyecto.id).all()
     }
     
+    # Parent values are the sum of their children
+    parent_values = item_tree.parent_sums({
+        item_tipo_id: costo.valor for item_tipo_id, costo in costos.items()
+    })
+    
     result = []
     
-    for item in items_requeridos:
+    for item in item_tree.nodes:
         costo = costos.get(item.item_tipo_id)
         valor = costo.valor if costo else 0
 
-        if item.children:
-            valor = sum(
-                costos.get(child.item_tipo_id).valor
-                for child in item.children
-                if costos.get(child.item_tipo_id)
-            )
+        has_children = item.item_tipo_id in item_tree.parent_item_tipo_ids
+        if has_children:
+            valor = parent_values[item.item_tipo_id]
         
         result.append({
             'fase_item_requerido_id': item.id,
@@ -151,8 +152,8 @@ def get_costos(codigo):
             'descripcion': item.descripcion,
             'obligatorio': item.obligatorio,
             'parent_id': item.parent_id,
-            'has_children': bool(item.children),
-            'item_tipo': item.item_tipo.to_dict() if item.item_tipo else None,
+            'has_children': has_children,
+            'item_tipo': item.item_tipo_dict() if item.item_tipo_nombre is not None else None,
             'costo_id': costo.id if costo else None,
             'valor': valor,
         })
@@ -179,15 +180,17 @@ def create_or_update_costos(codigo):
         if c.get('item_tipo_id')
     }
 
-    fase_items = FaseItemRequerido.query.filter_by(
-        fase_id=proyecto.fase_id
-    ).all()
+    item_tree = get_fase_item_tree(proyecto.fase_id)
+    
+    costos_existentes = {}
+    for c in CostoItem.query.filter_by(proyecto_id=proyecto.id).order_by(CostoItem.id).all():
+        costos_existentes.setdefault(c.item_tipo_id, c)
 
     created = 0
     updated = 0
 
-    for fi in fase_items:
-        if fi.children:    # saltamos padres, se calculan en get
+    for fi in item_tree.nodes:
+        if fi.item_tipo_id in item_tree.parent_item_tipo_ids:    # saltamos padres, se calculan en get
             continue
 
         item_tipo_id = fi.item_tipo_id
@@ -196,20 +199,19 @@ def create_or_update_costos(codigo):
         if valor is None:
             valor = 0
 
-        costo = CostoItem.query.filter_by(
-            proyecto_id=proyecto.id,
-            item_tipo_id=item_tipo_id
-        ).first()
+        costo = costos_existentes.get(item_tipo_id)
 
         if costo:
             costo.valor = valor
             updated += 1
         else:
-            db.session.add(CostoItem(
+            costo = CostoItem(
                 proyecto_id=proyecto.id,
                 item_tipo_id=item_tipo_id,
                 valor=valor
-            ))
+            )
+            db.session.add(costo)
+            costos_existentes[item_tipo_id] = costo
             created += 1
 
     db.session.commit()
@@ -264,7 +266,8 @@ def get_project_geometries(codigo):
     for uf in unidades:
         if uf.geometry_json:
             try:
-                geometry = json.loads(uf.geometry_json)
+                # The app's JSON provider parses with orjson when available
+                geometry = current_app.json.loads(uf.geometry_json)
                 features.append({
                     'type': 'Feature',
                     'id': uf.id,
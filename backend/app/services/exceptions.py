@@ -9,3 +9,11 @@ class MissingItemsError(Exception):
 
 class BadRequest(Exception):
     pass
+
+
+class ValidationError(BadRequest):
+    """Invalid request fields; errors lists each one as {'campo': ..., 'error': ...}"""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
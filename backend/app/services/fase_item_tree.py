@@ -0,0 +1,292 @@
+"""
+Fase Item Tree - Compiled, cached item hierarchy of each fase
+
+The items required by a fase (FaseItemRequerido) change rarely, but prediction,
+project costs and project totals all need their hierarchy. FaseItemTree is
+built once per fase with a single query (sorted order, parent/child indexes,
+leaf set) and cached in-process. ORM changes to FaseItemRequerido or ItemTipo
+invalidate the affected trees of this process when the transaction commits.
+
+Other processes (gunicorn workers) and changes made outside the ORM (bulk
+updates, seed scripts, migrations) are caught by revalidation: a tree older
+than CHECK_INTERVAL_SECONDS is compared against an aggregate signature of its
+rows (one small query) and rebuilt if it changed, and a tree older than
+MAX_AGE_SECONDS is always rebuilt.
+
+Trees are detached from the database session and must be treated as read-only.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import case, event, func, inspect
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import db, FaseItemRequerido, ItemTipo
+from app.utils.item_helpers import parse_item_order
+
+
+@dataclass(frozen=True)
+class FaseItemNode:
+    """Detached copy of a FaseItemRequerido row and its ItemTipo."""
+    id: int
+    item_tipo_id: int
+    parent_id: Optional[int]
+    obligatorio: Optional[bool]
+    descripcion: Optional[str]
+    item_tipo_nombre: Optional[str]
+    item_tipo_descripcion: Optional[str]
+
+    @property
+    def nombre(self) -> Optional[str]:
+        """Display name: description, falling back to the item type name."""
+        return self.descripcion or self.item_tipo_nombre
+
+    def item_tipo_dict(self) -> Dict:
+        """Same shape as ItemTipo.to_dict()."""
+        return {
+            'id': self.item_tipo_id,
+            'nombre': self.item_tipo_nombre,
+            'descripcion': self.item_tipo_descripcion
+        }
+
+
+class FaseItemTree:
+    """
+    Item hierarchy of a fase.
+
+    Attributes:
+        nodes: Nodes in database (id) order
+        sorted_nodes: Nodes sorted by description (1, 2, 2.1, 2.2, 3, ...)
+        parent_index: For each node in nodes, index of its parent in nodes (-1 for roots)
+        parent_child_map: parent item_tipo_id -> child item_tipo_ids
+        parent_item_tipo_ids: item_tipo_ids with children
+        leaf_item_tipo_ids: item_tipo_ids without children
+    """
+
+    def __init__(self, fase_id: int, nodes: List[FaseItemNode]):
+        self.fase_id = fase_id
+        self.nodes: Tuple[FaseItemNode, ...] = tuple(nodes)
+        self.sorted_nodes: Tuple[FaseItemNode, ...] = tuple(
+            sorted(self.nodes, key=lambda node: parse_item_order(node.descripcion))
+        )
+
+        position = {node.id: i for i, node in enumerate(self.nodes)}
+        self.parent_index: Tuple[int, ...] = tuple(
+            position.get(node.parent_id, -1) if node.parent_id else -1
+            for node in self.nodes
+        )
+
+        parent_child_map: Dict[int, List[int]] = {}
+        for node, parent_pos in zip(self.nodes, self.parent_index):
+            if parent_pos >= 0:
+                parent_item_tipo_id = self.nodes[parent_pos].item_tipo_id
+                parent_child_map.setdefault(parent_item_tipo_id, []).append(node.item_tipo_id)
+        self.parent_child_map: Dict[int, Tuple[int, ...]] = {
+            parent: tuple(children) for parent, children in parent_child_map.items()
+        }
+
+        self.item_tipo_ids = frozenset(node.item_tipo_id for node in self.nodes)
+        self.parent_item_tipo_ids = frozenset(self.parent_child_map)
+        self.leaf_item_tipo_ids = self.item_tipo_ids - self.parent_item_tipo_ids
+
+        # Parents ordered so that nested parents are summed before their ancestors
+        self._parents_bottom_up = tuple(self._order_parents_bottom_up())
+
+    def _order_parents_bottom_up(self) -> List[int]:
+        ordered = []
+        visited: Set[int] = set()
+
+        def visit(item_tipo_id: int):
+            if item_tipo_id in visited:
+                return
+            visited.add(item_tipo_id)
+            for child in self.parent_child_map.get(item_tipo_id, ()):
+                if child in self.parent_child_map:
+                    visit(child)
+            ordered.append(item_tipo_id)
+
+        for parent in self.parent_child_map:
+            visit(parent)
+        return ordered
+
+    def parent_sums(self, values: Dict[int, float]) -> Dict[int, float]:
+        """
+        Compute each parent's value as the sum of its children.
+
+        Args:
+            values: item_tipo_id -> value for leaf items (missing items count as 0)
+
+        Returns:
+            Dict parent item_tipo_id -> sum of its children's values
+        """
+        sums: Dict[int, float] = {}
+        for parent in self._parents_bottom_up:
+            sums[parent] = sum(
+                sums[child] if child in sums else values.get(child, 0)
+                for child in self.parent_child_map[parent]
+            )
+        return sums
+
+
+# Seconds a cached tree is trusted before its signature is checked again
+CHECK_INTERVAL_SECONDS = 2.0
+# Seconds after which a tree is rebuilt even if its signature did not change
+MAX_AGE_SECONDS = 300.0
+
+
+@dataclass
+class _CachedTree:
+    tree: FaseItemTree
+    signature: Tuple
+    built_at: float
+    checked_at: float
+
+
+_trees: Dict[int, _CachedTree] = {}
+_trees_lock = threading.Lock()
+_generation = 0
+
+
+def _text_length(column):
+    return func.coalesce(func.length(column), -1)
+
+
+def _tree_signature(fase_id: int) -> Tuple:
+    """
+    Aggregate signature of the rows a fase tree is built from.
+
+    Counts and id-weighted sums of every copied column, so added, deleted,
+    moved or re-parented items and most edits change it (edits that keep the
+    text lengths are caught by MAX_AGE_SECONDS).
+    """
+    item = FaseItemRequerido
+    obligatorio = case((item.obligatorio.is_(True), 1), (item.obligatorio.is_(False), 2), else_=0)
+    row = (
+        db.session.query(
+            func.count(item.id),
+            func.max(item.id),
+            func.sum(item.id * item.item_tipo_id),
+            func.sum(item.id * func.coalesce(item.parent_id, 0)),
+            func.sum(item.id * obligatorio),
+            func.sum(item.id * _text_length(item.descripcion)),
+            func.sum(item.id * _text_length(ItemTipo.nombre)),
+            func.sum(item.id * _text_length(ItemTipo.descripcion))
+        )
+        .outerjoin(ItemTipo, ItemTipo.id == item.item_tipo_id)
+        .filter(item.fase_id == fase_id)
+        .one()
+    )
+    return tuple(row)
+
+
+def get_fase_item_tree(fase_id: int) -> FaseItemTree:
+    """
+    Get the item tree of a fase, building it with one query on a miss.
+
+    Cached trees are revalidated against the database every
+    CHECK_INTERVAL_SECONDS (see _tree_signature).
+
+    Args:
+        fase_id: Phase ID
+
+    Returns:
+        FaseItemTree (empty if the fase has no items)
+    """
+    now = time.monotonic()
+    cached = _trees.get(fase_id)
+    if cached is not None:
+        if now - cached.checked_at < CHECK_INTERVAL_SECONDS:
+            return cached.tree
+        if now - cached.built_at < MAX_AGE_SECONDS and _tree_signature(fase_id) == cached.signature:
+            cached.checked_at = now
+            return cached.tree
+
+    with _trees_lock:
+        generation = _generation
+
+    signature = _tree_signature(fase_id)
+    items = (
+        FaseItemRequerido.query
+        .filter_by(fase_id=fase_id)
+        .options(joinedload(FaseItemRequerido.item_tipo))
+        .order_by(FaseItemRequerido.id)
+        .all()
+    )
+    tree = FaseItemTree(fase_id, [
+        FaseItemNode(
+            id=item.id,
+            item_tipo_id=item.item_tipo_id,
+            parent_id=item.parent_id,
+            obligatorio=item.obligatorio,
+            descripcion=item.descripcion,
+            item_tipo_nombre=item.item_tipo.nombre if item.item_tipo else None,
+            item_tipo_descripcion=item.item_tipo.descripcion if item.item_tipo else None
+        )
+        for item in items
+    ])
+
+    with _trees_lock:
+        # Don't cache a tree built while its rows were being modified
+        if generation == _generation:
+            _trees[fase_id] = _CachedTree(tree, signature, now, now)
+    return tree
+
+
+def invalidate_fase_item_trees(fase_ids: Optional[Set[int]] = None) -> None:
+    """
+    Drop cached trees.
+
+    Args:
+        fase_ids: Phases to drop; drops everything if None
+    """
+    global _generation
+    with _trees_lock:
+        _generation += 1
+        if fase_ids is None:
+            _trees.clear()
+        else:
+            for fase_id in fase_ids:
+                _trees.pop(fase_id, None)
+
+
+_DIRTY_KEY = 'fase_item_tree_dirty'
+_ALL_FASES = object()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_fases(session, flush_context):
+    """Remember which fases had item rows changed in this transaction."""
+    dirty = session.info.setdefault(_DIRTY_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, FaseItemRequerido):
+            dirty.add(obj.fase_id)
+            # A moved item also changes its previous fase
+            previous = inspect(obj).attrs.fase_id.history.deleted or ()
+            dirty.update(fase_id for fase_id in previous if fase_id is not None)
+        elif isinstance(obj, ItemTipo):
+            dirty.add(_ALL_FASES)
+    # Invalidate right away too, so this session's own reads don't use a stale tree
+    _invalidate(dirty)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    _invalidate(session.info.pop(_DIRTY_KEY, set()))
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _invalidate_rolled_back(session, previous_transaction):
+    _invalidate(session.info.pop(_DIRTY_KEY, set()))
+
+
+def _invalidate(dirty: set) -> None:
+    if not dirty:
+        return
+    if _ALL_FASES in dirty:
+        invalidate_fase_item_trees()
+    else:
+        invalidate_fase_item_trees(set(dirty))
+
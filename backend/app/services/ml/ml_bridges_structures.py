@@ -1,12 +1,33 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import LeaveOneOut, cross_val_predict
 from sklearn.compose import TransformedTargetRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 
-from app.utils.ml_utils import remove_outliers, calculate_metrics, get_bridges_structures_tunnels
+from app.utils.ml_utils import remove_outliers, calculate_metrics, get_bridges_structures_tunnels, loo_predict
+
+def build_bridges_structures_model(use_log_transform: bool = False):
+    """Unfitted scaled linear regression (log target if use_log_transform)."""
+    if use_log_transform:
+        return TransformedTargetRegressor(
+            regressor=Pipeline([
+                ('scaler', StandardScaler()),
+                ('regressor', LinearRegression())
+            ]),
+            func=np.log,
+            inverse_func=np.exp
+        )
+    return Pipeline([
+        ('scaler', StandardScaler()),
+        ('regressor', LinearRegression())
+    ])
+
+
+def search_space(use_log_transform: bool = False) -> tuple:
+    """Model trained by train_brindges_structures_model (for fingerprints)."""
+    return (repr(build_bridges_structures_model(use_log_transform)),)
+
 
 def train_brindges_structures_model(df_vp: pd.DataFrame, target_name: str, predictors: list[str], use_log_transform: bool = False) -> dict:
     """
@@ -28,33 +49,11 @@ def train_brindges_structures_model(df_vp: pd.DataFrame, target_name: str, predi
     X = X[mask_nonzero]
     y = y[mask_nonzero]
     
-    # Initialize Leave-One-Out
-    loo = LeaveOneOut()
-    
     # Create model
-    if use_log_transform:
-        model = TransformedTargetRegressor(
-            regressor=Pipeline([
-                ('scaler', StandardScaler()),
-                ('regressor', LinearRegression())
-            ]),
-            func=np.log,
-            inverse_func=np.exp
-        )
-    else:
-        model = Pipeline([
-            ('scaler', StandardScaler()),
-            ('regressor', LinearRegression())
-        ])
-    
-    # LOO Cross-validation
-    y_pred = np.zeros_like(y)
-    for train_idx, test_idx in loo.split(X):
-        X_train, X_test = X[train_idx], X[test_idx]
-        y_train, y_test = y[train_idx], y[test_idx]
-        
-        model.fit(X_train, y_train)
-        y_pred[test_idx] = model.predict(X_test)
+    model = build_bridges_structures_model(use_log_transform)
+    
+    # LOO Cross-validation (closed form for linear regression)
+    y_pred = loo_predict(model, X, y)
     
     metrics = calculate_metrics(y, y_pred, model_name='Linear Regression')
     model.fit(X, y)
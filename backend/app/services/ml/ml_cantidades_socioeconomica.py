@@ -3,10 +3,27 @@ import numpy as np
 from sklearn.linear_model import Ridge
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
-from sklearn.model_selection import LeaveOneOut, GridSearchCV
+from sklearn.model_selection import KFold
 import warnings
 
-from app.utils.ml_utils import remove_outliers, calculate_metrics
+from app.utils.ml_utils import remove_outliers, calculate_metrics, loo_predict, cached_grid_search
+
+# Ridge penalties searched by train_cantidades_model (K-fold with at most CV_MAX_SPLITS folds)
+PARAM_GRID = {'model__alpha': [0.01, 0.1, 1.0, 10.0, 100.0]}
+CV_MAX_SPLITS = 3
+
+
+def build_cantidades_model() -> Pipeline:
+    return Pipeline([
+        ('scaler', StandardScaler()),
+        ('model', Ridge())
+    ])
+
+
+def search_space() -> tuple:
+    """Model, parameter grid and folds searched by train_cantidades_model (for fingerprints)."""
+    return (repr(build_cantidades_model()), repr(PARAM_GRID), CV_MAX_SPLITS)
+
 
 def train_cantidades_model(df_vp: pd.DataFrame, predictors: list[str], target: str, log_transform: str = 'none'):
     
@@ -16,7 +33,7 @@ def train_cantidades_model(df_vp: pd.DataFrame, predictors: list[str], target: s
     df = df[df[target] > 0]
     df = df.loc[:, 'LONGITUD KM':'TUNELES KM'].join(df.loc[:, [target]])
     
-    df_clean = remove_outliers(df, target, method='ensemble', contamination=0.1)
+    df_clean = remove_outliers(df, target)
     
     X = df_clean[predictors].values
     y = df_clean[target].values
@@ -31,30 +48,15 @@ def train_cantidades_model(df_vp: pd.DataFrame, predictors: list[str], target: s
     
     warnings.filterwarnings('ignore', category=UserWarning)
     
-    pipeline = Pipeline([
-        ('scaler', StandardScaler()),
-        ('model', Ridge())
-    ])
-    
-    grid_search = GridSearchCV(
-        pipeline, 
-        {'model__alpha': [0.01, 0.1, 1.0, 10.0, 100.0]},
-        cv=min(3, len(y)),
-        scoring='neg_mean_squared_error',
-        n_jobs=-1
+    model, pruned = cached_grid_search(
+        build_cantidades_model(),
+        PARAM_GRID,
+        X, y_train,
+        list(KFold(n_splits=min(CV_MAX_SPLITS, len(y))).split(X)),
+        scoring='neg_mean_squared_error'
     )
     
-    grid_search.fit(X, y_train)
-    model = grid_search.best_estimator_
-    
-    loo = LeaveOneOut()
-    y_pred_loo = np.zeros(len(y_train))
-    
-    for train_idx, test_idx in loo.split(X):
-        X_train, X_test = X[train_idx], X[test_idx]
-        y_tr = y_train[train_idx]
-        model.fit(X_train, y_tr)
-        y_pred_loo[test_idx] = model.predict(X_test)
+    y_pred_loo = loo_predict(model, X, y_train)
     
     if log_transform in ['output', 'both']:
         y_pred = np.expm1(y_pred_loo)
@@ -63,5 +65,7 @@ def train_cantidades_model(df_vp: pd.DataFrame, predictors: list[str], target: s
     
     model.fit(X, y_train)
     metrics = calculate_metrics(y, y_pred, model_name='Ridge')
+    if pruned:
+        metrics['Pruned'] = '; '.join(pruned)
     return {'X': X, 'y': y, 'y_predicted': y_pred, 'model': model, 'metrics': metrics, 'log_transform': log_transform}
 
@@ -1,14 +1,44 @@
 import pandas as pd
 import numpy as np
 
-from sklearn.model_selection import train_test_split, GridSearchCV, cross_validate, RepeatedKFold, LeaveOneOut
+from sklearn.model_selection import train_test_split, cross_validate, RepeatedKFold, LeaveOneOut
 from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.pipeline import Pipeline
 from sklearn.svm import SVR
 from sklearn.model_selection import cross_val_predict
 
-from app.utils.ml_utils import remove_outliers, calculate_metrics
+from app.utils.ml_utils import remove_outliers, calculate_metrics, get_n_jobs, cached_grid_search
+
+# SVR parameters searched by train_direction_model
+PARAM_GRID = {
+    'regressor__svr__C': [5, 10, 80, 200, 1000],
+    'regressor__svr__epsilon': [0.01],
+    'regressor__svr__gamma': ['scale', 'auto', 0.01, 0.1, 1.0],
+}
+
+# Repeated K-fold of the grid search (leave-one-out below 10 samples)
+CV_MAX_SPLITS = 5
+CV_RANDOM_STATE = 42
+
+
+def build_direction_model(predictor_name: list[str], hue_name: str = None) -> TransformedTargetRegressor:
+    """Unfitted SVR pipeline on the predictors and their log1p (one-hot hue if given)."""
+    num_cols = predictor_name + [pred + ' LOG' for pred in predictor_name]
+    transformers = [('num', StandardScaler(), num_cols)]
+    if hue_name:
+        transformers.append(('cat', OneHotEncoder(drop='first', handle_unknown='ignore'), [hue_name]))
+    
+    pre = ColumnTransformer(transformers)
+    svr = SVR(kernel='rbf')
+    pipe = Pipeline([('pre', pre), ('svr', svr)])
+    return TransformedTargetRegressor(regressor=pipe, func=np.log1p, inverse_func=np.expm1)
+
+
+def search_space(predictor_name: list[str], hue_name: str = None) -> tuple:
+    """Model, parameter grid and folds searched by train_direction_model (for fingerprints)."""
+    return (repr(build_direction_model(predictor_name, hue_name)), repr(PARAM_GRID), CV_MAX_SPLITS, CV_RANDOM_STATE)
+
 
 def train_direction_model(df: pd.DataFrame, predictor_name: list[str], target_name: str, 
                 hue_name: str = None) -> tuple[pd.DataFrame, pd.Series, pd.Series, TransformedTargetRegressor, dict]:
@@ -23,33 +53,21 @@ def train_direction_model(df: pd.DataFrame, predictor_name: list[str], target_na
     
     y = df[target_name].astype(float)
     
-    num_cols = predictor_name + [pred + ' LOG' for pred in predictor_name]
-    transformers = [('num', StandardScaler(), num_cols)]
-    if hue_name:
-        transformers.append(('cat', OneHotEncoder(drop='first', handle_unknown='ignore'), [hue_name]))
-    
-    pre = ColumnTransformer(transformers)
-    svr = SVR(kernel='rbf')
-    pipe = Pipeline([('pre', pre), ('svr', svr)])
-    model = TransformedTargetRegressor(regressor=pipe, func=np.log1p, inverse_func=np.expm1)
-
-    param_grid = {
-        'regressor__svr__C': [5, 10, 80, 200, 1000],
-        'regressor__svr__epsilon': [0.01],
-        'regressor__svr__gamma': ['scale', 'auto', 0.01, 0.1, 1.0],
-    }
+    model = build_direction_model(predictor_name, hue_name)
 
-    cv = RepeatedKFold(n_splits=min(5, len(y)//2), n_repeats=min(5, len(y)//2), random_state=42) if len(y) >= 10 else LeaveOneOut()
-    gs = GridSearchCV(model, param_grid, scoring='neg_root_mean_squared_error', cv=cv, n_jobs=-1, refit=True)
-    gs.fit(X, y)
+    n_splits = min(CV_MAX_SPLITS, len(y)//2)
+    cv = RepeatedKFold(n_splits=n_splits, n_repeats=n_splits, random_state=CV_RANDOM_STATE) if len(y) >= 10 else LeaveOneOut()
+    best_model, pruned = cached_grid_search(model, PARAM_GRID, X, y, list(cv.split(X, y)), scoring='neg_root_mean_squared_error')
 
-    cv_simple = RepeatedKFold(n_splits=min(5, len(y)//2), n_repeats=1, random_state=42) if len(y) >= 10 else LeaveOneOut()
-    y_oof = cross_val_predict(gs.best_estimator_, X, y, cv=cv_simple, n_jobs=-1)
+    cv_simple = RepeatedKFold(n_splits=n_splits, n_repeats=1, random_state=CV_RANDOM_STATE) if len(y) >= 10 else LeaveOneOut()
+    y_oof = cross_val_predict(best_model, X, y, cv=cv_simple, n_jobs=get_n_jobs())
     metrics = calculate_metrics(y, y_oof, model_name='SVR', include_rmsle=True)
+    if pruned:
+        metrics['Pruned'] = '; '.join(pruned)
     X_return = X.copy()
     for col in ['LONGITUD KM', 'ALCANCE']:
         if col in df.columns and col not in X_return.columns:
             X_return[col] = df[col]
     
-    return {'X': X_return, 'y': y, 'y_predicted': y_oof, 'model': gs.best_estimator_, 'metrics': metrics, 'log_transform': 'output'}
+    return {'X': X_return, 'y': y, 'y_predicted': y_oof, 'model': best_model, 'metrics': metrics, 'log_transform': 'output'}
 
@@ -1,12 +1,11 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import LeaveOneOut, cross_val_predict
 from sklearn.compose import TransformedTargetRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 
-from app.utils.ml_utils import remove_outliers, calculate_metrics
+from app.utils.ml_utils import remove_outliers, calculate_metrics, loo_predict
 
 
 def prepare_geotecnia_data(df_vp: pd.DataFrame) -> pd.DataFrame:
@@ -27,30 +26,37 @@ def prepare_geotecnia_data(df_vp: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def train_geotecnia_model(df: pd.DataFrame, features: list[str], target: str = '3 - GEOLOGÍA') -> dict:
-
-    # Remove outliers
-    df_clean = remove_outliers(df[features + [target]], target=target)
-    
-    X = df_clean[features]
-    y = df_clean[target]
-    
-    # Create pipeline with scaling and linear regression
+def build_geotecnia_model() -> TransformedTargetRegressor:
+    """Unfitted scaled linear regression with log1p target."""
     pipe = Pipeline([
         ('scaler', StandardScaler()),
         ('model', LinearRegression())
     ])
-    
-    # Wrap with log transformation on target
-    trained_model = TransformedTargetRegressor(
+    return TransformedTargetRegressor(
         regressor=pipe,
         func=np.log1p,
         inverse_func=np.expm1
     )
+
+
+def search_space() -> tuple:
+    """Model trained by train_geotecnia_model (for fingerprints)."""
+    return (repr(build_geotecnia_model()),)
+
+
+def train_geotecnia_model(df: pd.DataFrame, features: list[str], target: str = '3 - GEOLOGÍA') -> dict:
+
+    # Remove outliers
+    df_clean = remove_outliers(df[features + [target]], target=target)
+    
+    X = df_clean[features]
+    y = df_clean[target]
+    
+    # Scaled linear regression with log transformation on target
+    trained_model = build_geotecnia_model()
     
     # Cross-validation with Leave-One-Out
-    loo = LeaveOneOut()
-    y_pred = cross_val_predict(trained_model, X, y, cv=loo)
+    y_pred = loo_predict(trained_model, X, y)
     metrics = calculate_metrics(y, y_pred, model_name="Linear Regression")
     trained_model.fit(X, y)
     
@@ -1,11 +1,10 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import LeaveOneOut, cross_val_predict
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 
-from app.utils.ml_utils import remove_outliers, calculate_metrics
+from app.utils.ml_utils import remove_outliers, calculate_metrics, loo_predict
 
 
 def prepare_paisajismo_data(df_vp: pd.DataFrame) -> pd.DataFrame:
@@ -17,6 +16,11 @@ def prepare_paisajismo_data(df_vp: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def search_space() -> tuple:
+    """Model trained by train_paisajismo_model (for fingerprints)."""
+    return (repr(LinearRegression()),)
+
+
 def train_paisajismo_model(df: pd.DataFrame, features: list[str], target: str = '10 - URBANISMO Y PAISAJISMO') -> dict:
     
     df = df[df[target] > 0]
@@ -37,8 +41,7 @@ def train_paisajismo_model(df: pd.DataFrame, features: list[str], target: str =
         trained_model.fit(X, y)
         y_pred = trained_model.predict(X)
     else:
-        loo = LeaveOneOut()
-        y_pred = cross_val_predict(trained_model, X, y, cv=loo)
+        y_pred = loo_predict(trained_model, X, y)
         trained_model.fit(X, y)
     
     metrics = calculate_metrics(y, y_pred, model_name="Linear Regression")
@@ -0,0 +1,98 @@
+"""
+Model Preload - Load every phase artifact before gunicorn forks its workers
+
+Without preload, each worker loads its own copy of the models on its first
+prediction. With preload (MODELS_PRELOAD=true, or wsgi.py with gunicorn's
+preload_app) the master loads them once in create_app and the forked workers
+inherit them:
+
+- Serving artifact arrays are memory-mapped .npy files, so their pages live in
+  the page cache and are shared by every process.
+- Everything else loaded before the fork (manifests, pickle fallbacks, phase
+  descriptors) is shared copy-on-write. gc.freeze() moves those objects out of
+  the collector's generations, so garbage collections in the workers do not
+  write to (and therefore copy) their pages.
+
+Database connections opened while preloading are closed before returning, so
+workers never share a SQLite connection with the master.
+"""
+
+import gc
+import time
+from typing import Any, Dict, Optional
+
+from app.models import db, Fase
+from app.utils.memory import process_memory
+
+
+# Report of the preload run in this process (inherited by forked workers)
+_last_preload: Optional[Dict[str, Any]] = None
+
+
+def preload_models(app, warmup: bool = False) -> Dict[str, Any]:
+    """
+    Load the models of every supported phase into the process-wide model registry.
+
+    Args:
+        app: Flask application
+        warmup: Also run the warm-up (item trees and one synthetic prediction
+            per phase, see model_warmup) before the fork
+
+    Returns:
+        Report with per-phase status, elapsed time and the memory of the
+        process before and after loading
+    """
+    global _last_preload
+    from app.services.model_service import ModelService
+
+    start = time.perf_counter()
+    memory_before = process_memory()
+    fases = []
+
+    with app.app_context():
+        adapter = ModelService().adapter
+        try:
+            for fase in Fase.query.all():
+                try:
+                    fase_code = adapter._map_fase_id_to_code(fase.id)
+                except ValueError:
+                    # Phase not supported for predictions
+                    continue
+
+                try:
+                    loaded = adapter.load_models(fase.id) is not None
+                    error = None
+                except Exception as e:
+                    loaded = False
+                    error = str(e)
+
+                fases.append({'fase_id': fase.id, 'fase': fase_code, 'loaded': loaded, 'error': error})
+                print(f"Preload Fase {fase_code} (ID: {fase.id}): {'Loaded' if loaded else 'Not available'}")
+        except Exception as e:
+            print(f"Error preloading models: {e}")
+        finally:
+            db.session.remove()
+
+    if warmup:
+        from app.services.model_warmup import run_warmup
+        run_warmup(app)
+
+    with app.app_context():
+        db.engine.dispose()
+
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+    _last_preload = {
+        'fases': fases,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+        'memory_before': memory_before,
+        'memory_after': process_memory()
+    }
+    return _last_preload
+
+
+def get_preload_report() -> Optional[Dict[str, Any]]:
+    """Get the report of the preload run (None if models were not preloaded)."""
+    return _last_preload
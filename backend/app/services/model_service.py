@@ -2,8 +2,11 @@
 Model Service - Business logic for ML model management
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List
 from app.adapters.model_adapter import PhaseModelManager, LegacyModelAdapter
+from app.services.prediction_cache import prediction_cache
+from app.services.uf_schema import UFBatch
+from app.utils.timing import span
 from app.models import Fase
 
 
@@ -26,18 +29,77 @@ class ModelService:
         """
         return self.adapter.load_models(fase_id)
     
-    def train_models(self, fase_id: int) -> Dict[str, Any]:
+    def get_model_version(self, fase_id: int) -> Optional[str]:
+        """
+        Get the version of the stored models for a phase
+        
+        Args:
+            fase_id: Phase ID from database
+            
+        Returns:
+            Version string or None if unknown
+        """
+        return self.adapter.get_model_version(fase_id)
+    
+    def predict_batch(
+        self,
+        fase_id: int,
+        models: Dict[str, Any],
+        batch: UFBatch,
+        model_version: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Predict many functional units, reusing cached results of unchanged UFs
+        
+        Args:
+            fase_id: Phase ID from database
+            models: Trained models dictionary
+            batch: Functional units as feature columns (see uf_schema)
+            model_version: Version of the artifact the models were loaded from.
+                Must be read before loading the models; None disables the cache.
+            
+        Returns:
+            List with one predictions dict per UF, in the same order
+        """
+        if model_version is None:
+            return self.adapter.predict_batch(fase_id=fase_id, models=models, batch=batch)
+        
+        with span('predict.cache_lookup'):
+            keys = batch.feature_keys()
+            cached = prediction_cache.get_many(fase_id, model_version, keys)
+        
+        # Predict each distinct missing scenario once
+        missing = {}
+        for index, key in enumerate(keys):
+            if key not in cached and key not in missing:
+                missing[key] = index
+        if missing:
+            predictions = self.adapter.predict_batch(
+                fase_id=fase_id,
+                models=models,
+                batch=batch.take(list(missing.values()))
+            )
+            computed = dict(zip(missing.keys(), predictions))
+            with span('predict.cache_store'):
+                prediction_cache.set_many(fase_id, model_version, computed)
+            cached.update(computed)
+        
+        # Copies, so callers can't modify cached entries
+        return [dict(cached[key]) for key in keys]
+    
+    def train_models(self, fase_id: int, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
         """
         Train models for a phase
         
         Args:
             fase_id: Phase ID from database
+            progress_callback: Optional function(completed, total, target) called after each target
             
         Returns:
             Dictionary with training results and metadata
         """
         # Train using fase_id (adapter handles mapping)
-        result = self.adapter.train_models(fase_id)
+        result = self.adapter.train_models(fase_id, progress_callback=progress_callback)
         
         # Get fase code for response
         fase_code = self.adapter._map_fase_id_to_code(fase_id)
@@ -50,6 +112,9 @@ class ModelService:
             summary_df=result.get('summary_df')
         )
         
+        # The new artifact has a new version; drop results of the previous one
+        prediction_cache.invalidate(fase_id)
+        
         return {
             'fase': fase_code,
             'fase_id': fase_id,
@@ -150,6 +215,9 @@ class ModelService:
                     'mape': row.get('MAPE (%)', 0),
                     'n_samples': row.get('n_samples', 0)
                 })
+                # Halving mode records the pruned candidates
+                if isinstance(row.get('Pruned'), str):
+                    training_summary[item_name][-1]['pruned'] = row['Pruned']
             
             print(f"Training summary has metrics for {len(training_summary)} items")
         
@@ -0,0 +1,265 @@
+"""
+Model Warm-up - Pay the cost of the first prediction before traffic arrives
+
+The first prediction of a process loads the phase artifacts, builds the item
+trees and item -> model indexes and runs code paths (pandas, NumPy, Flask JSON)
+for the first time. With MODELS_WARMUP=true, create_app does all of this for
+every supported phase, ending with one synthetic prediction per phase:
+
+- In a background thread, so the server starts accepting requests at once.
+- Synchronously in the master when models are preloaded (wsgi.py), so forked
+  workers start warm.
+
+/api/v1/health/ready reports the warm-up status and the per-phase model status.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.models import Fase
+
+
+# Synthetic functional unit used to exercise each phase's prediction path
+WARMUP_UNIDAD_FUNCIONAL = {
+    'numero': 1,
+    'longitud_km': 10,
+    'puentes_vehiculares_und': 1,
+    'puentes_vehiculares_mt2': 800,
+    'puentes_peatonales_und': 1,
+    'puentes_peatonales_mt2': 50,
+    'tuneles_und': 0,
+    'tuneles_km': 0,
+}
+
+
+class WarmupState:
+    """
+    Status of the warm-up of this process.
+
+    status: 'disabled' (never started), 'running', 'completed' or 'failed'.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.status = 'disabled'
+            self.started_at: Optional[str] = None
+            self.finished_at: Optional[str] = None
+            self.elapsed_ms: Optional[float] = None
+            self.error: Optional[str] = None
+            self.fases: List[Dict[str, Any]] = []
+
+    def start(self) -> bool:
+        """Mark the warm-up as running. Returns False if it already started."""
+        with self._lock:
+            if self.status != 'disabled':
+                return False
+            self.status = 'running'
+            self.started_at = datetime.utcnow().isoformat()
+            return True
+
+    def add_fase(self, fase_status: Dict[str, Any]) -> None:
+        with self._lock:
+            self.fases.append(fase_status)
+
+    def finish(self, elapsed_ms: float, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.status = 'failed' if error else 'completed'
+            self.finished_at = datetime.utcnow().isoformat()
+            self.elapsed_ms = round(elapsed_ms, 1)
+            self.error = error
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'status': self.status,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'elapsed_ms': self.elapsed_ms,
+                'error': self.error,
+                'fases': [dict(fase) for fase in self.fases]
+            }
+
+
+# Warm-up of this process
+warmup_state = WarmupState()
+
+# App of the running background warm-up (restarted in forked children)
+_background_app = None
+
+
+def _warmup_fase(prediction_service, fase: Fase) -> Optional[Dict[str, Any]]:
+    """
+    Warm up one phase: models, item tree and one synthetic prediction.
+
+    Returns:
+        Phase status dict, or None if the phase is not supported for predictions
+    """
+    from app.services.fase_item_tree import get_fase_item_tree
+
+    adapter = prediction_service.model_service.adapter
+    try:
+        fase_code = adapter._map_fase_id_to_code(fase.id)
+    except ValueError:
+        return None
+
+    fase_status = {
+        'fase_id': fase.id,
+        'fase': fase_code,
+        'status': 'ready',
+        'model_version': None,
+        'load_ms': None,
+        'prediction_ms': None,
+        'error': None
+    }
+
+    try:
+        start = time.perf_counter()
+        fase_status['model_version'] = prediction_service.model_service.get_model_version(fase.id)
+        model_data = prediction_service.model_service.load_models(fase.id)
+        get_fase_item_tree(fase.id)
+        fase_status['load_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+        if not model_data:
+            fase_status['status'] = 'not_trained'
+            return fase_status
+
+        start = time.perf_counter()
+        prediction_service.predict_cost({
+            'proyecto_nombre': 'warm-up',
+            'fase_id': fase.id,
+            'ubicacion': '',
+            'unidades_funcionales': [
+                dict(WARMUP_UNIDAD_FUNCIONAL, alcance=_any_alcance(model_data['models']))
+            ]
+        })
+        fase_status['prediction_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+    except Exception as e:
+        fase_status['status'] = 'error'
+        fase_status['error'] = str(e)
+
+    return fase_status
+
+
+def _any_alcance(models: Dict[str, Any]) -> str:
+    """An alcance with trained models, so the synthetic prediction evaluates them."""
+    for result in models.values():
+        if isinstance(result, dict) and isinstance(result.get('models'), dict):
+            for alcance in result['models']:
+                return alcance
+    return ''
+
+
+def run_warmup(app) -> Dict[str, Any]:
+    """
+    Warm up every supported phase in the calling thread.
+
+    Args:
+        app: Flask application
+
+    Returns:
+        Warm-up status snapshot (see WarmupState)
+    """
+    if not warmup_state.start():
+        return warmup_state.snapshot()
+
+    from app.models import db
+    from app.services.prediction_service import PredictionService
+
+    start = time.perf_counter()
+    error = None
+    with app.app_context():
+        try:
+            prediction_service = PredictionService()
+            for fase in Fase.query.all():
+                fase_status = _warmup_fase(prediction_service, fase)
+                if fase_status is not None:
+                    warmup_state.add_fase(fase_status)
+                    print(f"Warm-up Fase {fase_status['fase']} (ID: {fase.id}): {fase_status['status']}")
+        except Exception as e:
+            print(f"Error warming up models: {e}")
+            error = str(e)
+        finally:
+            db.session.remove()
+
+    warmup_state.finish((time.perf_counter() - start) * 1000, error)
+    return warmup_state.snapshot()
+
+
+def start_warmup(app) -> None:
+    """
+    Start the warm-up in a background daemon thread.
+
+    Args:
+        app: Flask application
+    """
+    global _background_app
+    from sqlalchemy.orm import configure_mappers
+
+    # A fork while the thread configures the ORM mappers would leave them
+    # half-configured in the child (gunicorn preload_app with run:app)
+    configure_mappers()
+
+    _background_app = app
+    threading.Thread(target=run_warmup, args=(app,), name='model-warmup', daemon=True).start()
+
+
+def readiness() -> Dict[str, Any]:
+    """
+    Get the readiness of this process (requires an app context).
+
+    The process is ready when the warm-up finished (even with failed phases,
+    which would fail the same way on demand) or when warm-up is disabled.
+    Without warm-up, the phases report whether a trained model exists.
+
+    Returns:
+        {'ready': bool, 'status': str, 'warmup': {...}, 'fases': [...]}
+    """
+    warmup = warmup_state.snapshot()
+    fases = warmup.pop('fases')
+
+    if warmup['status'] == 'disabled':
+        from app.services.model_service import ModelService
+        adapter = ModelService().adapter
+        for fase in Fase.query.all():
+            try:
+                fase_code = adapter._map_fase_id_to_code(fase.id)
+            except ValueError:
+                continue
+            model_version = adapter.get_model_version(fase.id)
+            fases.append({
+                'fase_id': fase.id,
+                'fase': fase_code,
+                'status': 'available' if model_version else 'not_trained',
+                'model_version': model_version
+            })
+
+    ready = warmup['status'] != 'running'
+    if not ready:
+        status = 'warming_up'
+    elif warmup['status'] == 'failed' or any(fase['status'] == 'error' for fase in fases):
+        status = 'degraded'
+    else:
+        status = 'ready'
+
+    return {'ready': ready, 'status': status, 'warmup': warmup, 'fases': fases}
+
+
+def _restart_after_fork() -> None:
+    """Threads do not survive fork: restart an unfinished warm-up in the child."""
+    # The lock may have been held by the parent's warm-up thread
+    warmup_state._lock = threading.Lock()
+    if _background_app is not None and warmup_state.status == 'running':
+        warmup_state.reset()
+        start_warmup(_background_app)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -1,10 +1,16 @@
-from app.services.ml.ml_direction import train_direction_model
-from app.services.ml.ml_geotecnia import train_geotecnia_model, prepare_geotecnia_data
-from app.services.ml.ml_bridges_structures import train_brindges_structures_model
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.services.ml.ml_direction import train_direction_model, search_space as direction_search_space
+from app.services.ml.ml_geotecnia import train_geotecnia_model, prepare_geotecnia_data, search_space as geotecnia_search_space
+from app.services.ml.ml_bridges_structures import train_brindges_structures_model, search_space as bridges_structures_search_space
 from app.services.ml.ml_tunnels import train_tunnel_model
-from app.services.ml.ml_paisajismo import train_paisajismo_model, prepare_paisajismo_data
-from app.services.ml.ml_cantidades_socioeconomica import train_cantidades_model
+from app.services.ml.ml_paisajismo import train_paisajismo_model, prepare_paisajismo_data, search_space as paisajismo_search_space
+from app.services.ml.ml_cantidades_socioeconomica import train_cantidades_model, search_space as cantidades_search_space
 from app.utils import ml_utils
+from app.utils.cv_cache import cv_cache
+from app.utils.target_graph import TargetGraph, TargetInput, TargetSpec
+from app.utils.timing import span
 import pandas as pd
 import numpy as np
 
@@ -27,6 +33,8 @@ def create_results_dataframe(results: dict) -> pd.DataFrame:
                     'n_samples': row.get('n_samples', np.nan),
                     'log_transform': row.get('log_transform', 'none')
                 })
+                if isinstance(row.get('Pruned'), str):
+                    rows[-1]['Pruned'] = row['Pruned']
         elif 'metrics' in result and isinstance(result['metrics'], dict):
             rows.append({
                 'Target': target,
@@ -39,14 +47,471 @@ def create_results_dataframe(results: dict) -> pd.DataFrame:
                 'n_samples': len(result.get('y', [])),
                 'log_transform': result.get('log_transform', 'none')
             })
+            if isinstance(result['metrics'].get('Pruned'), str):
+                rows[-1]['Pruned'] = result['metrics']['Pruned']
     return pd.DataFrame(rows)
 
+FASE_III_BASIC_TARGETS = ['1 - TRANSPORTE', '2.1 - INFORMACIÓN GEOGRÁFICA', '2.2 - TRAZADO Y DISEÑO GEOMÉTRICO',
+                          '2.3 - SEGURIDAD VIAL', '2.4 - SISTEMAS INTELIGENTES', '5 - TALUDES', '6 - PAVIMENTO',
+                          '7 - SOCAVACIÓN', '11 - PREDIAL', '12 - IMPACTO AMBIENTAL', '15 - OTROS - MANEJO DE REDES']
+
+# Targets predicted from other targets or from bridge/tunnel quantities
+FASE_III_CHAINED_TARGETS = ['16 - DIRECCIÓN Y COORDINACIÓN', '3 - GEOLOGÍA', '4 - SUELOS', '8 - ESTRUCTURAS',
+                            '9 - TÚNELES', '10 - URBANISMO Y PAISAJISMO', '13 - CANTIDADES']
+
+# Fase I and Fase II targets are predicted from LONGITUD KM with one model per alcance
+FASE_I_TARGETS = ['1 - TRANSPORTE', '2 - DISEÑO GEOMÉTRICO', '3 - PREFACTIBILIDAD TÚNELES', '4 - GEOLOGIA',
+                  '5 - GEOTECNIA', '6 - HIDROLOGÍA E HIDRÁULICA', '7 - AMBIENTAL Y SOCIAL', '8 - PREDIAL',
+                  '9 - RIESGOS Y SOSTENIBILIDAD', '10 - EVALUACIÓN ECONÓMICA', '11 - SOCIO ECONÓMICA, FINANCIERA',
+                  '12 - ESTRUCTURAS', '13 - DIRECCIÓN Y COORDINACIÓN']
+
+FASE_II_TARGETS = ['1 - TRANSPORTE', '2 - TRAZADO Y TOPOGRAFIA (incluye subcomponentes)',
+                   '3 - GEOLOGÍA (incluye subcomponentes)', '8 - PAVIMENTO', '9 - PREDIAL', '10 - AMBIENTAL Y SOCIAL',
+                   '11 - COSTOS Y PRESUPUESTOS', '12 - SOCIOECONÓMICA', '13 - DIRECCIÓN Y COORDINACIÓN']
+
+# Prediction parameter name -> training column name
+FEATURE_COLUMNS = {
+    'codigo': 'CÓDIGO',
+    'longitud_km': 'LONGITUD KM',
+    'puentes_vehiculares_und': 'PUENTES VEHICULARES UND',
+    'puentes_vehiculares_m2': 'PUENTES VEHICULARES M2',
+    'puentes_peatonales_und': 'PUENTES PEATONALES UND',
+    'puentes_peatonales_m2': 'PUENTES PEATONALES M2',
+    'tuneles_und': 'TUNELES UND',
+    'tuneles_km': 'TUNELES KM',
+    'alcance': 'ALCANCE'
+}
+
+
+# Predictions of the basic targets used as predictors by 16 - DIRECCIÓN and 3 - GEOLOGÍA
+FASE_III_CHAINED_PREDICTORS = ['2.2 - TRAZADO Y DISEÑO GEOMÉTRICO', '5 - TALUDES', '7 - SOCAVACIÓN']
+
+
+def longitud_target_specs(targets: list[str]) -> list[TargetSpec]:
+    """Specs of targets predicted from LONGITUD KM with one model per alcance."""
+    return [
+        TargetSpec(target, inputs=(TargetInput('LONGITUD KM', 'entry'),), per_alcance=True)
+        for target in targets
+    ]
+
+
+# How each Fase III target is predicted (inputs in training order, gates as trained)
+FASE_III_TARGET_GRAPH = TargetGraph(
+    longitud_target_specs(FASE_III_BASIC_TARGETS) + [
+        TargetSpec(
+            '16 - DIRECCIÓN Y COORDINACIÓN',
+            inputs=tuple(TargetInput(col) for col in FASE_III_CHAINED_PREDICTORS) + tuple(
+                TargetInput(col, 'log1p', name=col + ' LOG') for col in FASE_III_CHAINED_PREDICTORS
+            ),
+            as_frame=True
+        ),
+        TargetSpec(
+            '3 - GEOLOGÍA',
+            inputs=tuple(TargetInput(col) for col in FASE_III_CHAINED_PREDICTORS),
+            as_frame=True
+        ),
+        TargetSpec(
+            '4 - SUELOS',
+            # log_transform='both': inputs need log transform, the regressor inverts the output
+            inputs=(TargetInput('PUENTES VEHICULARES UND', 'log1p'), TargetInput('PUENTES VEHICULARES M2', 'log1p')),
+            gate=(('PUENTES VEHICULARES UND > 0', 'PUENTES VEHICULARES M2 > 0'), ('PUENTES PEATONALES UND > 0',))
+        ),
+        TargetSpec(
+            '8 - ESTRUCTURAS',
+            inputs=(TargetInput('PUENTES VEHICULARES UND'),),
+            gate=(('PUENTES VEHICULARES UND > 0', 'PUENTES VEHICULARES M2 > 0'),)
+        ),
+        TargetSpec(
+            '9 - TÚNELES',
+            inputs=(TargetInput('4 - SUELOS', 'log1p'), TargetInput('TUNELES KM', 'log1p')),
+            gate=(('TUNELES KM > 0',),)
+        ),
+        TargetSpec(
+            '10 - URBANISMO Y PAISAJISMO',
+            inputs=(TargetInput('PUENTES PEATONALES UND'),),
+            gate=(('PUENTES PEATONALES UND > 0', 'PUENTES PEATONALES M2 > 0'),)
+        ),
+        TargetSpec(
+            '13 - CANTIDADES',
+            inputs=(TargetInput('PUENTES VEHICULARES UND'), TargetInput('PUENTES VEHICULARES M2'),
+                    TargetInput('PUENTES PEATONALES UND')),
+            gate=(('PUENTES VEHICULARES UND > 0', 'PUENTES VEHICULARES M2 > 0', 'PUENTES PEATONALES UND > 0'),)
+        ),
+    ]
+)
+
+
+# Phases whose targets are not all per-alcance LONGITUD KM models
+PHASE_TARGET_GRAPHS = {'III': FASE_III_TARGET_GRAPH}
+
+# Trained target list -> graph, for the other phases
+_longitud_graphs: dict[tuple, TargetGraph] = {}
+
+
+def get_target_graph(fase: str, models: dict) -> TargetGraph:
+    """
+    Get the target graph used to predict a phase.
+
+    Phases without a declared graph are predicted from their trained target
+    list: every per-alcance model in models becomes a LONGITUD KM target.
+
+    Args:
+        fase: Phase code ('I', 'II', 'III')
+        models: Trained models dictionary
+
+    Returns:
+        TargetGraph (shared, read-only)
+    """
+    graph = PHASE_TARGET_GRAPHS.get(fase)
+    if graph is not None:
+        return graph
+
+    targets = tuple(
+        target for target, result in models.items()
+        if isinstance(result, dict) and isinstance(result.get('models'), dict)
+    )
+    graph = _longitud_graphs.get(targets)
+    if graph is None:
+        graph = TargetGraph(longitud_target_specs(list(targets)))
+        _longitud_graphs[targets] = graph
+    return graph
+
+
+def build_feature_frame(rows: list[dict]) -> pd.DataFrame:
+    """Build the feature matrix for batch prediction from prediction parameter dicts."""
+    return pd.DataFrame({
+        column: [row.get(param, '' if param in ('codigo', 'alcance') else 0) for row in rows]
+        for param, column in FEATURE_COLUMNS.items()
+    })
+
+
+def predictions_to_rows(predictions: dict, n_rows: int) -> list[dict]:
+    """
+    Convert {target: array} into one {target: value} dict per row.
+    Missing (NaN) and negative predictions are reported as None.
+    """
+    rows = [{} for _ in range(n_rows)]
+    for target, values in predictions.items():
+        values = np.asarray(values, dtype=float)
+        # Convert the whole column at once instead of testing numpy scalars per row
+        invalid = (np.isnan(values) | (values < 0)).tolist()
+        for row, value, is_invalid in zip(rows, values.tolist(), invalid):
+            row[target] = None if is_invalid else value
+    return rows
+
+
+# Training: each target is trained by a module-level function(df_vp, target)
+# that only reads df_vp columns, so targets are independent tasks (the chained
+# targets use other targets' costs as data, not their fitted models)
+
+def _train_longitud_target(df_vp: pd.DataFrame, target: str, reuse: dict = None) -> dict:
+    """
+    One model per alcance on LONGITUD KM (best log transformation).
+    Alcances in reuse ({alcance: previous result}) are not trained again.
+    """
+    linear_depedent_results = ml_utils.train_models_by_alcance_and_transform(df_vp, ['LONGITUD KM'], target, 'ALCANCE', min_samples=3, reuse=reuse)
+    return ml_utils.consolidate_results_by_alcance(linear_depedent_results)
+
+
+# Predictors and options of the Fase III trainers that are not per-alcance
+# LONGITUD KM models (part of their fingerprint, see training_fingerprint)
+FASE_III_CHAINED_OPTIONS = {
+    '16 - DIRECCIÓN Y COORDINACIÓN': {'predictors': FASE_III_CHAINED_PREDICTORS},
+    '3 - GEOLOGÍA': {'predictors': FASE_III_CHAINED_PREDICTORS},
+    '4 - SUELOS': {'predictors': ['PUENTES VEHICULARES UND', 'PUENTES VEHICULARES M2'], 'log_transform': 'both'},
+    '8 - ESTRUCTURAS': {'predictors': ['PUENTES VEHICULARES UND'], 'use_log_transform': False},
+    '9 - TÚNELES': {'predictors': ['4 - SUELOS', 'TUNELES KM'], 'log_transform': 'both'},
+    '10 - URBANISMO Y PAISAJISMO': {'predictors': ['PUENTES PEATONALES UND']},
+    '13 - CANTIDADES': {'predictors': ['PUENTES VEHICULARES UND', 'PUENTES VEHICULARES M2', 'PUENTES PEATONALES UND'],
+                        'log_transform': 'none'},
+}
+
+
+def _train_direction_target(df_vp: pd.DataFrame, target: str) -> dict:
+    """Coordination model (uses other targets as predictors)."""
+    df = df_vp[['LONGITUD KM', 'ALCANCE']].join(df_vp.loc[:, '1 - TRANSPORTE':])
+    return train_direction_model(df, FASE_III_CHAINED_OPTIONS[target]['predictors'], target)
+
+
+def _train_geotecnia_target(df_vp: pd.DataFrame, target: str) -> dict:
+    return train_geotecnia_model(prepare_geotecnia_data(df_vp), FASE_III_CHAINED_OPTIONS[target]['predictors'], target)
+
+
+def _train_suelos_target(df_vp: pd.DataFrame, target: str) -> dict:
+    # return train_brindges_structures_model(df_vp, target, ['PUENTES VEHICULARES M2'], exclude_codes=['0654801'], use_log_transform=True)
+    options = FASE_III_CHAINED_OPTIONS[target]
+    df_clean = df_vp[(df_vp[target] > 0) & (((df_vp['PUENTES VEHICULARES UND'] > 0) &
+                                             (df_vp['PUENTES VEHICULARES M2'] > 0)) | (df_vp['PUENTES PEATONALES UND'] > 0))]
+    df_grouped = ml_utils.get_bridges_structures_tunnels(df_clean, target)
+    X, y, y_pred, model, metrics = ml_utils.train_multiple_models(df_grouped, options['predictors'], target, log_transform=options['log_transform'])
+    return {'X': X, 'y': y, 'y_predicted': y_pred, 'model': model, 'metrics': metrics, 'log_transform': options['log_transform']}
+
+
+def _train_estructuras_target(df_vp: pd.DataFrame, target: str) -> dict:
+    options = FASE_III_CHAINED_OPTIONS[target]
+    return train_brindges_structures_model(df_vp, target, options['predictors'], use_log_transform=options['use_log_transform'])
+
+
+def _train_tuneles_target(df_vp: pd.DataFrame, target: str) -> dict:
+    options = FASE_III_CHAINED_OPTIONS[target]
+    X, y, y_pred, model, metrics = ml_utils.train_multiple_models(df_vp, options['predictors'], target, log_transform=options['log_transform'])
+    return {'X': X, 'y': y, 'y_predicted': y_pred, 'model': model, 'metrics': metrics, 'log_transform': options['log_transform']}
+
+
+def _train_paisajismo_target(df_vp: pd.DataFrame, target: str) -> dict:
+    return train_paisajismo_model(prepare_paisajismo_data(df_vp), FASE_III_CHAINED_OPTIONS[target]['predictors'], target)
+
+
+def _train_cantidades_target(df_vp: pd.DataFrame, target: str) -> dict:
+    options = FASE_III_CHAINED_OPTIONS[target]
+    return train_cantidades_model(df_vp, options['predictors'], target, log_transform=options['log_transform'])
+
+
+FASE_III_CHAINED_TRAINERS = {
+    '16 - DIRECCIÓN Y COORDINACIÓN': _train_direction_target,
+    '3 - GEOLOGÍA': _train_geotecnia_target,
+    '4 - SUELOS': _train_suelos_target,
+    '8 - ESTRUCTURAS': _train_estructuras_target,
+    '9 - TÚNELES': _train_tuneles_target,
+    '10 - URBANISMO Y PAISAJISMO': _train_paisajismo_target,
+    '13 - CANTIDADES': _train_cantidades_target,
+}
+
+# Models, grids and folds each chained trainer searches, from its options (for fingerprints)
+_TRAINER_SEARCH_SPACES = {
+    _train_direction_target: lambda options: direction_search_space(options['predictors']),
+    _train_geotecnia_target: lambda options: geotecnia_search_space(),
+    _train_suelos_target: lambda options: ml_utils.search_space(),
+    _train_estructuras_target: lambda options: bridges_structures_search_space(options['use_log_transform']),
+    _train_tuneles_target: lambda options: ml_utils.search_space(),
+    _train_paisajismo_target: lambda options: paisajismo_search_space(),
+    _train_cantidades_target: lambda options: cantidades_search_space(),
+}
+
+_PHASE_LONGITUD_TARGETS = {'I': FASE_I_TARGETS, 'II': FASE_II_TARGETS, 'III': FASE_III_BASIC_TARGETS}
+
+
+def training_tasks(fase: str) -> dict:
+    """
+    Trainers of a phase.
+
+    Args:
+        fase: Phase code ('I', 'II', 'III')
+
+    Returns:
+        Dict target -> function(df_vp, target), in results order
+    """
+    trainers = {target: _train_longitud_target for target in _PHASE_LONGITUD_TARGETS[fase]}
+    if fase == 'III':
+        trainers.update(FASE_III_CHAINED_TRAINERS)
+    return trainers
+
+
+def training_fingerprint(df_vp: pd.DataFrame, target: str, trainer):
+    """
+    What a target's result depends on: {alcance: fingerprint} for per-alcance
+    LONGITUD KM targets, one fingerprint of the whole df_vp for the others
+    (they group and filter df_vp in their own ways), together with their
+    options and the models, parameter grids and folds they search.
+    """
+    if trainer is _train_longitud_target:
+        return ml_utils.alcance_fingerprints(df_vp, ['LONGITUD KM'], target, 'ALCANCE', min_samples=3)
+    options = FASE_III_CHAINED_OPTIONS[target]
+    return ml_utils.data_fingerprint(
+        df_vp, target, trainer.__name__, repr(options), _TRAINER_SEARCH_SPACES[trainer](options),
+        *ml_utils.training_settings()
+    )
+
+
+def _reusable_alcances(previous: dict, fingerprints: dict) -> dict:
+    """Previous per-alcance results whose fingerprint did not change."""
+    previous_fingerprints = previous.get('fingerprint')
+    if not isinstance(previous_fingerprints, dict):
+        return {}
+    previous_results = ml_utils.split_results_by_alcance(previous)
+    return {
+        alcance: previous_results[alcance] for alcance, fingerprint in fingerprints.items()
+        if alcance in previous_results and previous_fingerprints.get(alcance) == fingerprint
+    }
+
+
+def reuse_report(results: dict, previous: dict = None) -> dict:
+    """
+    Which trained slices (target / alcance, or the target for single-model
+    targets) were reused from the previous training and which were retrained.
+
+    Args:
+        results: Trained models dictionary
+        previous: Models dictionary of the previous training (None: full retrain)
+
+    Returns:
+        Dict with the 'reused' and 'retrained' slice lists
+    """
+    report = {'reused': [], 'retrained': []}
+    for target, result in results.items():
+        fingerprint = result.get('fingerprint')
+        previous_fingerprint = ((previous or {}).get(target) or {}).get('fingerprint')
+        if isinstance(result.get('models'), dict):
+            for alcance in result['models']:
+                reused = (
+                    isinstance(fingerprint, dict) and isinstance(previous_fingerprint, dict)
+                    and alcance in previous[target].get('models', {})
+                    and previous_fingerprint.get(alcance) == fingerprint.get(alcance)
+                )
+                report['reused' if reused else 'retrained'].append(f"{target} / {alcance}")
+        else:
+            reused = previous_fingerprint is not None and previous_fingerprint == fingerprint
+            report['reused' if reused else 'retrained'].append(target)
+    return report
+
+
+def outlier_report(results: dict) -> dict:
+    """
+    Outlier decisions of the training (see ml_utils.remove_outliers), so
+    diagnostics do not have to detect them again.
+
+    Args:
+        results: Trained models dictionary
+
+    Returns:
+        Dict slice ('target / alcance', or the target for single-model
+        targets) -> {'target', 'method', 'n_samples', 'removed'}, where
+        'removed' lists the index labels of the rows left out
+    """
+    report = {}
+    for target, result in results.items():
+        if isinstance(result.get('models'), dict):
+            for alcance, entry in result['models'].items():
+                if isinstance(entry, dict) and entry.get('outliers'):
+                    report[f"{target} / {alcance}"] = entry['outliers']
+        else:
+            decisions = result.get('outliers') or []
+            for i, decision in enumerate(decisions, start=1):
+                report[target if len(decisions) == 1 else f"{target} #{i}"] = decision
+    return report
+
+
+# Training data of a target pool worker (sent once per worker)
+_worker_df_vp = None
+
+
+def _init_target_worker(df_vp: pd.DataFrame, cpu_budget: int, cv_cache_settings: tuple, selection_mode: tuple,
+                        outlier_mode: str) -> None:
+    """Pool initializer: keep the training data, cap parallelism to the worker's share and share the CV cache, selection and outlier modes."""
+    global _worker_df_vp
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=cpu_budget)
+    ml_utils.set_n_jobs(cpu_budget)
+    cv_cache.configure(*cv_cache_settings)
+    ml_utils.set_selection_mode(*selection_mode)
+    ml_utils.set_outlier_mode(outlier_mode)
+    _worker_df_vp = df_vp
+
+
+def _train_target(trainer, df_vp: pd.DataFrame, target: str, kwargs: dict) -> dict:
+    """
+    Train a target keeping its outlier decisions: in result['outliers'], or
+    in each models entry for per-alcance targets (so reused alcances keep theirs).
+    """
+    with ml_utils.recording_outliers() as decisions:
+        result = trainer(df_vp, target, **kwargs)
+    if not isinstance(result.get('models'), dict):
+        result['outliers'] = decisions
+    return result
+
+
+def _run_target_task(trainer, target: str, kwargs: dict) -> dict:
+    return _train_target(trainer, _worker_df_vp, target, kwargs)
+
+
+def run_training_tasks(df_vp: pd.DataFrame, trainers: dict, progress_callback=None, cpu_budget: int = None,
+                       previous: dict = None) -> dict:
+    """
+    Train every target, in parallel when the core budget allows it.
+
+    With a budget of one core targets are trained one after another in this
+    process. Otherwise they run in a process pool of min(budget, targets)
+    workers, each limited to its share of the budget (BLAS threads and
+    GridSearchCV n_jobs). Every trainer fixes its own seeds, so the results
+    do not depend on the execution order.
+
+    With previous results, every result is stored with its fingerprint (see
+    training_fingerprint). Targets whose fingerprint did not change are
+    taken from previous without training, and per-alcance targets only
+    train the alcances whose rows changed.
+
+    Args:
+        df_vp: Training data
+        trainers: Dict target -> function(df_vp, target) (see training_tasks)
+        progress_callback: Optional function(completed, total, target) called
+            as each target finishes
+        cpu_budget: Cores to use (defaults to ml_utils.get_cpu_budget())
+        previous: Models dictionary of the previous training to reuse
+            unchanged targets and alcances from (None trains everything)
+
+    Returns:
+        Dict target -> result, in the order of trainers
+    """
+    total = len(trainers)
+    results = {}
+
+    def report(target):
+        if progress_callback is not None:
+            progress_callback(len(results), total, target)
+
+    def store(target, result):
+        result['fingerprint'] = fingerprints[target]
+        results[target] = result
+        report(target)
+
+    fingerprints = {target: training_fingerprint(df_vp, target, trainer) for target, trainer in trainers.items()}
+    tasks = {}
+    for target, trainer in trainers.items():
+        previous_result = (previous or {}).get(target)
+        if isinstance(previous_result, dict) and previous_result.get('fingerprint') == fingerprints[target]:
+            store(target, previous_result)
+            continue
+        kwargs = {}
+        if previous_result is not None and trainer is _train_longitud_target:
+            kwargs['reuse'] = _reusable_alcances(previous_result, fingerprints[target])
+        tasks[target] = (trainer, kwargs)
+
+    budget = cpu_budget or ml_utils.get_cpu_budget()
+    workers = min(budget, len(tasks))
+
+    if workers <= 1:
+        for target, (trainer, kwargs) in tasks.items():
+            store(target, _train_target(trainer, df_vp, target, kwargs))
+        return {target: results[target] for target in trainers}
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_target_worker,
+                             initargs=(df_vp, max(1, budget // workers), cv_cache.settings(),
+                                       ml_utils.get_selection_mode(), ml_utils.get_outlier_mode())) as executor:
+        futures = {
+            executor.submit(_run_target_task, trainer, target, kwargs): target
+            for target, (trainer, kwargs) in tasks.items()
+        }
+        try:
+            for future in as_completed(futures):
+                store(futures[future], future.result())
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    return {target: results[target] for target in trainers}
+
+
 class ModelsManagement:
     def __init__(self, fase: str):
         self.fase = fase
         self.df_vp = None
         self.pv = None
         self.anual_increment = None
+        # Slices reused / retrained by the last training (see reuse_report)
+        self.reuse_report = None
+        # Outlier decisions of the last training (see outlier_report)
+        self.outlier_report = None
     
     def prepare_data(self) -> pd.DataFrame:
         self.pv = PresentValue()
@@ -55,226 +520,70 @@ class ModelsManagement:
         self.df_vp = preproccesing.create_dataset(self.pv.present_value_costs, fase=self.fase)
         return self.df_vp
 
-    def train_models(self) -> tuple[dict, pd.DataFrame]:
-        if self.fase == 'II':
-            return self.train_models_fase_II()
+    def train_models(self, progress_callback=None, previous: dict = None) -> tuple[dict, pd.DataFrame]:
+        """
+        Args:
+            progress_callback: Optional function(completed, total, target) called after each target
+            previous: Models dictionary of the previous training; unchanged
+                targets and alcances are reused from it (see run_training_tasks)
+        """
+        if self.fase == 'I':
+            return self.train_models_fase_I(progress_callback=progress_callback, previous=previous)
+        elif self.fase == 'II':
+            return self.train_models_fase_II(progress_callback=progress_callback, previous=previous)
         elif self.fase == 'III':
-            return self.train_models_fase_III()
+            return self.train_models_fase_III(progress_callback=progress_callback, previous=previous)
         else:
             raise ValueError(f"Fase {self.fase} no soportada")
 
-    def train_models_fase_II(self) -> tuple[dict, pd.DataFrame]:
-        predictors = ['LONGITUD KM']
-        hue_name = 'ALCANCE'
-        
-        targets = ['1 - TRANSPORTE', '2 - TRAZADO Y TOPOGRAFIA (incluye subcomponentes)', 
-                '3 - GEOLOGÍA (incluye subcomponentes)', '8 - PAVIMENTO', '9 - PREDIAL', '10 - AMBIENTAL Y SOCIAL',
-                '11 - COSTOS Y PRESUPUESTOS', '12 - SOCIOECONÓMICA', '13 - DIRECCIÓN Y COORDINACIÓN']
-        
-        # df = self.df_vp[['LONGITUD KM', 'ALCANCE']].join(self.df_vp.loc[:, '1 - TRANSPORTE':])
-        results = {}
-        for target in targets:
-            linear_depedent_results = ml_utils.train_models_by_alcance_and_transform(self.df_vp, predictors, target, hue_name, min_samples=3)
-            # linear_depedent_results = train_direction_model(self.df_vp, predictors, target, 'ALCANCE')
-            results[target] = ml_utils.consolidate_results_by_alcance(linear_depedent_results)
-        
+    def _train_targets(self, trainers: dict, progress_callback=None, previous: dict = None) -> tuple[dict, pd.DataFrame]:
+        """Train every target (see run_training_tasks) and build the summary."""
+        results = run_training_tasks(self.df_vp, trainers, progress_callback=progress_callback, previous=previous)
+        self.reuse_report = reuse_report(results, previous)
+        self.outlier_report = outlier_report(results)
         summary_df = create_results_dataframe(results)
         return results, summary_df
 
-    def train_models_fase_III(self) -> tuple[dict, pd.DataFrame]:
-        predictors = ['LONGITUD KM']
-        hue_name = 'ALCANCE'
-        
-        targets = ['1 - TRANSPORTE', '2.1 - INFORMACIÓN GEOGRÁFICA','2.2 - TRAZADO Y DISEÑO GEOMÉTRICO', 
-                '2.3 - SEGURIDAD VIAL', '2.4 - SISTEMAS INTELIGENTES', '5 - TALUDES', '6 - PAVIMENTO',
-                '7 - SOCAVACIÓN', '11 - PREDIAL', '12 - IMPACTO AMBIENTAL', '15 - OTROS - MANEJO DE REDES']
-        
-        # Iterate through targets and train models for each one
-        results = {}
-        for target in targets:
-            linear_depedent_results = ml_utils.train_models_by_alcance_and_transform(self.df_vp, predictors, target, hue_name, min_samples=3)
-            results[target] = ml_utils.consolidate_results_by_alcance(linear_depedent_results)
-        
-        # Train coordination model (uses other targets as predictors)
-        df = self.df_vp[['LONGITUD KM', 'ALCANCE']].join(self.df_vp.loc[:, '1 - TRANSPORTE':])
-        predictors_coord = ["2.2 - TRAZADO Y DISEÑO GEOMÉTRICO", "5 - TALUDES", "7 - SOCAVACIÓN"]
-        target_coord = '16 - DIRECCIÓN Y COORDINACIÓN'
-        results['16 - DIRECCIÓN Y COORDINACIÓN'] = train_direction_model(df, predictors_coord, target_coord)
-        
-        df_geo = prepare_geotecnia_data(self.df_vp)
-        predictors_geo = ["2.2 - TRAZADO Y DISEÑO GEOMÉTRICO", "5 - TALUDES", "7 - SOCAVACIÓN"]
-        target_geo = "3 - GEOLOGÍA"
-        results[target_geo] = train_geotecnia_model(df_geo, predictors_geo, target_geo)
-        
-        # predictors_suelos = ['PUENTES VEHICULARES M2']
-        # target_suelos = '4 - SUELOS'
-        # results[target_suelos] = train_brindges_structures_model(self.df_vp, target_suelos, predictors_suelos, exclude_codes=['0654801'], use_log_transform=True)
-
-        # predictors_suelos = ['PUENTES VEHICULARES M2']
-        # target_suelos = '4 - SUELOS'
-        # results[target_suelos] = train_brindges_structures_model(self.df_vp, target_suelos, predictors_suelos, exclude_codes=['0654801'], use_log_transform=True)
-        predictors_suelos = ['PUENTES VEHICULARES UND', 'PUENTES VEHICULARES M2']
-        target_suelos = '4 - SUELOS'
-        df_clean = self.df_vp[(self.df_vp[target_suelos] > 0) & (((self.df_vp['PUENTES VEHICULARES UND'] > 0) &
-                                                                  (self.df_vp['PUENTES VEHICULARES M2'] > 0)) | (self.df_vp['PUENTES PEATONALES UND'] > 0))]
-        df_grouped = ml_utils.get_bridges_structures_tunnels(df_clean, target_suelos)
-        X, y, y_pred, model, metrics = ml_utils.train_multiple_models(df_grouped, predictors_suelos, target_suelos, log_transform='both')
-        results[target_suelos] = {'X': X, 'y': y, 'y_predicted': y_pred, 'model': model, 'metrics': metrics, 'log_transform': 'both'}
-    
-        predictors_estructuras = ['PUENTES VEHICULARES UND']
-        target_estructuras = '8 - ESTRUCTURAS'
-        results[target_estructuras] = train_brindges_structures_model(self.df_vp, target_estructuras, predictors_estructuras, use_log_transform=False)
-        
-        predictors_tuneles = ['4 - SUELOS', 'TUNELES KM']
-        target_tuneles = '9 - TÚNELES'
-        X, y, y_pred, model, metrics = ml_utils.train_multiple_models(self.df_vp, predictors_tuneles, target_tuneles, log_transform='both')
-        results[target_tuneles] = {'X': X, 'y': y, 'y_predicted': y_pred, 'model': model, 'metrics': metrics, 'log_transform': 'both'}
-        
-        df_pais = prepare_paisajismo_data(self.df_vp)
-        predictors_pais = ['PUENTES PEATONALES UND']
-        target_pais = '10 - URBANISMO Y PAISAJISMO'
-        results[target_pais] = train_paisajismo_model(df_pais, predictors_pais, target_pais)
-        
-        predictors_cant = ['PUENTES VEHICULARES UND', 'PUENTES VEHICULARES M2', 'PUENTES PEATONALES UND']
-        target_cant = '13 - CANTIDADES'
-        results[target_cant] = train_cantidades_model(self.df_vp, predictors_cant, target_cant, log_transform='none')
-        
-        summary_df = create_results_dataframe(results)
-        return results, summary_df
+    def train_models_fase_I(self, progress_callback=None, previous: dict = None) -> tuple[dict, pd.DataFrame]:
+        return self._train_targets(training_tasks('I'), progress_callback=progress_callback, previous=previous)
+
+    def train_models_fase_II(self, progress_callback=None, previous: dict = None) -> tuple[dict, pd.DataFrame]:
+        return self._train_targets(training_tasks('II'), progress_callback=progress_callback, previous=previous)
+
+    def train_models_fase_III(self, progress_callback=None, previous: dict = None) -> tuple[dict, pd.DataFrame]:
+        return self._train_targets(training_tasks('III'), progress_callback=progress_callback, previous=previous)
 
     def predict_fase_III(self, codigo: str, longitud_km: float, puentes_vehiculares_und: int,
                          puentes_vehiculares_m2: float, puentes_peatonales_und: int,
                          puentes_peatonales_m2: float, tuneles_und: int, tuneles_km: float,
                          alcance: str, models: dict) -> dict:
-        
-        import numpy as np
-        
-        predictions = {}
-        
-        basic_targets = ['1 - TRANSPORTE', '2.1 - INFORMACIÓN GEOGRÁFICA', '2.2 - TRAZADO Y DISEÑO GEOMÉTRICO',
-                        '2.3 - SEGURIDAD VIAL', '2.4 - SISTEMAS INTELIGENTES', '5 - TALUDES', '6 - PAVIMENTO',
-                        '7 - SOCAVACIÓN', '11 - PREDIAL', '12 - IMPACTO AMBIENTAL', '15 - OTROS - MANEJO DE REDES']
-        
-        for target in basic_targets:
-            model = models.get(target).get('models')
-            
-            # Check if target exists in models and has the specific alcance
-            if model.get(alcance) is not None:
-                result = model.get(alcance)
-                
-                if result is not None:
-                    model = result['model']
-                    log_transform = result['log_transform']
-                    
-                    # Prepare input data
-                    input_value = longitud_km
-                    
-                    # Apply log transformation to input if needed
-                    if log_transform in ['input', 'both']:
-                        input_value = np.log1p(input_value)
-                    
-                    # Make prediction - TransformedTargetRegressor handles inverse transform automatically
-                    prediction = model.predict(np.array([[input_value]]))[0]
-                    
-                    predictions[target] = prediction
-                else:
-                    predictions[target] = None
-            else:
-                predictions[target] = None
-        
-        # Prepare input_data for subsequent models that need multiple predictors
-        input_data = pd.DataFrame({
-            'CÓDIGO': [codigo],
-            'LONGITUD KM': [longitud_km],
-            'PUENTES VEHICULARES UND': [puentes_vehiculares_und],
-            'PUENTES VEHICULARES M2': [puentes_vehiculares_m2],
-            'PUENTES PEATONALES UND': [puentes_peatonales_und],
-            'PUENTES PEATONALES M2': [puentes_peatonales_m2],
-            'TUNELES UND': [tuneles_und],
-            'TUNELES KM': [tuneles_km],
-            'ALCANCE': [alcance]
-        })
-        
-        # Add predicted values to input_data for models that use them as predictors
-        input_data['2.2 - TRAZADO Y DISEÑO GEOMÉTRICO'] = [predictions['2.2 - TRAZADO Y DISEÑO GEOMÉTRICO']]
-        input_data['5 - TALUDES'] = [predictions['5 - TALUDES']]
-        input_data['7 - SOCAVACIÓN'] = [predictions['7 - SOCAVACIÓN']]
-        
-        # Create LOG versions of predictors (required by train_and_calculate_metrics models)
-        # These models expect both original and log-transformed columns
-        for col in ['2.2 - TRAZADO Y DISEÑO GEOMÉTRICO', '5 - TALUDES', '7 - SOCAVACIÓN']:
-            if input_data[col][0] is not None:
-                input_data[col + ' LOG'] = np.log1p(input_data[col])
-            else:
-                input_data[col + ' LOG'] = [None]
-        
-        if '16 - DIRECCIÓN Y COORDINACIÓN' in models:
-            required_preds = ['2.2 - TRAZADO Y DISEÑO GEOMÉTRICO', '5 - TALUDES', '7 - SOCAVACIÓN']
-            if all(predictions.get(pred) is not None for pred in required_preds):
-                model_coord = models['16 - DIRECCIÓN Y COORDINACIÓN']['model']
-                coord_cols = ['2.2 - TRAZADO Y DISEÑO GEOMÉTRICO', '5 - TALUDES', '7 - SOCAVACIÓN',
-                             '2.2 - TRAZADO Y DISEÑO GEOMÉTRICO LOG', '5 - TALUDES LOG', '7 - SOCAVACIÓN LOG']
-                predictions['16 - DIRECCIÓN Y COORDINACIÓN'] = model_coord.predict(input_data[coord_cols])[0]
-            else:
-                predictions['16 - DIRECCIÓN Y COORDINACIÓN'] = None
-        
-        if '3 - GEOLOGÍA' in models:
-            required_preds = ['2.2 - TRAZADO Y DISEÑO GEOMÉTRICO', '5 - TALUDES', '7 - SOCAVACIÓN']
-            if all(predictions.get(pred) is not None for pred in required_preds):
-                model_geo = models['3 - GEOLOGÍA']['model']
-                geo_cols = ['2.2 - TRAZADO Y DISEÑO GEOMÉTRICO', '5 - TALUDES', '7 - SOCAVACIÓN']
-                predictions['3 - GEOLOGÍA'] = model_geo.predict(input_data[geo_cols])[0]
-            else:
-                predictions['3 - GEOLOGÍA'] = None
-        
-        if '4 - SUELOS' in models:
-            if (puentes_vehiculares_und > 0 and puentes_vehiculares_m2 > 0) or puentes_peatonales_und > 0:
-                model_suelos = models['4 - SUELOS']['model']
-                # Transform inputs (log_transform='both' means inputs need log transform)
-                puentes_veh_und_log = np.log1p(puentes_vehiculares_und)
-                puentes_veh_m2_log = np.log1p(puentes_vehiculares_m2)
-                # Predict - TransformedTargetRegressor automatically applies inverse transform to output
-                predictions['4 - SUELOS'] = model_suelos.predict(np.array([[puentes_veh_und_log, puentes_veh_m2_log]]))[0]
-            else:   
-                predictions['4 - SUELOS'] = None    
-        
-        if '8 - ESTRUCTURAS' in models:
-            if puentes_vehiculares_und > 0 and puentes_vehiculares_m2 > 0:
-                model_estructuras = models['8 - ESTRUCTURAS']['model']
-                predictions['8 - ESTRUCTURAS'] = model_estructuras.predict(np.array([[puentes_vehiculares_und]]))[0]
-            else:
-                predictions['8 - ESTRUCTURAS'] = None
-        
-        if '9 - TÚNELES' in models:
-            if tuneles_km > 0 and predictions.get('4 - SUELOS') is not None:
-                model_tuneles = models['9 - TÚNELES']['model']
-                # Transform inputs (log_transform='both' means inputs need log transform)
-                suelos_log = np.log1p(predictions['4 - SUELOS'])
-                tuneles_km_log = np.log1p(tuneles_km)
-                # Predict - TransformedTargetRegressor automatically applies inverse transform to output
-                predictions['9 - TÚNELES'] = model_tuneles.predict(np.array([[suelos_log, tuneles_km_log]]))[0]
-            else:
-                predictions['9 - TÚNELES'] = None
-        
-        if '10 - URBANISMO Y PAISAJISMO' in models:
-            if puentes_peatonales_und > 0 and puentes_peatonales_m2 > 0:
-                model_pais = models['10 - URBANISMO Y PAISAJISMO']['model']
-                predictions['10 - URBANISMO Y PAISAJISMO'] = model_pais.predict(np.array([[puentes_peatonales_und]]))[0]
-            else:
-                predictions['10 - URBANISMO Y PAISAJISMO'] = None
-        
-        if '13 - CANTIDADES' in models:
-            if puentes_vehiculares_und > 0 and puentes_vehiculares_m2 > 0 and puentes_peatonales_und > 0:
-                model_cant = models['13 - CANTIDADES']['model'] 
-                X_cant = np.array([[puentes_vehiculares_und, puentes_vehiculares_m2, puentes_peatonales_und]])
-                predictions['13 - CANTIDADES'] = model_cant.predict(X_cant)[0]
-                
-            else:
-                predictions['13 - CANTIDADES'] = None
-        
-        # Ensure no negative predictions
-        for key, value in predictions.items():
-            if value is not None and value < 0:
-                predictions[key] = None
-        
-        return predictions
\ No newline at end of file
+        features = build_feature_frame([{
+            'codigo': codigo,
+            'longitud_km': longitud_km,
+            'puentes_vehiculares_und': puentes_vehiculares_und,
+            'puentes_vehiculares_m2': puentes_vehiculares_m2,
+            'puentes_peatonales_und': puentes_peatonales_und,
+            'puentes_peatonales_m2': puentes_peatonales_m2,
+            'tuneles_und': tuneles_und,
+            'tuneles_km': tuneles_km,
+            'alcance': alcance
+        }])
+        return self.predict_batch(features, models)[0]
+
+    def predict_batch(self, features: pd.DataFrame, models: dict) -> list[dict]:
+        """
+        Vectorized prediction for many functional units at once, for any phase
+        (see get_target_graph).
+
+        Args:
+            features: DataFrame built with build_feature_frame (one row per UF)
+            models: Trained models dictionary
+
+        Returns:
+            List with one predictions dict per row, in the same order as features
+        """
+        stage = f'fase_{self.fase}'
+        predictions = get_target_graph(self.fase, models).predict(features, models, stage=stage)
+
+        with span(f'{stage}.to_rows'):
+            return predictions_to_rows(predictions, len(features))
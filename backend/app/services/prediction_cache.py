@@ -0,0 +1,249 @@
+"""
+Prediction Cache - Per-UF prediction results keyed by model version and features
+
+Estimators re-run the same scenarios while tweaking one functional unit at a
+time, so most UFs of a request were already predicted with the same models.
+Results are cached per UF under (fase_id, model artifact version, normalized
+feature tuple including alcance):
+
+- Memory tier: process-local LRU.
+- Persistent tier (optional): SQLite file shared by every worker, so results
+  survive restarts.
+
+A retrain writes a new artifact, which changes its version, so stale entries
+are never read; ModelService.train_models also purges the phase explicitly.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import Config
+
+
+# Prediction parameters that influence the result (codigo is informative only)
+FEATURE_PARAMS = (
+    'longitud_km',
+    'puentes_vehiculares_und',
+    'puentes_vehiculares_m2',
+    'puentes_peatonales_und',
+    'puentes_peatonales_m2',
+    'tuneles_und',
+    'tuneles_km',
+)
+
+# Maximum number of keys per SQLite "IN (...)" lookup
+_SQLITE_CHUNK = 500
+
+
+def feature_key(params: Dict[str, Any]) -> str:
+    """
+    Normalize prediction parameters into a cache key.
+
+    Numbers are compared as floats (1 and 1.0 are the same scenario). Alcance is
+    kept verbatim because models are selected by exact alcance name.
+
+    Args:
+        params: Prediction parameters (see uf_schema.UF_FIELDS)
+
+    Returns:
+        JSON string usable as a key in both tiers
+    """
+    values = [float(params.get(name) or 0) for name in FEATURE_PARAMS]
+    values.append(params.get('alcance') or '')
+    return json.dumps(values, ensure_ascii=False)
+
+
+class PredictionCache:
+    """
+    Two-tier (memory LRU + optional SQLite) cache of per-UF predictions.
+    """
+
+    def __init__(self, max_entries: int = 10000, db_path: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of UF results kept in memory
+            db_path: SQLite file for the persistent tier (None disables it)
+        """
+        self.max_entries = max(1, max_entries)
+        self.db_path = db_path
+        self._entries: "OrderedDict[Tuple[int, str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS prediction_cache ("
+                    " fase_id INTEGER NOT NULL,"
+                    " model_version TEXT NOT NULL,"
+                    " features TEXT NOT NULL,"
+                    " predictions TEXT NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " PRIMARY KEY (fase_id, model_version, features))"
+                )
+
+    def _connection(self) -> sqlite3.Connection:
+        """One SQLite connection per thread (and per process: forked workers must not reuse the master's)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, fase_id: int, model_version: str, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up cached predictions.
+
+        Args:
+            fase_id: Phase ID
+            model_version: Model artifact version
+            keys: Feature keys (see feature_key)
+
+        Returns:
+            Dict feature key -> predictions for the keys that were found
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry_key = (fase_id, model_version, key)
+                if entry_key in self._entries:
+                    self._entries.move_to_end(entry_key)
+                    found[key] = self._entries[entry_key]
+            self.memory_hits += len(found)
+
+        pending = [key for key in dict.fromkeys(keys) if key not in found]
+        if pending and self.db_path:
+            persisted = self._read_persistent(fase_id, model_version, pending)
+            if persisted:
+                # Promote to the memory tier
+                with self._lock:
+                    self.persistent_hits += len(persisted)
+                    for key, predictions in persisted.items():
+                        self._store_memory((fase_id, model_version, key), predictions)
+                found.update(persisted)
+
+        with self._lock:
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def set_many(self, fase_id: int, model_version: str, results: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Store predictions in both tiers.
+
+        Args:
+            fase_id: Phase ID
+            model_version: Model artifact version
+            results: Dict feature key -> predictions
+        """
+        with self._lock:
+            for key, predictions in results.items():
+                self._store_memory((fase_id, model_version, key), predictions)
+
+        if results and self.db_path:
+            try:
+                with self._connection() as conn:
+                    now = time.time()
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO prediction_cache "
+                        "(fase_id, model_version, features, predictions, created_at) VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (fase_id, model_version, key, json.dumps(predictions, ensure_ascii=False), now)
+                            for key, predictions in results.items()
+                        ]
+                    )
+            except sqlite3.Error as e:
+                print(f"Error writing prediction cache: {e}")
+
+    def _store_memory(self, entry_key: Tuple[int, str, str], predictions: Dict[str, Any]) -> None:
+        """Insert into the memory LRU. Caller must hold the lock."""
+        self._entries[entry_key] = predictions
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_persistent(self, fase_id: int, model_version: str, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read keys from the SQLite tier."""
+        found = {}
+        try:
+            conn = self._connection()
+            for start in range(0, len(keys), _SQLITE_CHUNK):
+                chunk = keys[start:start + _SQLITE_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    "SELECT features, predictions FROM prediction_cache "
+                    f"WHERE fase_id = ? AND model_version = ? AND features IN ({placeholders})",
+                    [fase_id, model_version, *chunk]
+                ).fetchall()
+                for features, predictions in rows:
+                    found[features] = json.loads(predictions)
+        except sqlite3.Error as e:
+            print(f"Error reading prediction cache: {e}")
+        return found
+
+    def invalidate(self, fase_id: Optional[int] = None) -> None:
+        """
+        Drop cached predictions.
+
+        Args:
+            fase_id: Phase to drop; drops everything if None
+        """
+        with self._lock:
+            if fase_id is None:
+                self._entries.clear()
+            else:
+                for entry_key in [k for k in self._entries if k[0] == fase_id]:
+                    del self._entries[entry_key]
+
+        if self.db_path:
+            try:
+                with self._connection() as conn:
+                    if fase_id is None:
+                        conn.execute("DELETE FROM prediction_cache")
+                    else:
+                        conn.execute("DELETE FROM prediction_cache WHERE fase_id = ?", (fase_id,))
+            except sqlite3.Error as e:
+                print(f"Error invalidating prediction cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            hits = self.memory_hits + self.persistent_hits
+            lookups = hits + self.misses
+            stats = {
+                'memory_hits': self.memory_hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'persistent': bool(self.db_path),
+            }
+
+        if self.db_path:
+            try:
+                stats['persistent_entries'] = self._connection().execute(
+                    "SELECT COUNT(*) FROM prediction_cache"
+                ).fetchone()[0]
+            except sqlite3.Error:
+                stats['persistent_entries'] = None
+        return stats
+
+
+# Shared by every service instance in the process
+prediction_cache = PredictionCache(
+    max_entries=Config.PREDICTION_CACHE_MAX_ENTRIES,
+    db_path=Config.PREDICTION_CACHE_DB if Config.PREDICTION_CACHE_PERSIST else None
+)
@@ -2,17 +2,32 @@
 Prediction Service - Business logic for cost prediction
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
+
+import numpy as np
+
+from app.config import Config
 from app.services.model_service import ModelService
-from app.models import FaseItemRequerido, ItemTipo, Fase
-from app.utils.item_helpers import (
-    sort_items_by_description,
-    build_parent_child_map,
-    get_parent_items,
-    calculate_parent_values
-)
+from app.models import Fase
+from app.services.fase_item_tree import FaseItemTree, get_fase_item_tree
+from app.utils.item_model_index import ItemModelIndex, get_item_model_index
+from app.utils.timing import span
 from app.services.exceptions import BadRequest, MissingItemsError
-from app.models import db
+from app.services.uf_schema import (
+    UF_FIELDS,
+    UF_FIELDS_BY_NAME,
+    UFBatch,
+    decode_field_values,
+    decode_unidad_funcional,
+    decode_unidades_funcionales
+)
+
+
+# UF fields that can be swept in /predict/sweep -> prediction parameter
+SWEEP_FIELDS = {field.name: field.param for field in UF_FIELDS}
+
+# Maximum number of swept variables (grid dimensions)
+MAX_SWEEP_VARIABLES = 2
 
 
 class PredictionService:
@@ -37,86 +52,353 @@ class PredictionService:
         Returns:
             Dictionary with prediction results
             
+        Raises:
+            BadRequest: If validation fails (ValidationError with the invalid fields)
+            MissingItemsError: If models not found
+        """
+        # 1. Validate request and decode the functional units
+        with span('predict.validate'):
+            batch = self._validate_request(request_data)
+        
+        # 2-5. Load phase, models, required items and training metrics
+        context = self._load_phase_context(request_data['fase_id'])
+        
+        # 6-7. Predict each functional unit and build the response
+        return self._predict_with_context(request_data, context, batch)
+    
+    def predict_cost_batch(self, projects: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Predict many projects, yielding one result per project as soon as it is ready.
+        
+        Phase, models, required items and training metrics are loaded once per
+        fase_id and shared by every project of the batch. Errors are reported
+        inline for the failing project and do not stop the batch.
+        
+        Args:
+            projects: List of prediction requests (same format as predict_cost)
+            
+        Yields:
+            {'index': int, 'proyecto_nombre': str, 'status': 'ok', 'resultado': {...}}
+            or {'index': int, 'proyecto_nombre': str, 'status': 'error', 'error': str}
+        """
+        contexts = {}
+        
+        for index, project in enumerate(projects):
+            line = {'index': index}
+            try:
+                if not isinstance(project, dict):
+                    raise BadRequest("Cada proyecto debe ser un objeto JSON.")
+                line['proyecto_nombre'] = project.get('proyecto_nombre', '')
+                
+                batch = self._validate_request(project)
+                fase_id = project['fase_id']
+                
+                # Cache failures too, so a missing phase or model is not reloaded per project
+                if fase_id not in contexts:
+                    try:
+                        contexts[fase_id] = self._load_phase_context(fase_id)
+                    except (BadRequest, MissingItemsError) as e:
+                        contexts[fase_id] = e
+                context = contexts[fase_id]
+                if isinstance(context, Exception):
+                    raise context
+                
+                line['resultado'] = self._predict_with_context(project, context, batch)
+                line['status'] = 'ok'
+            
+            except (BadRequest, MissingItemsError) as e:
+                line['status'] = 'error'
+                line['error'] = str(e)
+                if getattr(e, 'errors', None):
+                    line['detalles'] = e.errors
+            
+            except Exception as e:
+                print(f"Error in batch prediction (index {index}): {e}")
+                line['status'] = 'error'
+                line['error'] = f"Error al realizar la predicción: {str(e)}"
+            
+            yield line
+    
+    def predict_sweep(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Predict the cost of one functional unit over a grid of values of one or
+        two of its fields (sensitivity curves).
+        
+        Every grid point is predicted in a single batch, so each target model is
+        evaluated once per alcance for the whole grid. Results skip the
+        per-UF prediction cache, since sweep points are rarely repeated.
+        
+        Args:
+            request_data: Dictionary with sweep request data:
+                {
+                    'fase_id': int,
+                    'unidad_funcional': {...},  # base UF, same fields as /predict
+                    'variables': [
+                        {'campo': 'longitud_km', 'inicio': 1, 'fin': 50, 'pasos': 50},
+                        {'campo': 'alcance', 'valores': ['Segunda calzada', ...]}
+                    ]
+                }
+        
+        Returns:
+            Dictionary with the grid and, per point, the total cost and the cost
+            of every item (column arrays in grid order; the last variable varies
+            fastest). Costs are NumPy arrays, serialized by the app's JSON provider.
+            
         Raises:
             BadRequest: If validation fails
             MissingItemsError: If models not found
         """
-        # 1. Validate request
-        self._validate_request(request_data)
+        fase_id = request_data.get('fase_id')
+        if not fase_id:
+            raise BadRequest("El campo 'fase_id' es requerido.")
         
-        # 2. Get phase and validate it exists
-        fase_id = request_data['fase_id']
-        fase = Fase.query.get(fase_id)
+        base_uf = request_data.get('unidad_funcional')
+        if not isinstance(base_uf, dict):
+            raise BadRequest("El campo 'unidad_funcional' debe ser un objeto JSON.")
+        
+        base = decode_unidad_funcional(base_uf)
+        campos, axes = self._parse_sweep_variables(request_data.get('variables'))
+        
+        context = self._load_phase_context(fase_id)
+        
+        # Feature columns over the grid, without one parameter dict per point
+        batch = base.grid({SWEEP_FIELDS[campo]: values for campo, values in zip(campos, axes)})
+        with span('predict.models'):
+            predictions_list = self.model_service.predict_batch(
+                fase_id=fase_id,
+                models=context['models'],
+                batch=batch
+            )
+        
+        item_tree = context['item_tree']
+        item_model_index = context['item_model_index']
+        
+        # Leaf item values as arrays over the grid (missing predictions count as 0)
+        leaf_values = {}
+        for item_tipo_id, target_key in item_model_index.targets.items():
+            values = np.array(
+                [predictions.get(target_key) for predictions in predictions_list], dtype=float
+            )
+            leaf_values[item_tipo_id] = np.nan_to_num(values, nan=0.0)
+        
+        costo_total = np.zeros(len(batch))
+        for values in leaf_values.values():
+            costo_total += values
+        
+        parent_sums = item_tree.parent_sums(leaf_values)
+        zeros = np.zeros(len(batch))
+        
+        items = []
+        for node in item_tree.sorted_nodes:
+            is_parent = node.item_tipo_id in item_tree.parent_item_tipo_ids
+            if is_parent:
+                values = parent_sums[node.item_tipo_id]
+            else:
+                values = leaf_values.get(node.item_tipo_id, zeros)
+            items.append({
+                'item': node.nombre,
+                'item_tipo_id': node.item_tipo_id,
+                'is_parent': is_parent,
+                'predicted': not is_parent and node.item_tipo_id in leaf_values,
+                'causacion_estimada': np.round(values, 2)
+            })
+        
+        return {
+            'fase_id': fase_id,
+            'variables': campos,
+            'num_puntos': len(batch),
+            'grid': {campo: batch.values(SWEEP_FIELDS[campo]) for campo in campos},
+            'costo_total': np.round(costo_total, 2),
+            'items': items,
+            'items_sin_modelo': item_model_index.unmapped
+        }
+    
+    def _parse_sweep_variables(self, variables: Any) -> tuple[List[str], List[List[Any]]]:
+        """
+        Validate the swept variables and expand their values
+        
+        Each variable gives either explicit 'valores' or a numeric range
+        ('inicio', 'fin', 'pasos', endpoints included). Values are decoded like
+        the fields of a functional unit; range values of counts are truncated.
+        
+        Returns:
+            Tuple of (field names, values per field: float64 array, or list of
+            str for alcance)
+        """
+        if not isinstance(variables, list) or not 1 <= len(variables) <= MAX_SWEEP_VARIABLES:
+            raise BadRequest(
+                f"El campo 'variables' debe ser una lista con 1 a {MAX_SWEEP_VARIABLES} variables."
+            )
+        
+        campos = []
+        axes = []
+        for position, variable in enumerate(variables):
+            if not isinstance(variable, dict):
+                raise BadRequest("Cada variable debe ser un objeto JSON.")
+            
+            campo = variable.get('campo')
+            if campo not in SWEEP_FIELDS:
+                raise BadRequest(
+                    f"Variable '{campo}' no válida. Opciones: {', '.join(SWEEP_FIELDS)}."
+                )
+            if campo in campos:
+                raise BadRequest(f"La variable '{campo}' está repetida.")
+            
+            if 'valores' in variable:
+                values = variable['valores']
+                if not isinstance(values, list) or not values:
+                    raise BadRequest(f"'valores' de '{campo}' debe ser una lista no vacía.")
+                values = decode_field_values(campo, values, f"variables[{position}].valores")
+            elif campo == 'alcance':
+                raise BadRequest("La variable 'alcance' requiere una lista de 'valores'.")
+            else:
+                try:
+                    inicio = float(variable['inicio'])
+                    fin = float(variable['fin'])
+                    pasos = int(variable['pasos'])
+                except (KeyError, TypeError, ValueError):
+                    raise BadRequest(
+                        f"La variable '{campo}' requiere 'valores' o 'inicio', 'fin' y 'pasos' numéricos."
+                    )
+                if pasos < 1:
+                    raise BadRequest(f"'pasos' de '{campo}' debe ser mayor que 0.")
+                if pasos > Config.PREDICTION_SWEEP_MAX_POINTS:
+                    raise BadRequest(
+                        f"La grilla no puede superar {Config.PREDICTION_SWEEP_MAX_POINTS} puntos."
+                    )
+                values = np.linspace(inicio, fin, pasos)
+                if UF_FIELDS_BY_NAME[campo].kind == 'count':
+                    values = np.trunc(values)
+                values = decode_field_values(campo, values.tolist(), f"variables[{position}].rango")
+            
+            campos.append(campo)
+            axes.append(values)
+        
+        num_puntos = int(np.prod([len(values) for values in axes]))
+        if num_puntos > Config.PREDICTION_SWEEP_MAX_POINTS:
+            raise BadRequest(
+                f"La grilla tiene {num_puntos} puntos; el máximo es {Config.PREDICTION_SWEEP_MAX_POINTS}."
+            )
+        
+        return campos, axes
+    
+    def _load_phase_context(self, fase_id: int) -> Dict[str, Any]:
+        """
+        Load everything a prediction needs for a phase
+        
+        Returns:
+            Dictionary with 'fase', 'models', 'model_version', 'item_tree',
+            'item_model_index' and 'training_summary'
+            
+        Raises:
+            BadRequest: If the phase does not exist
+            MissingItemsError: If models not found
+        """
+        # Get phase and validate it exists
+        with span('predict.load_fase'):
+            fase = Fase.query.get(fase_id)
         if not fase:
             raise BadRequest(f"La fase con ID '{fase_id}' no fue encontrada.")
         
-        # 3. Load models (adapter handles fase_id to code mapping)
-        model_data = self.model_service.load_models(fase_id)
+        # Version is read before loading, so cached results are never attributed
+        # to a newer artifact than the one that produced them
+        with span('predict.model_version'):
+            model_version = self.model_service.get_model_version(fase_id)
+        
+        # Load models (adapter handles fase_id to code mapping)
+        with span('predict.load_models'):
+            model_data = self.model_service.load_models(fase_id)
         if not model_data:
             raise MissingItemsError(
                 f"No se encontraron modelos entrenados para la fase '{fase.nombre}'. "
                 f"Por favor, entrene los modelos primero usando el endpoint /train."
             )
         
-        models = model_data['models']
+        # Required items of this phase (cached hierarchy, sorted by description)
+        with span('predict.item_tree'):
+            item_tree = get_fase_item_tree(fase_id)
         
-        # 4. Get required items for this phase
-        items_requeridos = self._get_required_items(fase_id)
+        # Item -> model target mapping, shared while the models and items don't change
+        with span('predict.item_model_index'):
+            item_model_index = get_item_model_index(
+                fase_id=fase_id,
+                model_version=model_version,
+                items_requeridos=item_tree.sorted_nodes,
+                target_keys=model_data['models'].keys(),
+                parent_item_tipo_ids=item_tree.parent_item_tipo_ids
+            )
         
-        # 5. Parse training summary for metrics
-        training_summary = self.model_service.parse_training_summary(model_data)
+        # Parse training summary for metrics
+        with span('predict.training_summary'):
+            training_summary = self.model_service.parse_training_summary(model_data)
         
-        # 6. Process predictions for each functional unit
+        return {
+            'fase': fase,
+            'models': model_data['models'],
+            'model_version': model_version,
+            'item_tree': item_tree,
+            'item_model_index': item_model_index,
+            'training_summary': training_summary
+        }
+    
+    def _predict_with_context(
+        self,
+        request_data: Dict[str, Any],
+        context: Dict[str, Any],
+        batch: UFBatch
+    ) -> Dict[str, Any]:
+        """Predict all functional units of a request with an already loaded phase context"""
+        fase_id = request_data['fase_id']
+        
+        # Process predictions for each functional unit
         results = self._predict_for_functional_units(
             fase_id=fase_id,
-            models=models,
+            models=context['models'],
+            model_version=context['model_version'],
             unidades_funcionales=request_data['unidades_funcionales'],
-            items_requeridos=items_requeridos,
-            training_summary=training_summary
+            batch=batch,
+            item_tree=context['item_tree'],
+            item_model_index=context['item_model_index'],
+            training_summary=context['training_summary']
         )
         
-        # 7. Build final response
-        return self._build_response(
-            proyecto_nombre=request_data.get('proyecto_nombre', ''),
-            fase_id=fase_id,
-            ubicacion=request_data.get('ubicacion', ''),
-            results=results
-        )
+        # Build final response
+        with span('predict.build_response'):
+            return self._build_response(
+                proyecto_nombre=request_data.get('proyecto_nombre', ''),
+                fase_id=fase_id,
+                ubicacion=request_data.get('ubicacion', ''),
+                results=results
+            )
     
-    def _validate_request(self, data: Dict[str, Any]) -> None:
-        """Validate prediction request data"""
+    def _validate_request(self, data: Dict[str, Any]) -> UFBatch:
+        """
+        Validate prediction request data
+        
+        Returns:
+            The functional units decoded as feature columns
+        
+        Raises:
+            BadRequest: If a field is missing or invalid (ValidationError lists
+                every invalid field of the functional units)
+        """
         if not data.get('fase_id'):
             raise BadRequest("El campo 'fase_id' es requerido.")
         
         if not data.get('unidades_funcionales'):
             raise BadRequest("Debe proporcionar al menos una unidad funcional.")
-    
-    def _get_required_items(self, phase_id: int) -> List[FaseItemRequerido]:
-        """
-        Get all required items for a phase, sorted by description
         
-        Args:
-            phase_id: Phase ID
-            
-        Returns:
-            Sorted list of FaseItemRequerido objects
-        """
-        items_requeridos = (
-            db.session.query(FaseItemRequerido)
-            .filter_by(fase_id=phase_id)
-            .join(ItemTipo)
-            .all()
-        )
-        
-        # Sort items by description (1, 2, 2.1, 2.2, 3, etc.)
-        return sort_items_by_description(items_requeridos)
+        return decode_unidades_funcionales(data['unidades_funcionales'])
     
     def _predict_for_functional_units(
         self,
         fase_id: int,
         models: Dict[str, Any],
+        model_version: Optional[str],
         unidades_funcionales: List[Dict[str, Any]],
-        items_requeridos: List[FaseItemRequerido],
+        batch: UFBatch,
+        item_tree: FaseItemTree,
+        item_model_index: ItemModelIndex,
         training_summary: Dict[str, List[Dict[str, Any]]]
     ) -> Dict[str, Any]:
         """
@@ -127,37 +409,38 @@ class PredictionService:
                 - total_length: float
                 - costo_total: float
                 - resultados_por_uf: list
+                - items_sin_modelo: list of leaf items without a model
         """
-        # Build parent-child relationships
-        parent_child_map = build_parent_child_map(items_requeridos)
-        parent_item_tipo_ids = get_parent_items(items_requeridos)
-        
         results_por_uf = []
         total_length = 0.0
         costo_total_proyecto = 0.0
         
-        for uf in unidades_funcionales:
-            # Prepare prediction parameters
-            pred_params = self._prepare_prediction_params(uf)
-            uf_length = pred_params['longitud_km']
-            total_length += uf_length
-            
-            # Make prediction for this UF (adapter handles fase_id to code mapping)
-            predictions = self.model_service.adapter.predict(
+        # Predict every UF in one batch; UFs already predicted with this model
+        # version come from the cache
+        with span('predict.models'):
+            predictions_list = self.model_service.predict_batch(
                 fase_id=fase_id,
                 models=models,
-                **pred_params
+                batch=batch,
+                model_version=model_version
             )
+        
+        uf_lengths = batch.values('longitud_km')
+        uf_alcances = batch.alcance_values()
+        for uf, uf_length, uf_alcance, predictions in zip(
+            unidades_funcionales, uf_lengths, uf_alcances, predictions_list
+        ):
+            total_length += uf_length
             
             # Format items for this UF
-            items_result, uf_total_cost = self._format_items_with_predictions(
-                items_requeridos=items_requeridos,
-                predictions=predictions,
-                parent_item_tipo_ids=parent_item_tipo_ids,
-                parent_child_map=parent_child_map,
-                training_summary=training_summary,
-                uf_alcance=pred_params['alcance']
-            )
+            with span('predict.format_items'):
+                items_result, uf_total_cost = self._format_items_with_predictions(
+                    item_tree=item_tree,
+                    predictions=predictions,
+                    item_model_index=item_model_index,
+                    training_summary=training_summary,
+                    uf_alcance=uf_alcance
+                )
             
             # Calculate cost per km for this UF
             uf_cost_per_km = uf_total_cost / uf_length if uf_length > 0 else 0
@@ -168,7 +451,7 @@ class PredictionService:
             results_por_uf.append({
                 'unidad_funcional': uf.get('numero', len(results_por_uf) + 1),
                 'longitud_km': uf_length,
-                'alcance': pred_params['alcance'],
+                'alcance': uf_alcance,
                 'costo_estimado': round(uf_total_cost, 2),
                 'costo_por_km': round(uf_cost_per_km, 2),
                 'confianza': confidence,
@@ -180,29 +463,15 @@ class PredictionService:
         return {
             'total_length': total_length,
             'costo_total': costo_total_proyecto,
-            'resultados_por_uf': results_por_uf
-        }
-    
-    def _prepare_prediction_params(self, uf: Dict[str, Any]) -> Dict[str, Any]:
-        """Prepare parameters for prediction from functional unit data"""
-        return {
-            'codigo': '',
-            'longitud_km': float(uf.get('longitud_km', 0)),
-            'puentes_vehiculares_und': int(uf.get('puentes_vehiculares_und', 0)),
-            'puentes_vehiculares_m2': float(uf.get('puentes_vehiculares_mt2', 0)),
-            'puentes_peatonales_und': int(uf.get('puentes_peatonales_und', 0)),
-            'puentes_peatonales_m2': float(uf.get('puentes_peatonales_mt2', 0)),
-            'tuneles_und': int(uf.get('tuneles_und', 0)),
-            'tuneles_km': float(uf.get('tuneles_km', 0)),
-            'alcance': uf.get('alcance', '')
+            'resultados_por_uf': results_por_uf,
+            'items_sin_modelo': item_model_index.unmapped
         }
     
     def _format_items_with_predictions(
         self,
-        items_requeridos: List[FaseItemRequerido],
+        item_tree: FaseItemTree,
         predictions: Dict[str, float],
-        parent_item_tipo_ids: set,
-        parent_child_map: Dict[int, List[int]],
+        item_model_index: ItemModelIndex,
         training_summary: Dict[str, List[Dict[str, Any]]],
         uf_alcance: str
     ) -> tuple[List[Dict[str, Any]], float]:
@@ -212,79 +481,44 @@ class PredictionService:
         Returns:
             Tuple of (items_list, total_cost)
         """
-        # Create a map of predictions by item name
-        predictions_map = {name: value for name, value in predictions.items()}
-        
         # First pass: Build items dict with predictions
         items_dict = {}
         uf_total_cost = 0.0
         
-        for item_req in items_requeridos:
-            item_tipo = item_req.item_tipo
-            item_name = item_req.descripcion or item_tipo.nombre
-            is_parent = item_tipo.id in parent_item_tipo_ids
+        for node in item_tree.sorted_nodes:
+            is_parent = node.item_tipo_id in item_tree.parent_item_tipo_ids
             
-            # Try to find prediction for this item
-            predicted_value = None
-            matched_pred_name = None
+            # Model target precomputed for this item (None for parents and unmapped items)
+            target_key = None if is_parent else item_model_index.targets.get(node.item_tipo_id)
+            predicted_value = predictions.get(target_key) if target_key else None
             
-            if not is_parent:
-                for pred_name, pred_value in predictions_map.items():
-                    # Match by exact name or partial match
-                    if (pred_name == item_name or 
-                        pred_name in item_name or 
-                        item_name in pred_name or
-                        pred_name == item_tipo.nombre or
-                        item_tipo.nombre in pred_name):
-                        predicted_value = pred_value
-                        matched_pred_name = pred_name
-                        break
-                
-                # Add to total if there's a prediction
-                if predicted_value is not None:
-                    uf_total_cost += predicted_value
+            # Add to total if there's a prediction
+            if predicted_value is not None:
+                uf_total_cost += predicted_value
             
             # Get ALL metrics for this item (can have multiple alcances)
-            metrics = None
-            if matched_pred_name:
-                # TODO: Remove this when the models are updated
-                if matched_pred_name == "3.1 - GEOLOGÍA":
-                    matched_pred_name = "3 - GEOLOGÍA"
-                metrics_list = training_summary.get(matched_pred_name)
-                if metrics_list:
-                    print(f"✓ Found {len(metrics_list)} metric(s) for {matched_pred_name}")
-                    metrics = metrics_list  # Return all metrics as array
-                else:
-                    print(f"✗ No metrics found for {matched_pred_name}")
+            metrics = (training_summary.get(target_key) or None) if target_key else None
             
             # Store in dict (will update parent values later)
-            items_dict[item_tipo.id] = {
-                'item': item_name,
-                'item_tipo_id': item_tipo.id,
+            items_dict[node.item_tipo_id] = {
+                'item': node.nombre,
+                'item_tipo_id': node.item_tipo_id,
                 'causacion_estimada': round(predicted_value, 2) if predicted_value is not None else 0,
                 'metrics': metrics,
                 'predicted': predicted_value is not None,
                 'is_parent': is_parent
             }
         
-        # Second pass: Calculate parent values
-        for parent_id in parent_item_tipo_ids:
-            if parent_id in items_dict:
-                children_ids = parent_child_map.get(parent_id, [])
-                parent_sum = sum(
-                    items_dict[child_id]['causacion_estimada']
-                    for child_id in children_ids
-                    if child_id in items_dict
-                )
-                items_dict[parent_id]['causacion_estimada'] = round(parent_sum, 2)
-                items_dict[parent_id]['predicted'] = False  # Parents are calculated, not predicted
+        # Second pass: Calculate parent values (parents are calculated, not predicted)
+        parent_sums = item_tree.parent_sums({
+            item_tipo_id: item['causacion_estimada'] for item_tipo_id, item in items_dict.items()
+        })
+        for parent_id, parent_sum in parent_sums.items():
+            items_dict[parent_id]['causacion_estimada'] = round(parent_sum, 2)
+            items_dict[parent_id]['predicted'] = False
         
         # Convert dict to list maintaining original order
-        items_result = [
-            items_dict[item_req.item_tipo.id]
-            for item_req in items_requeridos
-            if item_req.item_tipo.id in items_dict
-        ]
+        items_result = [items_dict[node.item_tipo_id] for node in item_tree.sorted_nodes]
         
         return items_result, uf_total_cost
     
@@ -307,5 +541,6 @@ class PredictionService:
             'costo_total_por_km': round(costo_total / total_length, 2) if total_length > 0 else 0,
             'longitud_total_km': total_length,
             'num_unidades_funcionales': len(results['resultados_por_uf']),
-            'resultados': results['resultados_por_uf']
+            'resultados': results['resultados_por_uf'],
+            'items_sin_modelo': results['items_sin_modelo']
         }
@@ -0,0 +1,265 @@
+"""
+Training Jobs - Background model training in a separate process pool
+
+Training a phase runs dozens of grid searches and leave-one-out loops and takes
+minutes. Running it inside the web request ties up a worker and competes for
+every core with prediction traffic, so training runs in a process pool:
+
+- Each request gets a job id with status, progress and result.
+- Concurrent requests for the same fase share the running job.
+- Workers run at lower priority and limit sklearn/BLAS parallelism to
+  TRAINING_CPU_BUDGET cores, shared by the targets they train in parallel
+  (see models_management.run_training_tasks).
+
+Jobs live in the memory of the web process that accepted them.
+"""
+
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import multiprocessing
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import Config
+from app.services.prediction_cache import prediction_cache
+
+
+# Flask app of a pool worker (created once per worker process)
+_worker_app = None
+
+
+def _init_worker(cpu_budget: int) -> None:
+    """Pool initializer: lower priority, cap parallelism and create the Flask app."""
+    global _worker_app
+
+    if hasattr(os, 'nice'):
+        try:
+            os.nice(10)
+        except OSError:
+            pass
+
+    # BLAS/OpenMP threads and joblib workers share the same budget
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(limits=cpu_budget)
+
+    from app.utils import ml_utils
+    ml_utils.set_n_jobs(cpu_budget)
+    ml_utils.set_selection_mode(Config.TRAINING_SELECTION_MODE, Config.TRAINING_TIME_BUDGET)
+    ml_utils.set_outlier_mode(Config.TRAINING_OUTLIER_MODE)
+
+    from app.utils.cv_cache import cv_cache
+    cv_cache.configure(Config.CV_CACHE_DB if Config.CV_CACHE_ENABLED else None, Config.CV_CACHE_MAX_MB * 1024 * 1024)
+
+    from app import create_app
+    _worker_app = create_app(preload_models=False, warmup=False)
+
+
+def _run_training(fase_id: int, progress) -> Dict[str, Any]:
+    """Train and save the models of a fase inside a pool worker."""
+    from app.services.model_service import ModelService
+
+    progress['started_at'] = datetime.utcnow().isoformat()
+
+    def report(completed: int, total: int, target: str) -> None:
+        progress.update({'completed': completed, 'total': total, 'target': target})
+
+    with _worker_app.app_context():
+        result = ModelService().train_models(fase_id, progress_callback=report)
+
+    summary = None
+    if result.get('summary') is not None:
+        summary = result['summary'].to_dict(orient='records')
+
+    return {
+        'fase': result['fase'],
+        'fase_id': result['fase_id'],
+        'models_path': result['models_path'],
+        'summary': summary,
+        'metadata': result.get('metadata')
+    }
+
+
+class TrainingJobManager:
+    """
+    Queue of training jobs executed in a spawn-based process pool.
+    """
+
+    def __init__(self, max_workers: int = 1, cpu_budget: int = 1, keep_finished: int = 50):
+        """
+        Initialize the manager (the pool is started on the first job).
+
+        Args:
+            max_workers: Number of training processes
+            cpu_budget: Cores each training process may use
+            keep_finished: Number of finished jobs kept for status queries
+        """
+        self.max_workers = max(1, max_workers)
+        self.cpu_budget = max(1, cpu_budget)
+        self.keep_finished = max(1, keep_finished)
+        self._context = multiprocessing.get_context('spawn')
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._sync_manager = None
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._done_events: Dict[str, threading.Event] = {}
+        self._active_by_fase: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the pool and the progress manager on first use. Caller must hold the lock."""
+        if self._sync_manager is None:
+            self._sync_manager = self._context.Manager()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=self._context,
+                initializer=_init_worker,
+                initargs=(self.cpu_budget,)
+            )
+        return self._executor
+
+    def submit(self, fase_id: int) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a training job, or return the active job of the same fase.
+
+        Args:
+            fase_id: Phase ID from database
+
+        Returns:
+            Tuple of (job status dict, created) where created is False when
+            an existing job was reused
+        """
+        with self._lock:
+            active_job_id = self._active_by_fase.get(fase_id)
+            if active_job_id is not None:
+                return self._snapshot(active_job_id), False
+
+            executor = self._get_executor()
+            job_id = uuid.uuid4().hex
+            progress = self._sync_manager.dict()
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'fase_id': fase_id,
+                'status': 'pending',
+                'created_at': datetime.utcnow().isoformat(),
+                'finished_at': None,
+                'progress': progress,
+                'result': None,
+                'error': None,
+                'error_type': None
+            }
+            self._active_by_fase[fase_id] = job_id
+
+            try:
+                future = executor.submit(_run_training, fase_id, progress)
+            except BrokenProcessPool:
+                # A crashed worker breaks the pool; start a new one
+                self._executor = None
+                future = self._get_executor().submit(_run_training, fase_id, progress)
+            self._done_events[job_id] = threading.Event()
+            snapshot = self._snapshot(job_id)
+
+        future.add_done_callback(lambda done, job_id=job_id: self._finish(job_id, done))
+        return snapshot, True
+
+    def _finish(self, job_id: str, future: Future) -> None:
+        """Record the outcome of a job."""
+        with self._lock:
+            job = self._jobs[job_id]
+            # Freeze the last reported progress; the proxy dies with the manager
+            job['progress'] = self._read_progress(job['progress'])
+            job['finished_at'] = datetime.utcnow().isoformat()
+
+            error = future.exception()
+            if error is None:
+                job['status'] = 'completed'
+                job['result'] = future.result()
+            else:
+                job['status'] = 'failed'
+                job['error'] = str(error)
+                job['error_type'] = type(error).__name__
+                if isinstance(error, BrokenProcessPool):
+                    self._executor = None
+
+            done_event = self._done_events.pop(job_id, None)
+            if self._active_by_fase.get(job['fase_id']) == job_id:
+                del self._active_by_fase[job['fase_id']]
+            self._prune()
+
+        if job['status'] == 'completed':
+            # The worker wrote a new artifact; drop this process's results of the old one
+            prediction_cache.invalidate(job['fase_id'])
+        if done_event is not None:
+            done_event.set()
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs. Caller must hold the lock."""
+        finished = [job_id for job_id, job in self._jobs.items() if job['finished_at'] is not None]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _read_progress(progress) -> Dict[str, Any]:
+        """Copy a progress dict or manager proxy (empty if the manager is gone)."""
+        try:
+            return dict(progress)
+        except Exception:
+            return {}
+
+    def _snapshot(self, job_id: str) -> Dict[str, Any]:
+        """JSON-friendly copy of a job. Caller must hold the lock."""
+        job = dict(self._jobs[job_id])
+        progress = self._read_progress(job['progress'])
+        if job['status'] == 'pending' and 'started_at' in progress:
+            job['status'] = 'running'
+        job['started_at'] = progress.pop('started_at', None)
+        job['progress'] = progress
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status of a job.
+
+        Returns:
+            Job status dict or None if the job is unknown
+        """
+        with self._lock:
+            if job_id not in self._jobs:
+                return None
+            return self._snapshot(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Get the status of every known job, newest first (results omitted)."""
+        with self._lock:
+            jobs = [self._snapshot(job_id) for job_id in reversed(self._jobs)]
+        for job in jobs:
+            job.pop('result', None)
+        return jobs
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Block until a job finishes.
+
+        Args:
+            job_id: Job ID
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            Final job status dict (or current status on timeout), None if unknown
+        """
+        with self._lock:
+            done_event = self._done_events.get(job_id)
+        if done_event is not None:
+            done_event.wait(timeout)
+        return self.get(job_id)
+
+
+# Shared by every request of the web process
+training_jobs = TrainingJobManager(
+    max_workers=Config.TRAINING_MAX_WORKERS,
+    cpu_budget=Config.TRAINING_CPU_BUDGET,
+    keep_finished=Config.TRAINING_JOBS_KEEP
+)
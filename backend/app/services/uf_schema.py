@@ -0,0 +1,345 @@
+"""
+UF Schema - Decode functional units straight into typed feature columns
+
+The prediction endpoints receive functional units (UFs) as JSON objects. The
+schema is compiled once into one decoder per field, and a request is decoded
+column by column:
+
+- Numeric fields become float64 arrays (one per prediction parameter). A column
+  whose values are all JSON numbers is converted and checked in one NumPy pass;
+  other columns (missing values, numeric strings, invalid values) fall back to
+  a per-value decoder that reports the exact position of each error.
+- Alcance becomes an array of integer codes into the list of distinct alcances.
+
+The resulting UFBatch feeds the prediction cache keys and the feature matrix of
+the models without building one parameter dict per UF.
+
+Missing and null fields count as 0 (alcance: ''). Numbers must be finite and
+greater than or equal to 0, and counts (*_und) must be whole numbers.
+"""
+
+import json
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.services.exceptions import ValidationError
+from app.services.models_management import FEATURE_COLUMNS
+from app.services.prediction_cache import FEATURE_PARAMS
+
+
+# Maximum number of field errors reported per request
+MAX_FIELD_ERRORS = 50
+
+# Field errors quoted in the error message (all of them go in 'detalles')
+_ERRORS_IN_MESSAGE = 3
+
+
+@dataclass(frozen=True)
+class UFField:
+    """One field of a functional unit."""
+    # Key in the request JSON
+    name: str
+    # Prediction parameter (see FEATURE_COLUMNS)
+    param: str
+    # 'number', 'count' or 'text'
+    kind: str = 'number'
+
+
+# Request fields of a functional unit, in FEATURE_PARAMS order plus alcance
+UF_FIELDS = (
+    UFField('longitud_km', 'longitud_km'),
+    UFField('puentes_vehiculares_und', 'puentes_vehiculares_und', 'count'),
+    UFField('puentes_vehiculares_mt2', 'puentes_vehiculares_m2'),
+    UFField('puentes_peatonales_und', 'puentes_peatonales_und', 'count'),
+    UFField('puentes_peatonales_mt2', 'puentes_peatonales_m2'),
+    UFField('tuneles_und', 'tuneles_und', 'count'),
+    UFField('tuneles_km', 'tuneles_km'),
+    UFField('alcance', 'alcance', 'text'),
+)
+
+UF_FIELDS_BY_NAME = {field.name: field for field in UF_FIELDS}
+_NUMERIC_FIELDS = tuple(field for field in UF_FIELDS if field.kind != 'text')
+_COUNT_PARAMS = frozenset(field.param for field in UF_FIELDS if field.kind == 'count')
+
+_NUMBER_TYPES = (int, float)
+_ERROR_MESSAGES = {
+    'number': "debe ser un número mayor o igual a 0",
+    'count': "debe ser un número entero mayor o igual a 0",
+    'text': "debe ser texto",
+}
+
+
+class _Errors:
+    """Field errors of one decoding, capped at MAX_FIELD_ERRORS."""
+
+    def __init__(self):
+        self.items: List[Dict[str, str]] = []
+        self.total = 0
+
+    def add(self, campo: str, error: str) -> None:
+        self.total += 1
+        if len(self.items) < MAX_FIELD_ERRORS:
+            self.items.append({'campo': campo, 'error': error})
+
+    def raise_if_any(self) -> None:
+        if not self.total:
+            return
+        quoted = '; '.join(f"{item['campo']}: {item['error']}" for item in self.items[:_ERRORS_IN_MESSAGE])
+        if self.total > _ERRORS_IN_MESSAGE:
+            quoted += f" (y {self.total - _ERRORS_IN_MESSAGE} más)"
+        noun = 'error' if self.total == 1 else 'errores'
+        raise ValidationError(f"La solicitud tiene {self.total} {noun} de validación: {quoted}", self.items)
+
+
+def _decode_number(value: Any, kind: str) -> Optional[float]:
+    """Decode one numeric value (None if invalid). Numeric strings are accepted."""
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+    elif not isinstance(value, _NUMBER_TYPES):
+        return None
+    value = float(value)
+    if not math.isfinite(value) or value < 0 or (kind == 'count' and not value.is_integer()):
+        return None
+    # -0.0 -> 0.0, so equal scenarios share a cache key
+    return value + 0.0
+
+
+def _decode_numeric_column(values: List[Any], field: UFField, location: Callable[[int], str],
+                           errors: _Errors) -> np.ndarray:
+    """Decode the values of one numeric field of every UF."""
+    if all(type(value) in _NUMBER_TYPES for value in values):
+        column = np.array(values, dtype=float)
+        invalid = ~np.isfinite(column) | (column < 0)
+        if field.kind == 'count':
+            with np.errstate(invalid='ignore'):
+                invalid |= column != np.trunc(column)
+        if not invalid.any():
+            return column + 0.0
+    else:
+        column = np.empty(len(values))
+
+    # Slow path: per-value decoding with error positions
+    message = _ERROR_MESSAGES[field.kind]
+    for index, value in enumerate(values):
+        decoded = _decode_number(value, field.kind)
+        if decoded is None:
+            errors.add(f"{location(index)}.{field.name}", message)
+            decoded = 0.0
+        column[index] = decoded
+    return column
+
+
+def _decode_text_column(values: List[Any], field: UFField, location: Callable[[int], str],
+                        errors: _Errors) -> List[str]:
+    """Decode the values of one text field of every UF (missing or null -> '')."""
+    decoded = []
+    for index, value in enumerate(values):
+        if value is None:
+            value = ''
+        elif not isinstance(value, str):
+            errors.add(f"{location(index)}.{field.name}", _ERROR_MESSAGES[field.kind])
+            value = ''
+        decoded.append(value)
+    return decoded
+
+
+class UFBatch:
+    """
+    Functional units as feature columns.
+
+    Attributes:
+        columns: Prediction parameter -> float64 array, for every FEATURE_PARAMS
+        alcance_codes: Index of each UF's alcance in alcances
+        alcances: Distinct alcances, in order of first appearance
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], alcance_codes: np.ndarray, alcances: Sequence[str]):
+        self.columns = columns
+        self.alcance_codes = alcance_codes
+        self.alcances = list(alcances)
+
+    @classmethod
+    def from_alcance_values(cls, columns: Dict[str, np.ndarray], alcance_values: Sequence[str]) -> "UFBatch":
+        codes, alcances = pd.factorize(np.asarray(alcance_values, dtype=object), sort=False)
+        return cls(columns, codes, alcances.tolist())
+
+    @classmethod
+    def from_params(cls, rows: List[Dict[str, Any]]) -> "UFBatch":
+        """
+        Build a batch from already validated prediction parameter dicts
+        (same keys as ModelAdapterInterface.predict kwargs).
+        """
+        columns = {
+            param: np.array([float(row.get(param) or 0) for row in rows], dtype=float)
+            for param in FEATURE_PARAMS
+        }
+        return cls.from_alcance_values(columns, [row.get('alcance') or '' for row in rows])
+
+    def __len__(self) -> int:
+        return len(self.alcance_codes)
+
+    def alcance_values(self) -> List[str]:
+        """Alcance of every UF."""
+        return [self.alcances[code] for code in self.alcance_codes.tolist()]
+
+    def values(self, param: str) -> List[Any]:
+        """Values of one prediction parameter as Python values (ints for counts)."""
+        if param == 'alcance':
+            return self.alcance_values()
+        column = self.columns[param]
+        if param in _COUNT_PARAMS:
+            column = column.astype(np.int64)
+        return column.tolist()
+
+    def take(self, indices: Sequence[int]) -> "UFBatch":
+        """Batch with the UFs at the given positions."""
+        indices = np.asarray(indices, dtype=np.intp)
+        columns = {param: column[indices] for param, column in self.columns.items()}
+        return UFBatch.from_alcance_values(
+            columns, np.asarray(self.alcances, dtype=object)[self.alcance_codes[indices]]
+        )
+
+    def feature_keys(self) -> List[str]:
+        """Prediction cache key of every UF (same keys as prediction_cache.feature_key)."""
+        matrix = np.column_stack([self.columns[param] for param in FEATURE_PARAMS]).tolist()
+        return [
+            json.dumps(values + [alcance], ensure_ascii=False)
+            for values, alcance in zip(matrix, self.alcance_values())
+        ]
+
+    def feature_frame(self) -> pd.DataFrame:
+        """Feature matrix of the models (same columns as build_feature_frame)."""
+        frame = {FEATURE_COLUMNS['codigo']: np.full(len(self), '', dtype=object)}
+        for param in FEATURE_PARAMS:
+            frame[FEATURE_COLUMNS[param]] = self.columns[param]
+        frame[FEATURE_COLUMNS['alcance']] = np.asarray(self.alcances, dtype=object)[self.alcance_codes]
+        return pd.DataFrame(frame)
+
+    def to_params(self) -> List[Dict[str, Any]]:
+        """One prediction parameter dict per UF (for adapters without a vectorized path)."""
+        names = list(FEATURE_PARAMS) + ['alcance']
+        columns = [self.values(param) for param in names]
+        return [dict(zip(names, values), codigo='') for values in zip(*columns)]
+
+    def grid(self, axes: Dict[str, Any]) -> "UFBatch":
+        """
+        Expand a single-UF batch over the product of some of its fields.
+
+        Args:
+            axes: Prediction parameter -> values (array, or list of str for
+                alcance); the last axis varies fastest
+
+        Returns:
+            Batch with one UF per grid point
+        """
+        shape = [len(values) for values in axes.values()]
+        positions = np.indices(shape).reshape(len(shape), -1)
+        size = positions.shape[1]
+
+        columns = {param: np.repeat(column[:1], size) for param, column in self.columns.items()}
+        alcance_codes = np.repeat(self.alcance_codes[:1], size)
+        alcances = self.alcances
+        for axis, (param, values) in zip(positions, axes.items()):
+            if param == 'alcance':
+                alcance_codes, alcances = axis, list(values)
+            else:
+                columns[param] = np.asarray(values, dtype=float)[axis]
+        return UFBatch.from_alcance_values(columns, np.asarray(alcances, dtype=object)[alcance_codes])
+
+
+def _decode(units: List[Any], location: Callable[[int], str], errors: _Errors) -> UFBatch:
+    for index, uf in enumerate(units):
+        if not isinstance(uf, dict):
+            errors.add(location(index), "debe ser un objeto JSON")
+    errors.raise_if_any()
+
+    columns = {}
+    for field in _NUMERIC_FIELDS:
+        values = [uf.get(field.name) for uf in units]
+        columns[field.param] = _decode_numeric_column(values, field, location, errors)
+    alcance_field = UF_FIELDS_BY_NAME['alcance']
+    alcance_values = _decode_text_column([uf.get('alcance') for uf in units], alcance_field, location, errors)
+    errors.raise_if_any()
+
+    return UFBatch.from_alcance_values(columns, alcance_values)
+
+
+def decode_unidades_funcionales(units: Any, path: str = 'unidades_funcionales') -> UFBatch:
+    """
+    Decode and validate the functional units of a prediction request.
+
+    Args:
+        units: Value of the 'unidades_funcionales' field
+        path: Name of the field in error messages
+
+    Returns:
+        UFBatch with one row per functional unit, in request order
+
+    Raises:
+        ValidationError: With every field error found (see 'errors')
+    """
+    errors = _Errors()
+    if not isinstance(units, list) or not units:
+        errors.add(path, "debe ser una lista con al menos una unidad funcional")
+        errors.raise_if_any()
+    return _decode(units, lambda index: f"{path}[{index}]", errors)
+
+
+def decode_unidad_funcional(uf: Any, path: str = 'unidad_funcional') -> UFBatch:
+    """
+    Decode and validate a single functional unit.
+
+    Returns:
+        UFBatch with one row
+
+    Raises:
+        ValidationError: With every field error found
+    """
+    return _decode([uf], lambda index: path, _Errors())
+
+
+def decode_field_values(name: str, values: List[Any], path: str) -> Any:
+    """
+    Decode a list of values of one UF field (e.g. the values of a swept variable).
+
+    Args:
+        name: Request field name (see UF_FIELDS)
+        values: Values to decode
+        path: Location of the list in error messages
+
+    Returns:
+        float64 array, or list of str for alcance
+
+    Raises:
+        ValidationError: With every invalid value
+    """
+    field = UF_FIELDS_BY_NAME[name]
+    errors = _Errors()
+    location = lambda index: f"{path}[{index}]"
+    if field.kind == 'text':
+        decoded = []
+        for index, value in enumerate(values):
+            if not isinstance(value, str):
+                errors.add(location(index), _ERROR_MESSAGES['text'])
+            decoded.append(value)
+    else:
+        decoded = np.empty(len(values))
+        for index, value in enumerate(values):
+            number = _decode_number(value, field.kind) if value is not None else None
+            if number is None:
+                errors.add(location(index), _ERROR_MESSAGES[field.kind])
+                number = 0.0
+            decoded[index] = number
+    errors.raise_if_any()
+    return decoded
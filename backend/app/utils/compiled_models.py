@@ -0,0 +1,463 @@
+"""
+Closed-form evaluators for trained regression pipelines.
+
+Most serving models produced by ml_utils.train_multiple_models are
+StandardScaler + linear regressor pipelines (Ridge, BayesianRidge, ElasticNet,
+LinearRegression), optionally wrapped in a TransformedTargetRegressor with a
+log transform on the target. Their prediction is a handful of NumPy operations,
+but every sklearn predict() call pays for full input validation.
+
+compile_model reduces those pipelines to plain coefficient/intercept/scale
+arrays plus a target transform flag. RBF kernel models (SVR and
+GaussianProcessRegressor with a constant * RBF kernel) are reduced to their
+centers and weights. Other models are not compiled and keep being served by
+sklearn through predict_entry.
+
+Compiled models can be exported with to_spec() and rebuilt with
+evaluator_from_spec(), which is how the serving artifact stores them
+without pickle.
+"""
+
+import warnings
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import RBF, ConstantKernel, Product, Sum, WhiteKernel
+from sklearn.linear_model import BayesianRidge, ElasticNet, LinearRegression, Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVR
+
+
+LINEAR_ESTIMATORS = (LinearRegression, Ridge, BayesianRidge, ElasticNet)
+
+# Target transform flag -> (func, inverse_func) as used by TransformedTargetRegressor
+TARGET_TRANSFORMS = {
+    'log1p': (np.log1p, np.expm1),
+    'log': (np.log, np.exp),
+}
+
+
+class CompiledLinearModel:
+    """
+    Linear model evaluated as ((X - mean) / scale) @ coef + intercept,
+    followed by the inverse target transform if any.
+    """
+
+    kind = 'linear'
+
+    def __init__(self, coef: np.ndarray, intercept: float, mean: Optional[np.ndarray] = None,
+                 scale: Optional[np.ndarray] = None, target_transform: str = 'none'):
+        """
+        Args:
+            coef: Coefficients, shape (n_features,)
+            intercept: Intercept of the linear model
+            mean: Scaler mean (None when there is no centering)
+            scale: Scaler scale (None when there is no scaling)
+            target_transform: 'none', 'log1p' or 'log'
+        """
+        self.coef = np.asarray(coef, dtype=float)
+        self.intercept = float(intercept)
+        self.mean = None if mean is None else np.asarray(mean, dtype=float)
+        self.scale = None if scale is None else np.asarray(scale, dtype=float)
+        self.target_transform = target_transform
+
+    @property
+    def n_features(self) -> int:
+        return self.coef.shape[0]
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict for a 2D input (array or DataFrame with columns in training order).
+
+        Returns:
+            1D array of predictions in the original target scale
+        """
+        X = np.asarray(X, dtype=float)
+        if self.mean is not None:
+            X = X - self.mean
+        if self.scale is not None:
+            X = X / self.scale
+        y = X @ self.coef + self.intercept
+        if self.target_transform != 'none':
+            y = TARGET_TRANSFORMS[self.target_transform][1](y)
+        return y
+
+    def to_spec(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Export as (JSON-serializable params, named arrays)."""
+        arrays = {'coef': self.coef}
+        if self.mean is not None:
+            arrays['mean'] = self.mean
+        if self.scale is not None:
+            arrays['scale'] = self.scale
+        return {'intercept': self.intercept, 'target_transform': self.target_transform}, arrays
+
+    @classmethod
+    def from_spec(cls, params: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> 'CompiledLinearModel':
+        return cls(arrays['coef'], params['intercept'], mean=arrays.get('mean'),
+                   scale=arrays.get('scale'), target_transform=params['target_transform'])
+
+    def __repr__(self) -> str:
+        return (f"CompiledLinearModel(n_features={self.n_features}, "
+                f"target_transform='{self.target_transform}')")
+
+
+class CompiledKernelModel:
+    """
+    RBF kernel model evaluated as
+    amplitude * exp(-gamma * ||z - centers||^2) @ weights + intercept,
+    with z = (X - mean) / scale / length_scale, then y * y_scale + y_offset
+    and the inverse target transform if any.
+
+    Covers SVR(kernel='rbf') (centers = support vectors, weights = dual
+    coefficients) and GaussianProcessRegressor with a [constant *] RBF
+    [+ white noise] kernel (centers = training inputs, weights = alpha_).
+    """
+
+    kind = 'rbf_kernel'
+
+    def __init__(self, centers: np.ndarray, weights: np.ndarray, gamma: float,
+                 amplitude: float = 1.0, intercept: float = 0.0,
+                 mean: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None,
+                 length_scale: Optional[np.ndarray] = None,
+                 y_scale: float = 1.0, y_offset: float = 0.0, target_transform: str = 'none'):
+        """
+        Args:
+            centers: Kernel centers in the scaled input space, shape (n_centers, n_features)
+            weights: Weight of each center, shape (n_centers,)
+            gamma: RBF coefficient (exp(-gamma * squared distance))
+            amplitude: Constant factor of the kernel
+            intercept: Added after the weighted kernel sum
+            mean: Scaler mean (None when there is no centering)
+            scale: Scaler scale (None when there is no scaling)
+            length_scale: Per-feature RBF length scale, already applied to centers
+            y_scale: Output scale (GaussianProcess normalize_y)
+            y_offset: Output offset (GaussianProcess normalize_y)
+            target_transform: 'none', 'log1p' or 'log'
+        """
+        self.centers = np.asarray(centers, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+        self.gamma = float(gamma)
+        self.amplitude = float(amplitude)
+        self.intercept = float(intercept)
+        self.mean = None if mean is None else np.asarray(mean, dtype=float)
+        self.scale = None if scale is None else np.asarray(scale, dtype=float)
+        self.length_scale = None if length_scale is None else np.asarray(length_scale, dtype=float)
+        self.y_scale = float(y_scale)
+        self.y_offset = float(y_offset)
+        self.target_transform = target_transform
+        self._centers_sq = np.einsum('ij,ij->i', self.centers, self.centers)
+
+    @property
+    def n_features(self) -> int:
+        return self.centers.shape[1]
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict for a 2D input (array or DataFrame with columns in training order).
+
+        Returns:
+            1D array of predictions in the original target scale
+        """
+        X = np.asarray(X, dtype=float)
+        if self.mean is not None:
+            X = X - self.mean
+        if self.scale is not None:
+            X = X / self.scale
+        if self.length_scale is not None:
+            X = X / self.length_scale
+        sq_dist = np.einsum('ij,ij->i', X, X)[:, None] - 2 * X @ self.centers.T + self._centers_sq
+        kernel = self.amplitude * np.exp(-self.gamma * np.maximum(sq_dist, 0))
+        y = (kernel @ self.weights + self.intercept) * self.y_scale + self.y_offset
+        if self.target_transform != 'none':
+            y = TARGET_TRANSFORMS[self.target_transform][1](y)
+        return y
+
+    def to_spec(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Export as (JSON-serializable params, named arrays)."""
+        arrays = {'centers': self.centers, 'weights': self.weights}
+        for name in ('mean', 'scale', 'length_scale'):
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+        params = {
+            'gamma': self.gamma,
+            'amplitude': self.amplitude,
+            'intercept': self.intercept,
+            'y_scale': self.y_scale,
+            'y_offset': self.y_offset,
+            'target_transform': self.target_transform
+        }
+        return params, arrays
+
+    @classmethod
+    def from_spec(cls, params: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> 'CompiledKernelModel':
+        return cls(arrays['centers'], arrays['weights'], params['gamma'],
+                   amplitude=params['amplitude'], intercept=params['intercept'],
+                   mean=arrays.get('mean'), scale=arrays.get('scale'),
+                   length_scale=arrays.get('length_scale'), y_scale=params['y_scale'],
+                   y_offset=params['y_offset'], target_transform=params['target_transform'])
+
+    def __repr__(self) -> str:
+        return (f"CompiledKernelModel(n_centers={self.centers.shape[0]}, n_features={self.n_features}, "
+                f"target_transform='{self.target_transform}')")
+
+
+# Evaluator kind -> class, used to rebuild evaluators from their spec
+EVALUATOR_KINDS = {
+    CompiledLinearModel.kind: CompiledLinearModel,
+    CompiledKernelModel.kind: CompiledKernelModel,
+}
+
+
+def evaluator_from_spec(kind: str, params: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+    """
+    Rebuild a compiled evaluator exported with to_spec().
+
+    Raises:
+        ValueError: If the kind is unknown
+    """
+    if kind not in EVALUATOR_KINDS:
+        raise ValueError(f"Unknown evaluator kind '{kind}'")
+    return EVALUATOR_KINDS[kind].from_spec(params, arrays)
+
+
+def _target_transform_flag(model: TransformedTargetRegressor) -> Optional[str]:
+    """Return the transform flag of a TransformedTargetRegressor, or None if unsupported."""
+    if model.transformer is not None:
+        return None
+    for flag, (func, inverse_func) in TARGET_TRANSFORMS.items():
+        if model.func is func and model.inverse_func is inverse_func:
+            return flag
+    return None
+
+
+def _scaler_arrays(step) -> Optional[Tuple[Optional[np.ndarray], Optional[np.ndarray]]]:
+    """
+    Return (mean, scale) of a fitted scaling step, or None if unsupported.
+
+    Accepts a StandardScaler, or a ColumnTransformer whose only transformer is
+    a StandardScaler applied to every input column in order.
+    """
+    if isinstance(step, ColumnTransformer):
+        transformers = [t for t in step.transformers_ if t[0] != 'remainder' or t[1] != 'drop']
+        feature_names = getattr(step, 'feature_names_in_', None)
+        if len(transformers) != 1 or feature_names is None:
+            return None
+        _, step, columns = transformers[0]
+        if list(columns) != list(feature_names):
+            return None
+
+    if type(step) is not StandardScaler:
+        return None
+    return (step.mean_ if step.with_mean else None,
+            step.scale_ if step.with_std else None)
+
+
+def _rbf_kernel_params(kernel) -> Optional[Tuple[float, Any]]:
+    """
+    Return (amplitude, length_scale) of a fitted [constant *] RBF [+ white] kernel,
+    or None for any other kernel. White noise does not affect predictions.
+    """
+    if isinstance(kernel, Sum):
+        if isinstance(kernel.k2, WhiteKernel):
+            kernel = kernel.k1
+        elif isinstance(kernel.k1, WhiteKernel):
+            kernel = kernel.k2
+        else:
+            return None
+
+    amplitude = 1.0
+    if isinstance(kernel, Product):
+        if isinstance(kernel.k1, ConstantKernel) and isinstance(kernel.k2, RBF):
+            amplitude, kernel = kernel.k1.constant_value, kernel.k2
+        elif isinstance(kernel.k2, ConstantKernel) and isinstance(kernel.k1, RBF):
+            amplitude, kernel = kernel.k2.constant_value, kernel.k1
+        else:
+            return None
+
+    if type(kernel) is not RBF:
+        return None
+    return float(amplitude), kernel.length_scale
+
+
+def _compile_estimator(estimator, mean, scale, target_transform: str):
+    """Build the evaluator of a fitted final estimator, or None if unsupported."""
+    # Exact type checks: subclasses may override predict
+    if type(estimator) in LINEAR_ESTIMATORS and hasattr(estimator, 'coef_'):
+        coef = np.asarray(estimator.coef_, dtype=float)
+        intercept = np.asarray(estimator.intercept_, dtype=float)
+        if coef.ndim == 2:
+            if coef.shape[0] != 1:
+                return None
+            coef = coef[0]
+        if intercept.size != 1:
+            return None
+        return CompiledLinearModel(coef, intercept.item(), mean=mean, scale=scale,
+                                   target_transform=target_transform)
+
+    if type(estimator) is SVR and estimator.kernel == 'rbf' and hasattr(estimator, 'support_vectors_'):
+        return CompiledKernelModel(
+            centers=estimator.support_vectors_,
+            weights=np.asarray(estimator.dual_coef_, dtype=float).ravel(),
+            gamma=estimator._gamma,
+            intercept=float(np.asarray(estimator.intercept_).ravel()[0]),
+            mean=mean, scale=scale, target_transform=target_transform
+        )
+
+    if type(estimator) is GaussianProcessRegressor and hasattr(estimator, 'alpha_'):
+        kernel_params = _rbf_kernel_params(estimator.kernel_)
+        alpha = np.asarray(estimator.alpha_, dtype=float)
+        if kernel_params is None or (alpha.ndim == 2 and alpha.shape[1] != 1):
+            return None
+        amplitude, length_scale = kernel_params
+        length_scale = np.atleast_1d(np.asarray(length_scale, dtype=float))
+        return CompiledKernelModel(
+            centers=np.asarray(estimator.X_train_, dtype=float) / length_scale,
+            weights=alpha.ravel(),
+            gamma=0.5,
+            amplitude=amplitude,
+            mean=mean, scale=scale, length_scale=length_scale,
+            y_scale=float(np.ravel(estimator._y_train_std)[0]),
+            y_offset=float(np.ravel(estimator._y_train_mean)[0]),
+            target_transform=target_transform
+        )
+
+    return None
+
+
+def _compile_unchecked(model):
+    """Extract arrays from a fitted model without verifying them."""
+    target_transform = 'none'
+    if isinstance(model, TransformedTargetRegressor):
+        target_transform = _target_transform_flag(model)
+        if target_transform is None or not hasattr(model, 'regressor_'):
+            return None
+        model = model.regressor_
+
+    mean = scale = None
+    if isinstance(model, Pipeline):
+        steps = [step for _, step in model.steps if step is not None and step != 'passthrough']
+        if len(steps) == 2:
+            scaler_arrays = _scaler_arrays(steps[0])
+            if scaler_arrays is None:
+                return None
+            mean, scale = scaler_arrays
+            estimator = steps[1]
+        elif len(steps) == 1:
+            estimator = steps[0]
+        else:
+            return None
+    else:
+        estimator = model
+
+    return _compile_estimator(estimator, mean, scale, target_transform)
+
+
+def _probe_input(model, compiled):
+    """Deterministic probe input used to check a compiled model against sklearn."""
+    n_features = compiled.n_features
+    base = np.linspace(0.5, 50.0, 9)
+    X = np.column_stack([np.roll(base, shift) + shift for shift in range(n_features)])
+
+    if isinstance(compiled, CompiledKernelModel):
+        # Far from the centers an RBF kernel vanishes; probe around them too
+        centers = compiled.centers[:9]
+        if compiled.length_scale is not None:
+            centers = centers * compiled.length_scale
+        if compiled.scale is not None:
+            centers = centers * compiled.scale
+        if compiled.mean is not None:
+            centers = centers + compiled.mean
+        X = np.vstack([X, centers, centers * 1.01 + 0.01])
+    feature_names = getattr(model, 'feature_names_in_', None)
+    if feature_names is not None and len(feature_names) == n_features:
+        return pd.DataFrame(X, columns=list(feature_names))
+    return X
+
+
+def compile_model(model, rtol: float = 1e-7):
+    """
+    Compile a fitted sklearn model into a closed-form evaluator.
+
+    The compiled model is checked against model.predict on a probe input and
+    discarded if they disagree, so serving never silently changes predictions.
+
+    Args:
+        model: Fitted estimator, Pipeline or TransformedTargetRegressor
+        rtol: Relative tolerance for the equality check
+
+    Returns:
+        CompiledLinearModel, CompiledKernelModel or None if the model has no closed form
+    """
+    try:
+        compiled = _compile_unchecked(model)
+        if compiled is None:
+            return None
+
+        X_probe = _probe_input(model, compiled)
+        with warnings.catch_warnings(), np.errstate(all='ignore'):
+            warnings.simplefilter('ignore')
+            expected = np.asarray(model.predict(X_probe), dtype=float).ravel()
+            actual = compiled.predict(X_probe)
+        # Kernel sums may cancel to ~0, so the tolerance is also relative to the output range
+        atol = rtol * np.nanmax(np.abs(expected), initial=0.0)
+        if not np.allclose(actual, expected, rtol=rtol, atol=atol, equal_nan=True):
+            return None
+        return compiled
+    except Exception:
+        return None
+
+
+def compile_models(models: Dict[str, Any], recompile: bool = False) -> int:
+    """
+    Attach a 'compiled' evaluator next to every 'model' of a trained models dictionary.
+
+    Handles both per-alcance targets ({'models': {alcance: {'model', ...}}})
+    and single-model targets ({'model': ...}). Entries that already have a
+    'compiled' key (an evaluator, or None if the model could not be compiled)
+    are kept as they are, so compiling twice costs nothing.
+
+    Args:
+        models: Trained models dictionary (modified in place)
+        recompile: Compile and verify every entry again
+
+    Returns:
+        Number of models with a compiled evaluator
+    """
+    compiled_count = 0
+    for result in models.values():
+        if not isinstance(result, dict):
+            continue
+        if isinstance(result.get('models'), dict):
+            entries = [entry for entry in result['models'].values() if isinstance(entry, dict)]
+        else:
+            entries = [result]
+
+        for entry in entries:
+            if 'model' not in entry:
+                continue
+            if recompile or 'compiled' not in entry:
+                entry['compiled'] = compile_model(entry['model'])
+            compiled_count += entry['compiled'] is not None
+
+    return compiled_count
+
+
+def predict_entry(entry: Dict[str, Any], X) -> np.ndarray:
+    """
+    Predict with a models dictionary entry, using its compiled evaluator when available.
+
+    Args:
+        entry: Dict with 'model' and optionally 'compiled'
+        X: 2D input (array or DataFrame with the training columns)
+
+    Returns:
+        1D array of predictions
+    """
+    compiled = entry.get('compiled')
+    if compiled is not None:
+        return compiled.predict(X)
+    return entry['model'].predict(X)
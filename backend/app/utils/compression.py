@@ -0,0 +1,85 @@
+"""
+Opt-in compression of large responses (RESPONSE_COMPRESSION=true).
+
+Prediction, chart and geometry responses are large and very repetitive (same
+keys on every item), so they compress to a fraction of their size. Responses
+are compressed when:
+
+- the client accepts br (if the 'brotli' package is installed) or gzip,
+- the body is at least RESPONSE_COMPRESSION_MIN_BYTES,
+- the mimetype is JSON or text, and
+- the response is not streamed (NDJSON batches, file downloads).
+
+Small responses are sent as is: compressing them costs more time than it saves.
+"""
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/geo+json')
+
+
+def _is_compressible(response) -> bool:
+    mimetype = response.mimetype or ''
+    return mimetype in COMPRESSIBLE_MIMETYPES or mimetype.startswith('text/')
+
+
+def _choose_encoding(accept_encodings) -> str | None:
+    """Preferred encoding the client accepts (br over gzip)."""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def init_compression(app) -> None:
+    """
+    Register the compression after_request hook (if RESPONSE_COMPRESSION is enabled).
+
+    Args:
+        app: Flask application
+    """
+    if not app.config.get('RESPONSE_COMPRESSION'):
+        return
+
+    min_bytes = app.config.get('RESPONSE_COMPRESSION_MIN_BYTES', 8192)
+    gzip_level = app.config.get('RESPONSE_COMPRESSION_GZIP_LEVEL', 1)
+    brotli_quality = app.config.get('RESPONSE_COMPRESSION_BROTLI_QUALITY', 4)
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or not _is_compressible(response)
+        ):
+            return response
+
+        body = response.get_data()
+        if len(body) < min_bytes:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = _choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=gzip_level)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
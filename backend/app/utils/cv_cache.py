@@ -0,0 +1,256 @@
+"""
+Cross-validation Cache - Per-fold fit/score results keyed by content hash
+
+Every training run grid-searches the same candidates on the same slices with
+the same folds: retrains where most of the data did not change, the four log
+transformations of a slice, notebook experiments. Each fold result is stored
+in a SQLite file under a hash of everything it depends on:
+
+- The data (X and y contents)
+- The estimator with its parameter combination
+- The train/test indices of the fold and the scoring
+- The scikit-learn version and CACHE_VERSION
+
+The outlier masks of ml_utils.remove_outliers are stored the same way, under
+a hash of the slice contents and the detection settings.
+
+Entries are pickled results, evicted least recently used first when the file
+grows over max_bytes. Run purge_cv_cache.py (or cv_cache.purge()) to empty it.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+
+# Bump when fold results are computed differently (invalidates every entry)
+CACHE_VERSION = 1
+
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'instance', 'cv_cache.db')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Maximum number of keys per SQLite "IN (...)" lookup
+_SQLITE_CHUNK = 500
+
+
+def data_digest(data) -> str:
+    """Hash of an array, Series or DataFrame (values, dtypes, shape and columns)."""
+    h = hashlib.sha256()
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        columns = list(data.columns) if isinstance(data, pd.DataFrame) else [data.name]
+        h.update(repr((type(data).__name__, data.shape, columns, [str(t) for t in np.atleast_1d(data.dtypes)])).encode())
+        h.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    else:
+        data = np.ascontiguousarray(data)
+        h.update(repr((data.shape, str(data.dtype))).encode())
+        h.update(data.tobytes() if data.dtype != object else repr(data.tolist()).encode())
+    return h.hexdigest()
+
+
+def _describe(value) -> str:
+    """Parameter value as text; nested estimators and kernels by class (their parameters are listed separately)."""
+    if hasattr(value, 'get_params') and not isinstance(value, type):
+        return type(value).__name__
+    if isinstance(value, (list, tuple)):
+        return repr(tuple(_describe(item) for item in value))
+    return repr(value)
+
+
+def estimator_digest(estimator, params: dict) -> str:
+    """Hash of an estimator configured with a parameter combination."""
+    configured = sklearn.base.clone(estimator).set_params(**params)
+    description = sorted((name, _describe(value)) for name, value in configured.get_params(deep=True).items())
+    return hashlib.sha256(repr((type(configured).__name__, description)).encode()).hexdigest()
+
+
+def fold_digest(train_idx, test_idx) -> str:
+    """Hash of the train/test indices of a fold."""
+    h = hashlib.sha256()
+    for indices in (train_idx, test_idx):
+        indices = np.asarray(indices, dtype=np.int64)
+        h.update(len(indices).to_bytes(8, 'little'))
+        h.update(indices.tobytes())
+    return h.hexdigest()
+
+
+def result_key(*parts: str) -> str:
+    """Cache key of a fold result from the digests and names it depends on."""
+    return hashlib.sha256(repr((CACHE_VERSION, sklearn.__version__) + parts).encode()).hexdigest()
+
+
+class CVCache:
+    """
+    SQLite store of cross-validation fold results with LRU size bound.
+    """
+
+    def __init__(self, db_path: Optional[str] = DEFAULT_DB_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: SQLite file (None disables the cache)
+            max_bytes: Maximum total size of the stored results
+        """
+        self.configure(db_path, max_bytes)
+
+    def configure(self, db_path: Optional[str], max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """Change the SQLite file and size bound (db_path None disables the cache)."""
+        self.db_path = db_path
+        self.max_bytes = max(0, max_bytes)
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    def settings(self) -> tuple:
+        """(db_path, max_bytes), to configure the cache of worker processes the same way."""
+        return self.db_path, self.max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One SQLite connection per thread and process (the file is created on first use)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cv_results ("
+                    " key TEXT PRIMARY KEY,"
+                    " value BLOB NOT NULL,"
+                    " size INTEGER NOT NULL,"
+                    " used_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS cv_results_used_at ON cv_results (used_at)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Look up fold results and mark them as recently used.
+
+        Args:
+            keys: Result keys (see result_key)
+
+        Returns:
+            Dict key -> result for the keys that were found
+        """
+        found = {}
+        if not self.enabled or not keys:
+            return found
+        try:
+            conn = self._connection()
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), _SQLITE_CHUNK):
+                chunk = unique[start:start + _SQLITE_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value FROM cv_results WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, value in rows:
+                    found[key] = pickle.loads(value)
+            if found:
+                with conn:
+                    conn.executemany(
+                        "UPDATE cv_results SET used_at = ? WHERE key = ?",
+                        [(time.time(), key) for key in found]
+                    )
+        except (OSError, sqlite3.Error, pickle.UnpicklingError, EOFError) as e:
+            print(f"Error reading CV cache: {e}")
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, results: Dict[str, Any]) -> None:
+        """
+        Store fold results, then evict the least recently used ones over max_bytes.
+
+        Args:
+            results: Dict key -> result (picklable)
+        """
+        if not self.enabled or not results:
+            return
+        try:
+            now = time.time()
+            rows = []
+            for key, value in results.items():
+                blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                rows.append((key, blob, len(blob), now))
+            with self._connection() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cv_results (key, value, size, used_at) VALUES (?, ?, ?, ?)", rows
+                )
+                self._evict(conn)
+        except (OSError, sqlite3.Error, pickle.PicklingError) as e:
+            print(f"Error writing CV cache: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete least recently used entries until the stored results fit in max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cv_results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM cv_results ORDER BY used_at"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM cv_results WHERE key = ?", stale)
+
+    def purge(self) -> int:
+        """
+        Delete every stored result.
+
+        Returns:
+            Number of entries deleted
+        """
+        if not self.enabled:
+            return 0
+        try:
+            conn = self._connection()
+            with conn:
+                deleted = conn.execute("DELETE FROM cv_results").rowcount
+            conn.execute("VACUUM")
+            return deleted
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error purging CV cache: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters of this process and the stored size."""
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'enabled': self.enabled,
+            'db_path': self.db_path,
+            'max_bytes': self.max_bytes,
+        }
+        if self.enabled:
+            try:
+                entries, size = self._connection().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cv_results"
+                ).fetchone()
+                stats['entries'] = entries
+                stats['bytes'] = size
+            except (OSError, sqlite3.Error):
+                stats['entries'] = stats['bytes'] = None
+        return stats
+
+
+# Shared by every training in the process (training workers apply the Config settings)
+cv_cache = CVCache()
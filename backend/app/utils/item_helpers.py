@@ -83,45 +83,28 @@ def build_parent_child_map(fase_items: List[Any]) -> Dict[int, List[int]]:
     Returns:
         Dict mapping parent_item_tipo_id -> [child_item_tipo_ids]
     """
-    parent_map = {}
-
-    for item in fase_items:
-        # Handle both dict and object access
-        parent_id = None
+    def fields(item):
         if hasattr(item, 'parent_id'):  # SQLAlchemy model
-            parent_id = item.parent_id
-            item_tipo_id = item.item_tipo_id
-        elif isinstance(item, dict):  # Dictionary
-            parent_id = item.get('parent_id')
-            item_tipo_id = item.get('item_tipo_id')
-        else:
-            continue  # Skip invalid items
-
-        if parent_id:
-            # Find the parent's item_tipo_id
-            parent_item = next(
-                (i for i in fase_items 
-                 if ((hasattr(i, 'id') and i.id == parent_id) or 
-                     (isinstance(i, dict) and i.get('id') == parent_id))),
-                None
-            )
-            if parent_item:
-                # Get parent's item_tipo_id
-                if hasattr(parent_item, 'item_tipo_id'):  # SQLAlchemy model
-                    parent_item_tipo_id = parent_item.item_tipo_id
-                else:  # Dictionary
-                    parent_item_tipo_id = parent_item.get('item_tipo_id')
-
-                # Get child's item_tipo_id
-                if hasattr(item, 'item_tipo_id'):  # SQLAlchemy model
-                    child_item_tipo_id = item.item_tipo_id
-                else:  # Dictionary
-                    child_item_tipo_id = item.get('item_tipo_id')
-
-                if parent_item_tipo_id is not None and child_item_tipo_id is not None:
-                    if parent_item_tipo_id not in parent_map:
-                        parent_map[parent_item_tipo_id] = []
-                    parent_map[parent_item_tipo_id].append(child_item_tipo_id)
+            return getattr(item, 'id', None), item.item_tipo_id, item.parent_id
+        if isinstance(item, dict):  # Dictionary
+            return item.get('id'), item.get('item_tipo_id'), item.get('parent_id')
+        return None  # Skip invalid items
+
+    rows = [row for row in (fields(item) for item in fase_items) if row is not None]
+
+    # Index item_tipo_id by item id once instead of searching the parent of every child
+    item_tipo_by_id = {}
+    for item_id, item_tipo_id, _ in rows:
+        if item_id is not None:
+            item_tipo_by_id.setdefault(item_id, item_tipo_id)
+
+    parent_map = {}
+    for _, child_item_tipo_id, parent_id in rows:
+        if not parent_id or parent_id not in item_tipo_by_id:
+            continue
+        parent_item_tipo_id = item_tipo_by_id[parent_id]
+        if parent_item_tipo_id is not None and child_item_tipo_id is not None:
+            parent_map.setdefault(parent_item_tipo_id, []).append(child_item_tipo_id)
 
     return parent_map
 
@@ -0,0 +1,167 @@
+"""
+Mapping between phase items (FaseItemTree nodes) and model target keys.
+
+Items and targets are matched by exact normalized name (see normalize_key),
+trying the item description first and the item type name second. The mapping
+only depends on the phase items and the trained targets, so it is built once
+per (fase_id, model version, items) and reused by every functional unit and
+request instead of being recomputed with string comparisons per UF.
+
+The items are part of the cache key, so an index never outlives the item
+tree it was built from (trees are revalidated across processes, see
+services/fase_item_tree.py).
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.charts_utils import normalize_key
+
+
+# Items whose model target has a different name
+# TODO: Remove this when the models are updated
+TARGET_ALIASES = {
+    '3.1 - GEOLOGÍA': '3 - GEOLOGÍA',
+}
+
+# Maximum number of (fase, model version, items) indexes kept in memory
+MAX_CACHED_INDEXES = 32
+
+_NORMALIZED_ALIASES = {normalize_key(item): target for item, target in TARGET_ALIASES.items()}
+
+
+@dataclass(frozen=True)
+class ItemModelIndex:
+    """Precomputed item_tipo_id -> target key mapping for a phase."""
+    target_keys: Tuple[str, ...]
+    targets: Dict[int, str]
+    unmapped: List[Dict[str, Any]]
+
+
+def _build_target_lookup(target_keys: Iterable[str]) -> Dict[str, str]:
+    """Map normalized target names to target keys (first key wins on collisions)."""
+    lookup = {}
+    for key in target_keys:
+        lookup.setdefault(normalize_key(key), key)
+    return lookup
+
+
+def _resolve(names: Iterable[Optional[str]], lookup: Dict[str, str]) -> Optional[str]:
+    for name in names:
+        if not name:
+            continue
+        normalized = normalize_key(name)
+        alias = _NORMALIZED_ALIASES.get(normalized)
+        if alias is not None:
+            normalized = normalize_key(alias)
+        if normalized in lookup:
+            return lookup[normalized]
+    return None
+
+
+def resolve_target_key(item_name: str, target_keys: Iterable[str]) -> Optional[str]:
+    """
+    Find the model target key for a single item name.
+
+    Args:
+        item_name: Item description (e.g. "3.1 - GEOLOGÍA")
+        target_keys: Available target keys
+
+    Returns:
+        Matching target key or None
+    """
+    return _resolve([item_name], _build_target_lookup(target_keys))
+
+
+def build_item_model_index(
+    items_requeridos: List[Any],
+    target_keys: Iterable[str],
+    parent_item_tipo_ids: set
+) -> ItemModelIndex:
+    """
+    Build the item_tipo_id -> target key mapping for a phase.
+
+    Parent items are never mapped (their value is the sum of their children)
+    and are not reported as unmapped.
+
+    Args:
+        items_requeridos: FaseItemNode objects of the phase
+        target_keys: Trained target keys
+        parent_item_tipo_ids: item_tipo_ids of parent items
+
+    Returns:
+        ItemModelIndex with the mapping and the leaf items without a model
+    """
+    target_keys = tuple(target_keys)
+    lookup = _build_target_lookup(target_keys)
+    targets = {}
+    unmapped = []
+
+    for node in items_requeridos:
+        if node.item_tipo_id in parent_item_tipo_ids:
+            continue
+
+        target_key = _resolve([node.descripcion, node.item_tipo_nombre], lookup)
+        if target_key is not None:
+            targets[node.item_tipo_id] = target_key
+        else:
+            unmapped.append({
+                'item_tipo_id': node.item_tipo_id,
+                'item': node.nombre
+            })
+
+    return ItemModelIndex(target_keys=target_keys, targets=targets, unmapped=unmapped)
+
+
+_cache: "OrderedDict[Tuple, ItemModelIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_item_model_index(
+    fase_id: int,
+    model_version: Optional[str],
+    items_requeridos: List[Any],
+    target_keys: Iterable[str],
+    parent_item_tipo_ids: set
+) -> ItemModelIndex:
+    """
+    Return the cached item/target index for a phase, building it on a miss.
+
+    The cache key includes a signature of the phase items, so editing the
+    items of a phase or retraining its models yields a new index.
+
+    Args:
+        fase_id: Phase ID
+        model_version: Version of the loaded models artifact (None if unknown)
+        items_requeridos: FaseItemNode objects of the phase
+        target_keys: Trained target keys
+        parent_item_tipo_ids: item_tipo_ids of parent items
+
+    Returns:
+        ItemModelIndex
+    """
+    target_keys = tuple(target_keys)
+    # Nodes are immutable (id, item_tipo, parent, descripcion, ...) so they are their own signature
+    items_signature = (tuple(items_requeridos), frozenset(parent_item_tipo_ids))
+    key = (fase_id, model_version, items_signature)
+
+    with _cache_lock:
+        index = _cache.get(key)
+        # Target keys are compared too, in case the version is unknown or stale
+        if index is not None and index.target_keys == target_keys:
+            _cache.move_to_end(key)
+            return index
+
+    index = build_item_model_index(items_requeridos, target_keys, parent_item_tipo_ids)
+    if index.unmapped:
+        print(f"✗ Items sin modelo en fase {fase_id}: {[item['item'] for item in index.unmapped]}")
+
+    with _cache_lock:
+        _cache[key] = index
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_INDEXES:
+            _cache.popitem(last=False)
+
+    return index
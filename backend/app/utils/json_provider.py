@@ -0,0 +1,127 @@
+"""
+JSON provider for large responses (predictions, sweeps, charts, geometries).
+
+Flask's default provider serializes with the standard library and fails on
+NumPy values, so routes convert every NumPy scalar with float() and every array
+with tolist() before calling jsonify. FastJSONProvider:
+
+- Serializes NumPy arrays and scalars, Enums (their value) and datetimes/dates
+  (ISO 8601) directly.
+- Uses orjson when it is installed (JSON_BACKEND=auto or orjson), which
+  serializes in C and writes the response body as bytes without an
+  intermediate str. JSON_BACKEND=stdlib keeps the standard library.
+
+Output matches the default provider (sorted keys, compact outside debug),
+except that orjson writes non-ASCII characters as UTF-8 instead of \\u escapes
+and NaN/Infinity as null (the standard library writes NaN, which is not valid
+JSON).
+"""
+
+import dataclasses
+import datetime
+import decimal
+import enum
+import json
+import uuid
+from typing import Any
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+JSON_BACKENDS = ('auto', 'orjson', 'stdlib')
+
+
+def json_default(o: Any) -> Any:
+    """
+    Convert values the JSON encoders don't handle natively.
+
+    Raises:
+        TypeError: If the value is not serializable
+    """
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, enum.Enum):
+        return o.value
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider with NumPy, Enum and datetime support and an optional orjson backend.
+    """
+
+    default = staticmethod(json_default)
+
+    def __init__(self, app, backend: str = 'auto'):
+        """
+        Args:
+            app: Flask application
+            backend: 'auto' (orjson if installed), 'orjson' or 'stdlib'
+
+        Raises:
+            ValueError: If the backend is unknown, or 'orjson' is not installed
+        """
+        super().__init__(app)
+        if backend not in JSON_BACKENDS:
+            raise ValueError(f"JSON_BACKEND inválido: '{backend}'. Opciones: {', '.join(JSON_BACKENDS)}")
+        if backend == 'orjson' and orjson is None:
+            raise ValueError("JSON_BACKEND=orjson requiere el paquete 'orjson'")
+        self.use_orjson = orjson is not None and backend != 'stdlib'
+        self.backend = 'orjson' if self.use_orjson else 'stdlib'
+
+    def _orjson_options(self, indent: bool = False) -> int:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _pretty(self) -> bool:
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize to a str. Custom encoder arguments fall back to the standard library."""
+        if self.use_orjson and not kwargs:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        """Deserialize JSON (orjson rejects NaN and Infinity, which are not valid JSON)."""
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Serialize the arguments (like jsonify) into an application/json response."""
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options(indent=self._pretty()))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def init_json_provider(app) -> None:
+    """Install FastJSONProvider with the backend of app.config['JSON_BACKEND']."""
+    app.json = FastJSONProvider(app, backend=app.config.get('JSON_BACKEND', 'auto'))
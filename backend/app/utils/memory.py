@@ -0,0 +1,104 @@
+"""
+Process memory readings for comparing gunicorn workers.
+
+RSS counts every resident page, including pages shared with the master and the
+other workers, so adding the RSS of all workers overstates real usage. PSS
+divides each shared page among the processes mapping it, so the PSS of all
+workers adds up to the physical memory they actually use.
+
+Values come from /proc (Linux). On other systems only the peak RSS of the
+current process is available.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+
+# /proc/<pid>/smaps_rollup and /proc/<pid>/status fields -> report keys
+_SMAPS_FIELDS = {
+    'Rss': 'rss_kb',
+    'Pss': 'pss_kb',
+    'Shared_Clean': 'shared_clean_kb',
+    'Shared_Dirty': 'shared_dirty_kb',
+    'Private_Clean': 'private_clean_kb',
+    'Private_Dirty': 'private_dirty_kb',
+}
+_STATUS_FIELDS = {
+    'VmRSS': 'rss_kb',
+    'RssAnon': 'rss_anon_kb',
+    'RssFile': 'rss_file_kb',
+    'RssShmem': 'rss_shmem_kb',
+}
+
+
+def _read_kb_fields(path: str, fields: Dict[str, str]) -> Dict[str, int]:
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                key = fields.get(name)
+                if key is not None:
+                    values[key] = int(rest.split()[0])
+    except (OSError, ValueError, IndexError):
+        pass
+    return values
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Get the memory usage of a process.
+
+    Args:
+        pid: Process ID (defaults to the current process)
+
+    Returns:
+        Dictionary with 'pid' and, in KiB: rss_kb, pss_kb, shared_kb, private_kb,
+        rss_anon_kb, rss_file_kb (fields the system does not expose are omitted)
+    """
+    pid = pid or os.getpid()
+    report: Dict[str, Any] = {'pid': pid}
+
+    report.update(_read_kb_fields(f"/proc/{pid}/status", _STATUS_FIELDS))
+    smaps = _read_kb_fields(f"/proc/{pid}/smaps_rollup", _SMAPS_FIELDS)
+    if smaps:
+        report['rss_kb'] = smaps['rss_kb']
+        report['pss_kb'] = smaps.get('pss_kb')
+        report['shared_kb'] = smaps.get('shared_clean_kb', 0) + smaps.get('shared_dirty_kb', 0)
+        report['private_kb'] = smaps.get('private_clean_kb', 0) + smaps.get('private_dirty_kb', 0)
+
+    if 'rss_kb' not in report and pid == os.getpid():
+        try:
+            import resource
+            report['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except (ImportError, OSError):
+            pass
+
+    return report
+
+
+def child_pids(pid: int) -> List[int]:
+    """
+    Get the direct children of a process (e.g. the workers of a gunicorn master).
+
+    Returns:
+        Sorted list of child PIDs (empty if /proc is not available)
+    """
+    children = []
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return children
+
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after the last ')'
+                fields = f.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
@@ -5,8 +5,16 @@ This module contains shared utility functions used across multiple ML notebooks
 for data preprocessing, outlier detection, and model evaluation.
 """
 
+import hashlib
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
 import numpy as np
 import pandas as pd
+import sklearn
 
 from sklearn.linear_model import LinearRegression, BayesianRidge, Ridge, ElasticNet
 from sklearn.svm import SVR
@@ -15,7 +23,10 @@ from sklearn.gaussian_process.kernels import RBF, ConstantKernel as C
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 from sklearn.compose import TransformedTargetRegressor
-from sklearn.model_selection import LeaveOneOut, GridSearchCV
+from sklearn.model_selection import KFold, LeaveOneOut, ParameterGrid
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from joblib import Parallel, delayed, effective_n_jobs
 from sklearn.metrics import r2_score
 import warnings
 
@@ -25,48 +36,141 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
 import plotly.graph_objects as go
 
+from app.utils.cv_cache import cv_cache, data_digest, estimator_digest, fold_digest, result_key
 
-def remove_outliers(df: pd.DataFrame, target: str, method: str = 'ensemble', 
-                   contamination: float = 0.1, voting_threshold: float = 0.5) -> pd.DataFrame:
+
+# Parallelism of grid searches and cross-validation (-1 = all cores).
+# Training workers lower it to stay within their CPU budget.
+_n_jobs = -1
+
+
+def set_n_jobs(n_jobs: int) -> None:
+    """Set the n_jobs used by every training routine in this process."""
+    global _n_jobs
+    _n_jobs = n_jobs
+
+
+def get_n_jobs() -> int:
+    """Return the n_jobs used by every training routine in this process."""
+    return _n_jobs
+
+
+def get_cpu_budget() -> int:
+    """Number of cores training may use in this process (n_jobs resolved like joblib: -1 = all)."""
+    if _n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + _n_jobs)
+    return max(1, _n_jobs)
+
+
+# Model selection: 'full' evaluates every parameter combination and candidate;
+# 'halving' prunes them with successive halving within a wall-clock budget per
+# search (seconds, None = unlimited). Training workers apply Config.
+SELECTION_MODES = ('full', 'halving')
+_selection_mode = 'full'
+_time_budget = None
+
+# Survivors are divided (and folds multiplied) by this factor at each rung
+HALVING_FACTOR = 3
+
+# Candidates that are skipped in halving mode above GP_MAX_SAMPLES samples:
+# their fits grow with n³ and are repeated for every optimizer restart
+EXPENSIVE_CANDIDATES = ('Gaussian Process',)
+GP_MAX_SAMPLES = 150
+
+
+def set_selection_mode(mode: str, time_budget: float = None) -> None:
     """
-    Advanced outlier detection using multiple methods.
-    
+    Set the model selection mode of every training routine in this process.
+
     Parameters:
     -----------
-    df : pd.DataFrame
-        Input dataframe
-    target : str
-        Target column name
-    method : str
-        'ensemble' (default): Combines multiple methods with voting
-        'isolation_forest': Uses Isolation Forest only
-        'lof': Uses Local Outlier Factor only
-        'robust_statistical': Uses Modified Z-score with MAD
-        'all_strict': All methods must agree (strictest)
-    contamination : float
-        Expected proportion of outliers (0.05-0.2 typical)
-    voting_threshold : float
-        For ensemble method, fraction of methods that must flag as outlier (0.5 = majority)
-    
-    Returns:
-    --------
-    pd.DataFrame
-        Cleaned dataframe without outliers
+    mode : str
+        'full' (default) or 'halving'
+    time_budget : float
+        Wall-clock seconds per search in halving mode (None or 0 = unlimited)
     """
-    # Remove zero values first (domain-specific)
-    df_nonzero = df[df[target] != 0].copy()
-    
-    if len(df_nonzero) < 10:
-        return df_nonzero
-    
-    # Prepare features: numerical columns + target
-    numerical_cols = df_nonzero.select_dtypes(include=[np.number]).columns.tolist()
-    
-    # Scale features for better outlier detection
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(df_nonzero[numerical_cols])
-    
-    # Initialize outlier flags
+    global _selection_mode, _time_budget
+    if mode not in SELECTION_MODES:
+        raise ValueError(f"Modo de selección '{mode}' no soportado (use {', '.join(SELECTION_MODES)})")
+    _selection_mode = mode
+    _time_budget = float(time_budget) if time_budget else None
+
+
+def get_selection_mode() -> tuple:
+    """Return (mode, time_budget) of this process (see set_selection_mode)."""
+    return _selection_mode, _time_budget
+
+
+# Outlier detection used by remove_outliers when no method is given: 'ensemble'
+# always, or 'auto' to use only the robust statistics (modified and plain
+# z-score of the target) on slices of at most ROBUST_MAX_SAMPLES rows.
+# Training workers apply Config.
+OUTLIER_MODES = ('ensemble', 'auto')
+OUTLIER_METHODS = OUTLIER_MODES + ('robust', 'isolation_forest', 'lof', 'robust_statistical', 'all_strict')
+ROBUST_MAX_SAMPLES = 30
+_outlier_mode = 'ensemble'
+
+# Outlier masks of the last slices seen by this process (see _outlier_mask)
+OUTLIER_MEMO_SIZE = 256
+_outlier_masks = OrderedDict()
+
+# Decisions list of the innermost recording_outliers block (None outside)
+_outlier_log = None
+
+
+def set_outlier_mode(mode: str) -> None:
+    """
+    Set the outlier detection used by remove_outliers when no method is given.
+
+    Parameters:
+    -----------
+    mode : str
+        'ensemble' (default) or 'auto' (robust statistics only on slices of
+        at most ROBUST_MAX_SAMPLES rows, ensemble above)
+    """
+    global _outlier_mode
+    if mode not in OUTLIER_MODES:
+        raise ValueError(f"Modo de outliers '{mode}' no soportado (use {', '.join(OUTLIER_MODES)})")
+    _outlier_mode = mode
+
+
+def get_outlier_mode() -> str:
+    """Return the outlier mode of this process (see set_outlier_mode)."""
+    return _outlier_mode
+
+
+def training_settings() -> tuple:
+    """Process settings that change trained models, for fingerprints (empty with the defaults)."""
+    settings = () if _selection_mode == 'full' else (_selection_mode, _time_budget)
+    if _outlier_mode != 'ensemble':
+        settings += (_outlier_mode,)
+    return settings
+
+
+@contextmanager
+def recording_outliers():
+    """
+    Collect the decisions of every remove_outliers call made inside the block
+    (nested blocks also pass them to the enclosing one).
+
+    with recording_outliers() as decisions:
+        ...
+    decisions -> [{'target', 'method', 'n_samples', 'removed'}, ...]
+    """
+    global _outlier_log
+    enclosing = _outlier_log
+    decisions = _outlier_log = []
+    try:
+        yield decisions
+    finally:
+        _outlier_log = enclosing
+        if enclosing is not None:
+            enclosing.extend(decisions)
+
+
+def _outlier_flags(X_scaled: np.ndarray, target_values: np.ndarray, target_scaled: np.ndarray,
+                   method: str, contamination: float) -> dict:
+    """Outlier flags of each detector used by method (rows flagged True)."""
     outlier_flags = {}
     
     # Method 1: Isolation Forest (excellent for high-dimensional data)
@@ -83,7 +187,7 @@ def remove_outliers(df: pd.DataFrame, target: str, method: str = 'ensemble',
         
     # Method 2: Local Outlier Factor (density-based, good for local anomalies)
     if method in ['ensemble', 'lof', 'all_strict']:
-        n_neighbors = min(20, len(df_nonzero) - 1)
+        n_neighbors = min(20, len(X_scaled) - 1)
         lof = LocalOutlierFactor(
             n_neighbors=n_neighbors,
             contamination=contamination
@@ -92,8 +196,7 @@ def remove_outliers(df: pd.DataFrame, target: str, method: str = 'ensemble',
         outlier_flags['lof'] = (lof_predictions == -1)
     
     # Method 3: Modified Z-score with MAD (robust to outliers themselves)
-    if method in ['ensemble', 'robust_statistical', 'all_strict']:
-        target_values = df_nonzero[target].values
+    if method in ['ensemble', 'robust_statistical', 'robust', 'all_strict']:
         median = np.median(target_values)
         mad = np.median(np.abs(target_values - median))
         
@@ -103,32 +206,122 @@ def remove_outliers(df: pd.DataFrame, target: str, method: str = 'ensemble',
             # Threshold of 3.5 is standard for modified Z-score
             outlier_flags['robust_statistical'] = np.abs(modified_z_scores) > 3.5
         else:
-            outlier_flags['robust_statistical'] = np.zeros(len(df_nonzero), dtype=bool)
+            outlier_flags['robust_statistical'] = np.zeros(len(target_values), dtype=bool)
     
     # Method 4: Multivariate Z-score on target (additional check)
-    if method in ['ensemble', 'all_strict']:
-        target_scaled = scaler.fit_transform(df_nonzero[[target]])
-        outlier_flags['z_score'] = np.abs(target_scaled.flatten()) > 3
+    if method in ['ensemble', 'robust', 'all_strict']:
+        outlier_flags['z_score'] = np.abs(target_scaled) > 3
+    
+    return outlier_flags
+
+
+def _compute_outlier_mask(df_nonzero: pd.DataFrame, numerical_cols: list, target: str, method: str,
+                          contamination: float, voting_threshold: float) -> np.ndarray:
+    """Rows of df_nonzero flagged as outliers by method."""
+    # Scale features for better outlier detection (the target is one of the columns)
+    X_scaled = StandardScaler().fit_transform(df_nonzero[numerical_cols])
+    target_values = df_nonzero[target].values
+    target_scaled = X_scaled[:, numerical_cols.index(target)]
+    
+    outlier_flags = _outlier_flags(X_scaled, target_values, target_scaled, method, contamination)
     
     # Combine methods based on selected strategy
-    if method == 'ensemble':
+    if method in ['ensemble', 'robust']:
         # Voting: flag as outlier if voting_threshold fraction of methods agree
         outlier_matrix = np.column_stack(list(outlier_flags.values()))
         votes = outlier_matrix.sum(axis=1)
-        is_outlier = votes >= (len(outlier_flags) * voting_threshold)
+        return votes >= (len(outlier_flags) * voting_threshold)
         
     elif method == 'all_strict':
         # All methods must agree (most conservative)
         outlier_matrix = np.column_stack(list(outlier_flags.values()))
-        is_outlier = outlier_matrix.all(axis=1)
+        return outlier_matrix.all(axis=1)
         
-    elif method in ['isolation_forest', 'lof', 'robust_statistical']:
-        # Single method
-        is_outlier = outlier_flags[method]
+    # Single method
+    return outlier_flags[method]
+
+
+def _outlier_mask(df_nonzero: pd.DataFrame, target: str, method: str,
+                  contamination: float, voting_threshold: float) -> np.ndarray:
+    """
+    Outlier mask of df_nonzero, memoized by the content of its numerical
+    columns: in this process (OUTLIER_MEMO_SIZE masks) and in the CV cache.
+    """
+    numerical_cols = df_nonzero.select_dtypes(include=[np.number]).columns.tolist()
+    key = result_key(
+        'outliers', data_digest(df_nonzero[numerical_cols]), target, method,
+        repr(contamination), repr(voting_threshold)
+    )
+    mask = _outlier_masks.get(key)
+    if mask is None:
+        mask = cv_cache.get_many([key]).get(key)
+        if mask is None:
+            mask = _compute_outlier_mask(df_nonzero, numerical_cols, target, method, contamination, voting_threshold)
+            cv_cache.set_many({key: mask})
+    _outlier_masks[key] = mask
+    _outlier_masks.move_to_end(key)
+    while len(_outlier_masks) > OUTLIER_MEMO_SIZE:
+        _outlier_masks.popitem(last=False)
+    return mask
+
+
+def remove_outliers(df: pd.DataFrame, target: str, method: str = None, 
+                   contamination: float = 0.1, voting_threshold: float = 0.5) -> pd.DataFrame:
+    """
+    Advanced outlier detection using multiple methods.
     
-    else:
+    The mask of each slice is memoized by content (see _outlier_mask) and
+    the decision is reported to the active recording_outliers recorders.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Input dataframe
+    target : str
+        Target column name
+    method : str
+        None (default): The process outlier mode (see set_outlier_mode)
+        'ensemble': Combines multiple methods with voting
+        'auto': 'robust' up to ROBUST_MAX_SAMPLES rows, 'ensemble' above
+        'robust': Voting of the Modified Z-score and the target Z-score only
+        'isolation_forest': Uses Isolation Forest only
+        'lof': Uses Local Outlier Factor only
+        'robust_statistical': Uses Modified Z-score with MAD
+        'all_strict': All methods must agree (strictest)
+    contamination : float
+        Expected proportion of outliers (0.05-0.2 typical)
+    voting_threshold : float
+        For ensemble method, fraction of methods that must flag as outlier (0.5 = majority)
+    
+    Returns:
+    --------
+    pd.DataFrame
+        Cleaned dataframe without outliers
+    """
+    method = method or _outlier_mode
+    if method not in OUTLIER_METHODS:
         raise ValueError(f"Unknown method: {method}")
     
+    # Remove zero values first (domain-specific)
+    df_nonzero = df[df[target] != 0].copy()
+    
+    if len(df_nonzero) < 10:
+        return df_nonzero
+    
+    # Small slices: IsolationForest and LOF flag a fixed share of a handful of rows
+    if method == 'auto':
+        method = 'robust' if len(df_nonzero) <= ROBUST_MAX_SAMPLES else 'ensemble'
+    
+    is_outlier = _outlier_mask(df_nonzero, target, method, contamination, voting_threshold)
+    
+    if _outlier_log is not None:
+        _outlier_log.append({
+            'target': target,
+            'method': method,
+            'n_samples': len(df_nonzero),
+            'removed': df_nonzero.index[is_outlier].tolist()
+        })
+    
     # Filter out outliers
     df_clean = df_nonzero[~is_outlier].copy()
     return df_clean
@@ -189,58 +382,166 @@ def calculate_metrics(y_true, y_pred, model_name: str = "Model", include_rmsle:
     
     return metrics
 
-def train_multiple_models(df_vp: pd.DataFrame, predictors: list[str], target: str, log_transform: str = 'none', 
-                          apply_outlier_removal: bool = True) -> tuple[np.ndarray, np.ndarray, np.ndarray, Pipeline, dict]:
+def _take(data, indices):
+    """Rows of an array or a pandas object."""
+    return data.iloc[indices] if hasattr(data, 'iloc') else data[indices]
+
+
+def _linear_loo_spec(model):
     """
-    Train multiple regression models and return the best one based on R² and MAPE.
+    (alpha, scaled, func, inverse_func) of a model whose leave-one-out
+    predictions have a closed form: Ridge or LinearRegression, optionally
+    after a StandardScaler and inside a TransformedTargetRegressor with
+    func/inverse_func. None for any other model.
+    """
+    func = inverse_func = None
+    estimator = model
+    if isinstance(estimator, TransformedTargetRegressor):
+        if estimator.transformer is not None or estimator.func is None or estimator.inverse_func is None:
+            return None
+        func, inverse_func = estimator.func, estimator.inverse_func
+        estimator = estimator.regressor
+
+    scaled = False
+    if isinstance(estimator, Pipeline):
+        steps = [step for _, step in estimator.steps]
+        if len(steps) == 2 and isinstance(steps[0], StandardScaler):
+            if not (steps[0].with_mean and steps[0].with_std):
+                return None
+            scaled = True
+        elif len(steps) != 1:
+            return None
+        estimator = steps[-1]
+
+    if type(estimator) is Ridge:
+        # Iterative solvers only approximate the exact solution
+        if estimator.solver not in ('auto', 'cholesky', 'svd') or estimator.positive or not np.isscalar(estimator.alpha):
+            return None
+        alpha = float(estimator.alpha)
+    elif type(estimator) is LinearRegression:
+        if estimator.positive:
+            return None
+        alpha = 0.0
+    else:
+        return None
+    if not estimator.fit_intercept:
+        return None
+    return alpha, scaled, func, inverse_func
+
+
+def _linear_loo_predict(model, X, y) -> np.ndarray | None:
+    """
+    Closed-form leave-one-out predictions of a linear model (see _linear_loo_spec).
+
+    The scaler is refit on every fold, so the penalty changes from fold to
+    fold and the fixed hat-matrix shortcut does not apply. Instead the sums of
+    the data are downdated by each left-out row and the n small (features x
+    features) ridge systems are solved at once.
+
+    Returns:
+        Predictions in the original scale of y, or None when the model has no
+        closed form or the data needs the refit loop (singular folds, folds
+        where a column becomes constant)
+    """
+    spec = _linear_loo_spec(model)
+    if spec is None:
+        return None
+    alpha, scaled, func, inverse_func = spec
+
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X.reshape(-1, 1)
+    t = np.asarray(y, dtype=float).ravel()
+    if func is not None:
+        with np.errstate(all='ignore'):
+            t = np.asarray(func(t), dtype=float)
+    n, p = X.shape
+    if n < 3 or not (np.isfinite(X).all() and np.isfinite(t).all()):
+        return None
+    # A column with a single distinct row becomes constant in one fold, which
+    # the downdated sums can't tell apart from a tiny variance
+    for column in X.T:
+        counts = np.unique(column, return_counts=True)[1]
+        if len(counts) == 2 and counts.min() == 1:
+            return None
+
+    # Sums of the centered data minus the left-out row, one fold per row
+    x_mean, t_mean = X.mean(axis=0), t.mean()
+    Xs, ts = X - x_mean, t - t_mean
+    m = n - 1
+    fold_x_mean = (Xs.sum(axis=0) - Xs) / m
+    fold_t_mean = (ts.sum() - ts) / m
+    C = (Xs.T @ Xs)[None] - Xs[:, :, None] * Xs[:, None, :] - m * fold_x_mean[:, :, None] * fold_x_mean[:, None, :]
+    b = (Xs.T @ ts)[None] - Xs * ts[:, None] - m * fold_x_mean * fold_t_mean[:, None]
+
+    if scaled:
+        # Same scale as StandardScaler on the fold (constant columns keep scale 1)
+        var = np.clip(np.diagonal(C, axis1=1, axis2=2) / m, 0, None)
+        eps = np.finfo(np.float64).eps
+        constant = var <= m * eps * var + (m * (fold_x_mean + x_mean) * eps) ** 2
+        scale = np.sqrt(var)
+        scale[constant | (scale < 10 * eps)] = 1.0
+        C = C / (scale[:, :, None] * scale[:, None, :])
+        b = b / scale
+
+    A = C + alpha * np.eye(p)[None]
+    if alpha == 0 and np.any(np.linalg.cond(A) > 1e10):
+        return None
+    try:
+        coef = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+    except np.linalg.LinAlgError:
+        return None
+    if scaled:
+        coef = coef / scale
+
+    y_pred = fold_t_mean + t_mean + ((Xs - fold_x_mean) * coef).sum(axis=1)
+    if inverse_func is not None:
+        y_pred = np.asarray(inverse_func(y_pred), dtype=float)
+    return y_pred
+
+
+def loo_predict(model, X, y) -> np.ndarray:
+    """
+    Leave-one-out predictions of a model.
+    
+    Ridge and LinearRegression models (with or without StandardScaler and a
+    func/inverse_func TransformedTargetRegressor) are evaluated in closed form;
+    any other model is refit once per left-out row.
     
     Parameters:
     -----------
-    df_vp : pd.DataFrame
-        Input dataframe
-    predictors : list[str]
-        List of predictor column names
-    target : str
-        Target column name
-    log_transform : str
-        Type of log transformation: 'none', 'input', 'output', or 'both'
-    apply_outlier_removal : bool
-        Whether to apply outlier removal (default: True)
+    model : estimator
+        Model to evaluate. It is left fitted on the last training fold (every
+        row but the last), as after a refit loop.
+    X : np.ndarray or pd.DataFrame
+        Feature matrix
+    y : np.ndarray or pd.Series
+        Target values
     
     Returns:
     --------
-    tuple containing:
-        - X : np.ndarray
-            Feature matrix (transformed if log_transform='input' or 'both')
-        - y : np.ndarray
-            Target values (original scale)
-        - y_predicted : np.ndarray
-            Predicted values from best model (original scale)
-        - best_model : Pipeline
-            Best trained model pipeline
-        - metrics : dict
-            Performance metrics for the best model
+    np.ndarray
+        Prediction for each row from the model trained without it
     """
-    
-    df_vp = df_vp[df_vp[target] > 0].copy()
-    
-    if apply_outlier_removal:
-        df_clean = remove_outliers(df_vp, target, method='ensemble', contamination=0.1)
-    else:
-        df_clean = df_vp
-    
-    X = df_clean[predictors].values
-    y = df_clean[target].values
-    
-    if log_transform in ['input', 'both']:
-        X = np.log1p(X)
-    
-    warnings.filterwarnings('ignore', category=UserWarning)
-    
-    # Determine if we need to wrap models with TransformedTargetRegressor
-    use_target_transform = log_transform in ['output', 'both']
-    
-    model_configs = {
+    n = len(y)
+    y_pred = _linear_loo_predict(model, X, y)
+    if y_pred is not None:
+        model.fit(_take(X, np.arange(n - 1)), _take(y, np.arange(n - 1)))
+        return y_pred
+
+    y_pred = np.zeros(n)
+    for train_idx, test_idx in LeaveOneOut().split(X):
+        model.fit(_take(X, train_idx), _take(y, train_idx))
+        y_pred[test_idx] = model.predict(_take(X, test_idx))
+    return y_pred
+
+
+LOG_TRANSFORMS = ['none', 'input', 'output', 'both']
+
+
+def _model_configs() -> dict:
+    """Candidate models and their grid-search parameters (fresh estimators)."""
+    return {
         'Bayesian Ridge': {
             'model': BayesianRidge(),
             'params': {
@@ -280,70 +581,573 @@ def train_multiple_models(df_vp: pd.DataFrame, predictors: list[str], target: st
             'params': {}
         }
     }
-    
-    loo = LeaveOneOut()
-    all_results = []
-    all_models = {}
-    all_predictions = {}
-    
-    for name, config in model_configs.items():
+
+
+def _candidate_estimators(log_transform: str) -> list[tuple]:
+    """
+    (name, estimator, param grid) of every candidate for a log transformation.
+    Output transformations wrap the pipeline in a TransformedTargetRegressor.
+    """
+    use_target_transform = log_transform in ['output', 'both']
+    candidates = []
+    for name, config in _model_configs().items():
         pipeline = Pipeline([
             ('scaler', StandardScaler()),
             ('model', config['model'])
         ])
-        
-        # Wrap with TransformedTargetRegressor if output transformation is needed
         if use_target_transform:
-            model_to_train = TransformedTargetRegressor(
+            estimator = TransformedTargetRegressor(
                 regressor=pipeline,
                 func=np.log1p,
                 inverse_func=np.expm1
             )
             # Adjust param grid keys to include 'regressor__' prefix
-            adjusted_params = {f'regressor__{k}': v for k, v in config['params'].items()}
+            params = {f'regressor__{k}': v for k, v in config['params'].items()}
         else:
-            model_to_train = pipeline
-            adjusted_params = config['params']
-        
-        if adjusted_params:
-            grid_search = GridSearchCV(
-                model_to_train, 
-                adjusted_params, 
-                cv=min(3, len(y)),
-                scoring='neg_mean_squared_error',
-                n_jobs=-1
+            estimator = pipeline
+            params = config['params']
+        candidates.append((name, estimator, params))
+    return candidates
+
+
+def _fold_score(estimator, params: dict, X, y, train_idx, test_idx,
+                scoring: str = 'neg_mean_squared_error') -> float:
+    """Score of one parameter combination on one fold (NaN if the fit fails, as in GridSearchCV)."""
+    model = clone(estimator).set_params(**params)
+    with warnings.catch_warnings():
+        # Tasks may run in joblib workers, which don't inherit warning filters
+        warnings.filterwarnings('ignore', category=UserWarning)
+        try:
+            model.fit(_take(X, train_idx), _take(y, train_idx))
+            return get_scorer(scoring)(model, _take(X, test_idx), _take(y, test_idx))
+        except Exception:
+            return np.nan
+
+
+def _timed_fold_score(*args) -> tuple:
+    """(_fold_score, seconds it took)."""
+    start = time.perf_counter()
+    score = _fold_score(*args)
+    return score, time.perf_counter() - start
+
+
+def _fold_tasks(estimator, grid: list[dict], X, y, folds: list, scoring: str, pairs: list = None) -> list[tuple]:
+    """
+    (args of _fold_score, cache key) of every parameter combination × fold
+    in GridSearchCV order, or of the (combination index, fold index) pairs.
+    Keys are None when the CV cache is disabled.
+    """
+    if pairs is None:
+        pairs = [(i, f) for i in range(len(grid)) for f in range(len(folds))]
+    if not cv_cache.enabled:
+        return [((estimator, grid[i], X, y, *folds[f], scoring), None) for i, f in pairs]
+    data_key = data_digest(X) + data_digest(y)
+    fold_keys = {}
+    estimator_keys = {}
+    tasks = []
+    for i, f in pairs:
+        if i not in estimator_keys:
+            estimator_keys[i] = estimator_digest(estimator, grid[i])
+        if f not in fold_keys:
+            fold_keys[f] = fold_digest(*folds[f])
+        tasks.append((
+            (estimator, grid[i], X, y, *folds[f], scoring),
+            result_key('fold', scoring, data_key, estimator_keys[i], fold_keys[f])
+        ))
+    return tasks
+
+
+def _cached_fold_scores(parallel, tasks: list[tuple], timed: bool = False) -> list:
+    """
+    Run fold tasks (see _fold_tasks) on the pool, reading and storing their
+    scores in the CV cache. With timed, every score comes as (score, seconds),
+    0 seconds for cached ones.
+    """
+    cached = cv_cache.get_many([key for _, key in tasks if key is not None])
+    pending = [(args, key) for args, key in tasks if key is None or key not in cached]
+    computed = parallel(delayed(_timed_fold_score if timed else _fold_score)(*args) for args, _ in pending)
+    cv_cache.set_many({
+        key: result[0] if timed else result for (_, key), result in zip(pending, computed) if key is not None
+    })
+    computed = iter(computed)
+    return [
+        ((cached[key], 0.0) if timed else cached[key]) if key in cached else next(computed)
+        for _, key in tasks
+    ]
+
+
+def _halving_schedule(n_candidates: int, n_folds: int) -> list[tuple]:
+    """
+    (survivors, folds evaluated) at each rung of successive halving: there
+    are as many rungs as times HALVING_FACTOR fits in min(candidates, folds),
+    survivors are divided and folds multiplied by it, and the last rung
+    evaluates its survivors on every fold.
+    """
+    rungs = 1
+    while HALVING_FACTOR ** rungs <= min(n_candidates, n_folds):
+        rungs += 1
+    return [
+        (math.ceil(n_candidates / HALVING_FACTOR ** rung), math.ceil(n_folds / HALVING_FACTOR ** (rungs - 1 - rung)))
+        for rung in range(rungs)
+    ]
+
+
+def _rank_by_score(means, indices) -> list:
+    """Indices by mean score, best first (failed last, ties in grid order like GridSearchCV)."""
+    return sorted(indices, key=lambda i: (np.isnan(means[i]), -np.nan_to_num(means[i], nan=0.0), i))
+
+
+def _successive_halving(parallel, searches: dict, deadline: float = None) -> dict:
+    """
+    Successive halving over the parameter grids of several searches at once,
+    one pool batch per rung. Survivors of a rung are those with the best mean
+    score on the folds evaluated so far. When the deadline (time.monotonic())
+    has passed, no further rung starts and the best survivor so far wins.
+
+    Parameters:
+    -----------
+    searches : dict
+        {search id: (estimator, grid, X, y, folds, scoring)}
+    deadline : float
+        time.monotonic() after which no rung starts (None = unlimited)
+
+    Returns:
+    --------
+    dict
+        {search id: {'params': best combination (or the exception if every
+        fit failed), 'score': its mean score, 'fit_seconds': mean seconds of
+        the fold fits that ran, 'evaluated': combinations in the last rung,
+        'folds': folds they were evaluated on, 'stopped': whether the
+        deadline cut the schedule}}
+    """
+    schedules, survivors, scores, seconds, done = {}, {}, {}, {}, {}
+    for sid, (_, grid, _, _, folds, _) in searches.items():
+        schedules[sid] = _halving_schedule(len(grid), len(folds))
+        survivors[sid] = list(range(len(grid)))
+        scores[sid] = np.full((len(grid), len(folds)), np.nan)
+        seconds[sid] = []
+        done[sid] = 0
+
+    stopped = False
+    for rung in range(max((len(schedule) for schedule in schedules.values()), default=0)):
+        if rung and deadline is not None and time.monotonic() > deadline:
+            stopped = True
+            break
+        tasks, owners = [], []
+        for sid, schedule in schedules.items():
+            if rung >= len(schedule):
+                continue
+            n_survivors, n_folds = schedule[rung]
+            if rung:
+                means = np.average(scores[sid][:, :done[sid]], axis=1)
+                survivors[sid] = _rank_by_score(means, survivors[sid])[:n_survivors]
+            pairs = [(i, f) for i in survivors[sid] for f in range(done[sid], n_folds)]
+            estimator, grid, X, y, folds, scoring = searches[sid]
+            tasks += _fold_tasks(estimator, grid, X, y, folds, scoring, pairs)
+            owners += [(sid, i, f) for i, f in pairs]
+            done[sid] = n_folds
+        for (sid, i, f), (score, elapsed) in zip(owners, _cached_fold_scores(parallel, tasks, timed=True)):
+            scores[sid][i, f] = score
+            if elapsed:
+                seconds[sid].append(elapsed)
+
+    outcome = {}
+    for sid, (_, grid, _, _, _, _) in searches.items():
+        means = np.average(scores[sid][:, :done[sid]], axis=1)
+        best = _rank_by_score(means, survivors[sid])[0]
+        if np.isnan(means[best]):
+            evaluated = scores[sid][survivors[sid], :done[sid]]
+            failed = int(np.isnan(evaluated).sum())
+            params = ValueError(
+                f"All the {evaluated.size} fits failed." if failed == evaluated.size
+                else f"{failed} of the {evaluated.size} fits failed."
             )
-            grid_search.fit(X, y)
-            best_model = grid_search.best_estimator_
         else:
-            best_model = model_to_train
-        
-        y_pred_loo = np.zeros(len(y))
-        
-        for train_idx, test_idx in loo.split(X):
-            X_train, X_test = X[train_idx], X[test_idx]
-            y_tr, y_te = y[train_idx], y[test_idx]
-            best_model.fit(X_train, y_tr)
-            # predict() now automatically applies inverse_func if TransformedTargetRegressor is used
-            y_pred_loo[test_idx] = best_model.predict(X_test)
-        
-        # No need for manual inverse transform - TransformedTargetRegressor handles it!
-        y_pred_original = y_pred_loo
-        
-        # Store model and predictions
-        all_models[name] = best_model
-        all_predictions[name] = y_pred_original
-        
-        metrics = calculate_metrics(y, y_pred_original, model_name=name)
-        all_results.append(metrics)
-    
+            params = grid[best]
+        outcome[sid] = {
+            'params': params,
+            'score': means[best],
+            'fit_seconds': float(np.mean(seconds[sid])) if seconds[sid] else 0.0,
+            'evaluated': len(survivors[sid]),
+            'folds': done[sid],
+            'stopped': stopped and done[sid] < len(scores[sid][0])
+        }
+    return outcome
+
+
+def _final_estimator(estimator):
+    """Innermost regressor of a TransformedTargetRegressor / Pipeline."""
+    if isinstance(estimator, TransformedTargetRegressor):
+        estimator = estimator.regressor
+    if isinstance(estimator, Pipeline):
+        estimator = estimator.steps[-1][1]
+    return estimator
+
+
+def _halving_note(name: str, grid_size: int, n_folds: int, result: dict) -> str | None:
+    """Pruning note of the parameter grid of a candidate (None if nothing was pruned)."""
+    if result['stopped']:
+        return (
+            f"{name}: presupuesto de tiempo agotado, parámetros elegidos entre {result['evaluated']}/{grid_size} "
+            f"combinaciones con {result['folds']} de {n_folds} folds"
+        )
+    if result['evaluated'] < grid_size:
+        return f"{name}: {grid_size - result['evaluated']}/{grid_size} combinaciones descartadas por sucesivas mitades"
+    return None
+
+
+def _loo_candidate(estimator, params: dict, X: np.ndarray, y: np.ndarray):
+    """Leave-one-out predictions of a candidate with its selected parameters."""
+    model = clone(estimator).set_params(**params)
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', category=UserWarning)
+        try:
+            return model, loo_predict(model, X, y)
+        except Exception as e:
+            return model, e
+
+
+def _cached_loo_candidates(parallel, tasks: list[tuple]) -> list[tuple]:
+    """
+    Run _loo_candidate on (estimator, params, X, y) tasks, reading and
+    storing the successful evaluations in the CV cache.
+    """
+    keys = [
+        result_key('loo', data_digest(X) + data_digest(y), estimator_digest(estimator, params))
+        if cv_cache.enabled else None
+        for estimator, params, X, y in tasks
+    ]
+    cached = cv_cache.get_many([key for key in keys if key is not None])
+    pending = [(task, key) for task, key in zip(tasks, keys) if key is None or key not in cached]
+    computed = parallel(delayed(_loo_candidate)(*task) for task, _ in pending)
+    cv_cache.set_many({
+        key: evaluation for (_, key), evaluation in zip(pending, computed)
+        if key is not None and not isinstance(evaluation[1], Exception)
+    })
+    computed = iter(computed)
+    return [cached[key] if key in cached else next(computed) for key in keys]
+
+
+def _best_params(grid: list[dict], scores: np.ndarray) -> dict:
+    """
+    Parameters with the best mean fold score, chosen like GridSearchCV
+    (first best in grid order, failed combinations last).
+
+    Raises:
+        ValueError: If every fit failed
+    """
+    means = np.average(scores, axis=1)
+    if np.isnan(means).all():
+        raise ValueError(f"All the {scores.size} fits failed.")
+    return grid[int(np.nanargmax(means))]
+
+
+def _select_best_model(all_results: list[dict], all_models: dict, all_predictions: dict) -> tuple:
+    """Best candidate by R² (then MAPE): (model, predictions, metrics)."""
     results_df = pd.DataFrame(all_results).sort_values('R²', ascending=False)
     results_df_sorted = results_df.sort_values(by=['R²', 'MAPE (%)'], ascending=[False, True])
     best_model_name = results_df_sorted.iloc[0]['Model']
-    best_model = all_models[best_model_name]
-    y_predicted = all_predictions[best_model_name]
-    best_metrics = results_df_sorted.iloc[0].to_dict()
-    return X, y, y_predicted, best_model, best_metrics
+    return all_models[best_model_name], all_predictions[best_model_name], results_df_sorted.iloc[0].to_dict()
+
+
+def _grid_selection(parallel, datasets: dict, candidates: dict, failures: dict) -> dict:
+    """
+    Full mode of search_models: every parameter combination on every fold.
+    Returns {(key, name): best params} of the candidates to evaluate.
+    """
+    # Grid search: one task per (dataset, candidate, parameters, fold)
+    grids = {}
+    fold_tasks = []
+    for key, (X, y, _, folds) in datasets.items():
+        for name, estimator, params in candidates[key]:
+            if not params:
+                continue
+            grid = list(ParameterGrid(params))
+            grids[key, name] = grid
+            fold_tasks += _fold_tasks(estimator, grid, X, y, folds, 'neg_mean_squared_error')
+
+    scores = iter(_cached_fold_scores(parallel, fold_tasks))
+
+    best = {}
+    for key, (_, _, _, folds) in datasets.items():
+        for name, _, params in candidates[key]:
+            if not params:
+                best[key, name] = {}
+                continue
+            grid = grids[key, name]
+            fold_scores = np.array([next(scores) for _ in range(len(grid) * len(folds))]).reshape(len(grid), len(folds))
+            try:
+                best[key, name] = _best_params(grid, fold_scores)
+            except ValueError as e:
+                failures.setdefault(key, e)
+    return best
+
+
+def _halving_selection(parallel, datasets: dict, candidates: dict, failures: dict, pruned: dict,
+                       deadline: float = None, n_workers: int = 1) -> dict:
+    """
+    Halving mode of search_models. Every parameter grid goes through
+    successive halving (candidates without parameters too, to rank them);
+    candidates whose cross-validation fails are dropped (the dataset fails
+    if all do). Only the best 1/HALVING_FACTOR candidates of each dataset by
+    CV score are evaluated with leave-one-out, and of those only the ones
+    whose estimated leave-one-out time still fits in the budget (the best
+    one always is). Pruning reasons are appended to pruned[key].
+    Returns {(key, name): best params} of the candidates to evaluate.
+    """
+    searches = {
+        (key, name): (estimator, list(ParameterGrid(params)), X, y, folds, 'neg_mean_squared_error')
+        for key, (X, y, _, folds) in datasets.items() for name, estimator, params in candidates[key]
+    }
+    outcome = _successive_halving(parallel, searches, deadline)
+
+    best = {}
+    spent = 0.0
+    for key, (_, y, _, _) in datasets.items():
+        results = {}
+        for name, _, _ in candidates[key]:
+            result = outcome[key, name]
+            if isinstance(result['params'], Exception):
+                pruned[key].append(f"{name}: falló en la validación cruzada ({result['params']})")
+            else:
+                results[name] = result
+        if not results:
+            failures.setdefault(key, outcome[key, candidates[key][0][0]]['params'])
+            continue
+        names = list(results)
+        ranked = [names[i] for i in _rank_by_score(np.array([results[name]['score'] for name in names]), range(len(names)))]
+        keep = math.ceil(len(ranked) / HALVING_FACTOR)
+        for name in ranked[keep:]:
+            pruned[key].append(
+                f"{name}: descartado por sucesivas mitades (MSE CV {-results[name]['score']:.4g}, "
+                f"mejor {-results[ranked[0]]['score']:.4g})"
+            )
+        for position, name in enumerate(ranked[:keep]):
+            estimator, grid, _, _, folds, _ = searches[key, name]
+            params = results[name]['params']
+            # Closed-form leave-one-out costs about one fit, the refit loop one fit per sample
+            model = clone(estimator).set_params(**params)
+            cost = results[name]['fit_seconds'] * (1 if _linear_loo_spec(model) is not None else len(y))
+            if position and deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic()) * n_workers - spent
+                if remaining <= 0:
+                    pruned[key].append(f"{name}: presupuesto de tiempo agotado antes del leave-one-out")
+                    continue
+                if cost > remaining:
+                    pruned[key].append(
+                        f"{name}: leave-one-out estimado en {cost:.2g} s, quedan {remaining:.2g} s de presupuesto"
+                    )
+                    continue
+            spent += cost
+            best[key, name] = params
+            note = _halving_note(name, len(grid), len(folds), results[name])
+            if note:
+                pruned[key].append(note)
+    return best
+
+
+def search_models(datasets: dict, n_jobs: int = None) -> dict:
+    """
+    Grid search and leave-one-out evaluation of every candidate model on
+    several datasets at once (e.g. every alcance × log transformation of a
+    target), as one batch of tasks on one joblib pool.
+
+    Every dataset is searched like GridSearchCV with
+    cv=min(3, n_samples) and neg_mean_squared_error. The fold fits of all
+    datasets, candidates and parameter combinations run first, then the
+    leave-one-out evaluation of each candidate with its best parameters.
+    Tasks are dispatched and collected in a fixed order, so results don't
+    depend on n_jobs. Fold scores and leave-one-out evaluations found in the
+    CV cache (see cv_cache.py) are not computed again.
+
+    In halving mode (see set_selection_mode) parameter combinations and
+    candidates are pruned by successive halving, expensive candidates are
+    skipped above GP_MAX_SAMPLES samples, and the search stops starting new
+    work when its time budget runs out. What was pruned and why is added
+    to the metrics as 'Pruned'.
+
+    Parameters:
+    -----------
+    datasets : dict
+        {key: (X, y, log_transform, folds)}. folds is the list of
+        (train_idx, test_idx) of the grid search; datasets with the same rows
+        (the log transformations of one slice) can share it.
+    n_jobs : int
+        Joblib workers (defaults to get_n_jobs())
+
+    Returns:
+    --------
+    dict
+        {key: (X, y, y_predicted, best_model, metrics)}, or the exception
+        that made the dataset fail
+    """
+    warnings.filterwarnings('ignore', category=UserWarning)
+
+    mode, time_budget = get_selection_mode()
+    halving = mode == 'halving'
+    deadline = time.monotonic() + time_budget if halving and time_budget else None
+    n_jobs = get_n_jobs() if n_jobs is None else n_jobs
+
+    candidates = {key: _candidate_estimators(log_transform) for key, (_, _, log_transform, _) in datasets.items()}
+    failures = {}
+    pruned = {key: [] for key in datasets}
+
+    if halving:
+        for key, (_, y, _, _) in datasets.items():
+            if len(y) > GP_MAX_SAMPLES:
+                pruned[key] += [
+                    f"{name}: {len(y)} muestras, más de {GP_MAX_SAMPLES}"
+                    for name, _, _ in candidates[key] if name in EXPENSIVE_CANDIDATES
+                ]
+                candidates[key] = [candidate for candidate in candidates[key] if candidate[0] not in EXPENSIVE_CANDIDATES]
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        if halving:
+            best = _halving_selection(parallel, datasets, candidates, failures, pruned, deadline, effective_n_jobs(n_jobs))
+        else:
+            best = _grid_selection(parallel, datasets, candidates, failures)
+
+        # Leave-one-out evaluation of each candidate with its best parameters
+        loo_keys = [
+            (key, name, estimator) for key in datasets if key not in failures
+            for name, estimator, _ in candidates[key] if (key, name) in best
+        ]
+        evaluated = _cached_loo_candidates(parallel, [
+            (estimator, best[key, name], datasets[key][0], datasets[key][1])
+            for key, name, estimator in loo_keys
+        ])
+
+    per_dataset = {}
+    for (key, name, _), (model, y_pred) in zip(loo_keys, evaluated):
+        per_dataset.setdefault(key, []).append((name, model, y_pred))
+
+    results = {}
+    for key, (X, y, _, _) in datasets.items():
+        if key in failures:
+            results[key] = failures[key]
+            continue
+        try:
+            all_results, all_models, all_predictions = [], {}, {}
+            for name, model, y_pred in per_dataset[key]:
+                if isinstance(y_pred, Exception):
+                    raise y_pred
+                all_models[name] = model
+                all_predictions[name] = y_pred
+                all_results.append(calculate_metrics(y, y_pred, model_name=name))
+            best_model, y_predicted, best_metrics = _select_best_model(all_results, all_models, all_predictions)
+            if halving:
+                best_metrics['Pruned'] = '; '.join(pruned[key])
+            results[key] = (X, y, y_predicted, best_model, best_metrics)
+        except Exception as e:
+            results[key] = e
+    return results
+
+
+def _grid_folds(n_samples: int) -> list:
+    """Grid-search folds (what GridSearchCV uses for cv=min(3, n_samples) on a regressor)."""
+    return list(KFold(n_splits=min(3, n_samples)).split(np.zeros((n_samples, 1))))
+
+
+def cached_grid_search(estimator, param_grid: dict, X, y, folds: list,
+                       scoring: str = 'neg_mean_squared_error', n_jobs: int = None):
+    """
+    GridSearchCV(refit=True) equivalent whose fold scores go through the CV
+    cache, so repeated searches on the same data only fit the missing folds.
+    In halving mode (see set_selection_mode) the grid is pruned by
+    successive halving within the time budget.
+
+    Parameters:
+    -----------
+    estimator : estimator
+        Unfitted estimator
+    param_grid : dict
+        Parameter grid (GridSearchCV param_grid)
+    X, y : array-like or pandas objects
+        Training data
+    folds : list
+        (train_idx, test_idx) of every fold, e.g. list(cv.split(X, y))
+    scoring : str
+        Scorer name
+    n_jobs : int
+        Joblib workers (defaults to get_n_jobs())
+
+    Returns:
+    --------
+    tuple containing:
+        - best_estimator : estimator
+            Clone of estimator with the best parameters, fitted on X, y
+        - pruned : list[str]
+            What halving mode pruned and why (empty in full mode)
+    """
+    grid = list(ParameterGrid(param_grid))
+    mode, time_budget = get_selection_mode()
+    pruned = []
+    with Parallel(n_jobs=get_n_jobs() if n_jobs is None else n_jobs) as parallel:
+        if mode == 'halving':
+            deadline = time.monotonic() + time_budget if time_budget else None
+            result = _successive_halving(parallel, {0: (estimator, grid, X, y, folds, scoring)}, deadline)[0]
+            if isinstance(result['params'], Exception):
+                raise result['params']
+            best_params = result['params']
+            note = _halving_note(type(_final_estimator(estimator)).__name__, len(grid), len(folds), result)
+            if note:
+                pruned.append(note)
+        else:
+            scores = _cached_fold_scores(parallel, _fold_tasks(estimator, grid, X, y, folds, scoring))
+            best_params = _best_params(grid, np.array(scores).reshape(len(grid), len(folds)))
+    return clone(estimator).set_params(**best_params).fit(X, y), pruned
+
+
+def train_multiple_models(df_vp: pd.DataFrame, predictors: list[str], target: str, log_transform: str = 'none', 
+                          apply_outlier_removal: bool = True) -> tuple[np.ndarray, np.ndarray, np.ndarray, Pipeline, dict]:
+    """
+    Train multiple regression models and return the best one based on R² and MAPE.
+    
+    Parameters:
+    -----------
+    df_vp : pd.DataFrame
+        Input dataframe
+    predictors : list[str]
+        List of predictor column names
+    target : str
+        Target column name
+    log_transform : str
+        Type of log transformation: 'none', 'input', 'output', or 'both'
+    apply_outlier_removal : bool
+        Whether to apply outlier removal (default: True)
+    
+    Returns:
+    --------
+    tuple containing:
+        - X : np.ndarray
+            Feature matrix (transformed if log_transform='input' or 'both')
+        - y : np.ndarray
+            Target values (original scale)
+        - y_predicted : np.ndarray
+            Predicted values from best model (original scale)
+        - best_model : Pipeline
+            Best trained model pipeline
+        - metrics : dict
+            Performance metrics for the best model
+    """
+    
+    df_vp = df_vp[df_vp[target] > 0].copy()
+    
+    if apply_outlier_removal:
+        df_clean = remove_outliers(df_vp, target)
+    else:
+        df_clean = df_vp
+    
+    X = df_clean[predictors].values
+    y = df_clean[target].values
+    
+    if log_transform in ['input', 'both']:
+        X = np.log1p(X)
+    
+    result = search_models({log_transform: (X, y, log_transform, _grid_folds(len(y)))})[log_transform]
+    if isinstance(result, Exception):
+        raise result
+    return result
 
 
 def create_scatter_plot_with_regression(df: pd.DataFrame, predictor_name: str, target_name: str, hue_name: str = 'ALCANCE', 
@@ -684,8 +1488,78 @@ def predicted_plot(y: np.array, y_predicted: np.array, df_item_cleaned: pd.DataF
     return fig
 
 
+# Part of every fingerprint: bump it when a change in the training code changes
+# the models trained from the same data, so incremental retrains refit them
+TRAINING_FINGERPRINT_VERSION = 1
+
+
+def data_fingerprint(df: pd.DataFrame, *settings) -> str:
+    """
+    Content hash of training rows and the settings that produce a model from them.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Training rows (values, column names and row order are hashed; the index is not)
+    *settings
+        Anything else the result depends on (predictors, target, search space...),
+        hashed through repr()
+    
+    Returns:
+    --------
+    str
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((TRAINING_FINGERPRINT_VERSION, sklearn.__version__, list(df.columns)) + settings).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:32]
+
+
+def search_space() -> tuple:
+    """Candidates, parameter grids, log transformations and settings of search_models (for fingerprints)."""
+    configs = _model_configs()
+    return (
+        tuple(LOG_TRANSFORMS),
+        tuple((name, repr(config['model']), repr(config['params'])) for name, config in configs.items())
+    ) + training_settings()
+
+
+def _alcance_slices(df_vp: pd.DataFrame, predictors: list[str], target: str, hue_name: str):
+    """(hue_value, rows) of each category with a positive target, before outlier removal."""
+    df = df_vp[df_vp[target] > 0]
+    required_cols = predictors + [target]
+    for hue_value in df[hue_name].unique():
+        df_hue = df[df[hue_name] == hue_value]
+        
+        # Check columns exist
+        if not all(col in df_hue.columns for col in required_cols):
+            continue
+        
+        # Filter valid data
+        yield hue_value, df_hue[required_cols].dropna()
+
+
+def alcance_fingerprints(df_vp: pd.DataFrame, predictors: list[str], target: str,
+                         hue_name: str = 'ALCANCE', min_samples: int = 3) -> dict:
+    """
+    Fingerprint of each category trained by train_models_by_alcance_and_transform:
+    its rows, predictors, target and search space.
+    
+    Returns:
+    --------
+    dict
+        {hue_value: fingerprint}
+    """
+    space = search_space()
+    return {
+        hue_value: data_fingerprint(df_hue, predictors, target, hue_value, min_samples, space)
+        for hue_value, df_hue in _alcance_slices(df_vp, predictors, target, hue_name)
+    }
+
+
 def train_models_by_alcance_and_transform(df_vp: pd.DataFrame, predictors: list[str], target: str, 
-                                       hue_name: str = 'ALCANCE', min_samples: int = 3) -> dict:
+                                       hue_name: str = 'ALCANCE', min_samples: int = 3, reuse: dict = None) -> dict:
     """
     Train models for each hue category, testing all log transformations and returning THE best model.
     
@@ -701,55 +1575,68 @@ def train_models_by_alcance_and_transform(df_vp: pd.DataFrame, predictors: list[
         Column name to group by (default: 'ALCANCE')
     min_samples : int
         Minimum samples required per category (default: 5)
+    reuse : dict
+        {hue_value: result} of categories whose previous result (see
+        split_results_by_alcance) is taken as is instead of training, because
+        their fingerprint did not change
     
     Returns:
     --------
     dict
-        {hue_value: {'X', 'y', 'y_predicted', 'model', 'metrics', 'log_transform', 'n_samples'}}
-        Returns None for categories with insufficient data
+        {hue_value: {'X', 'y', 'y_predicted', 'model', 'metrics', 'log_transform', 'n_samples', 'outliers'}}
+        ('outliers' is the remove_outliers decision, None when the category
+        was too small to filter). Returns None for categories with insufficient data
     """
     results = {}
-    log_transforms = ['none', 'input', 'output', 'both']
-    df = df_vp[df_vp[target] > 0]
+    datasets = {}
+    outliers = {}
+    reuse = reuse or {}
     
-    for hue_value in df[hue_name].unique():
-        df_hue = df[df[hue_name] == hue_value]
-        
-        # Check columns exist
-        required_cols = predictors + [target]
-        if not all(col in df_hue.columns for col in required_cols):
+    for hue_value, df_hue in _alcance_slices(df_vp, predictors, target, hue_name):
+        if hue_value in reuse:
+            results[hue_value] = reuse[hue_value]
             continue
         
-        # Filter valid data
-        df_hue = df_hue[required_cols].dropna()
-        
         if len(df_hue) > 10:
-            df_hue = remove_outliers(df_hue, target)
+            with recording_outliers() as decisions:
+                df_hue = remove_outliers(df_hue, target)
+            outliers[hue_value] = decisions[0] if decisions else None
         
         if len(df_hue) < min_samples:
             results[hue_value] = None
             continue
         
-        best_result = None
+        # The four transformations share the rows, the folds and the log of X
+        X = df_hue[predictors].values
+        y = df_hue[target].values
+        X_log = np.log1p(X)
+        folds = _grid_folds(len(y))
+        for log_transform in LOG_TRANSFORMS:
+            X_transformed = X_log if log_transform in ['input', 'both'] else X
+            datasets[hue_value, log_transform] = (X_transformed, y, log_transform, folds)
+        results[hue_value] = None
+    
+    # Every alcance and transformation of the target in one search
+    searched = search_models(datasets) if datasets else {}
+    
+    for hue_value in results:
+        if hue_value in reuse:
+            continue
         best_score = -float('inf')
-        
-        for log_transform in log_transforms:
-            try:
-                X, y, y_predicted, model, metrics = train_multiple_models(
-                    df_hue, predictors, target, log_transform=log_transform, apply_outlier_removal=False
-                )
-                score = 0.35 * metrics['R²'] - 0.65 * (metrics['MAPE (%)'] / 100)
-                if score > best_score:
-                    best_score = score
-                    best_result = {
-                        'X': X, 'y': y, 'y_predicted': y_predicted, 
-                        'model': model, 'metrics': metrics, 
-                        'log_transform': log_transform, 'n_samples': len(y)
-                    }
-            except Exception as e:
-                pass
-        
-        results[hue_value] = best_result
+        for log_transform in LOG_TRANSFORMS:
+            result = searched.get((hue_value, log_transform))
+            if result is None or isinstance(result, Exception):
+                continue
+            X, y, y_predicted, model, metrics = result
+            score = 0.35 * metrics['R²'] - 0.65 * (metrics['MAPE (%)'] / 100)
+            if score > best_score:
+                best_score = score
+                results[hue_value] = {
+                    'X': X, 'y': y, 'y_predicted': y_predicted, 
+                    'model': model, 'metrics': metrics, 
+                    'log_transform': log_transform, 'n_samples': len(y),
+                    'outliers': outliers.get(hue_value)
+                }
     
     return results
 
@@ -821,7 +1708,8 @@ def consolidate_results_by_alcance(results_target):
         if 'model' in result:
             models_dict[alcance_type] = {
                 'model': result['model'],
-                'log_transform': result.get('log_transform', 'none')
+                'log_transform': result.get('log_transform', 'none'),
+                'outliers': result.get('outliers')
             }
         
         # Create dataframe for this alcance type
@@ -865,3 +1753,42 @@ def consolidate_results_by_alcance(results_target):
     return {'X': consolidated_data[['LONGITUD KM', 'ALCANCE']], 'y': consolidated_data['y'], 'y_predicted': consolidated_data['y_predicted'], 
             'models': models_dict, 'metrics': consolidated_metrics
     }
+
+
+def split_results_by_alcance(consolidated: dict) -> dict:
+    """
+    Inverse of consolidate_results_by_alcance: the result of each alcance
+    with a model, as returned by train_models_by_alcance_and_transform.
+    
+    Parameters:
+    -----------
+    consolidated : dict
+        Consolidated result of a single-predictor target
+    
+    Returns:
+    --------
+    dict
+        {alcance: {'X', 'y', 'y_predicted', 'model', 'metrics', 'log_transform', 'n_samples', 'outliers'}}
+    """
+    X = consolidated['X']
+    alcances = X['ALCANCE'].to_numpy()
+    y = np.asarray(consolidated['y'])
+    y_predicted = np.asarray(consolidated['y_predicted'])
+    metrics = consolidated['metrics']
+    extra_columns = ('ALCANCE', 'log_transform', 'n_samples')
+    
+    results = {}
+    for alcance_type, entry in consolidated['models'].items():
+        mask = alcances == alcance_type
+        row = metrics[metrics['ALCANCE'] == alcance_type].iloc[0]
+        results[alcance_type] = {
+            'X': X.loc[mask, 'LONGITUD KM'].to_numpy().reshape(-1, 1),
+            'y': y[mask],
+            'y_predicted': y_predicted[mask],
+            'model': entry['model'],
+            'metrics': {column: row[column] for column in metrics.columns if column not in extra_columns},
+            'log_transform': entry.get('log_transform', 'none'),
+            'n_samples': int(row['n_samples']),
+            'outliers': entry.get('outliers')
+        }
+    return results
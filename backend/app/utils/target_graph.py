@@ -0,0 +1,284 @@
+"""
+Target graph - declarative description and batch executor of a phase's cost models
+
+Each target of a phase is described as data (TargetSpec): which columns it
+reads (feature columns or predictions of other targets), how each input is
+transformed, and which rows it applies to (gate). TargetGraph orders the
+targets topologically and predicts every target for all the rows of a batch:
+
+- Per-alcance targets share the alcance groups and the transformed input
+  columns, which are computed once per batch.
+- Each model is called once for all the rows of its alcance that pass the gate
+  and have finite inputs; the other rows are NaN.
+- A target whose gate is false for the whole batch is skipped, and so are the
+  targets that depend on it (their inputs are NaN).
+
+Gates are written as strings ("PUENTES VEHICULARES UND > 0") combined as a
+disjunction of conjunctions: ((a, b), (c,)) means (a and b) or c.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.utils.compiled_models import predict_entry
+from app.utils.timing import span
+
+
+ALCANCE_COLUMN = 'ALCANCE'
+
+# Input transforms; 'entry' applies log1p when the model entry was trained with
+# log_transform 'input' or 'both' (per-alcance linear models)
+INPUT_TRANSFORMS = ('none', 'log1p', 'entry')
+
+_OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+_CONDITION = re.compile(r'^\s*(.+?)\s*(>=|<=|==|!=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+@dataclass(frozen=True)
+class TargetInput:
+    """One input column of a target model."""
+    source: str
+    transform: str = 'none'
+    # Column name when the model receives a DataFrame (defaults to source)
+    name: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return self.name or self.source
+
+
+@dataclass(frozen=True)
+class TargetSpec:
+    """
+    How to predict one target.
+
+    Attributes:
+        name: Target (models dictionary key)
+        inputs: Input columns, in the order the model was trained with
+        gate: Rows the target applies to, as ((condition, ...), ...): any group
+            whose conditions all hold (empty: every row)
+        per_alcance: The target has one model per alcance ({'models': {alcance: entry}})
+        as_frame: Pass inputs as a DataFrame with the input labels as columns
+    """
+    name: str
+    inputs: Tuple[TargetInput, ...]
+    gate: Tuple[Tuple[str, ...], ...] = ()
+    per_alcance: bool = False
+    as_frame: bool = False
+
+
+def parse_condition(condition: str) -> Tuple[str, str, float]:
+    """
+    Parse a gate condition such as "PUENTES VEHICULARES UND > 0".
+
+    Returns:
+        Tuple of (column, operator, value)
+
+    Raises:
+        ValueError: If the condition is not '<column> <op> <number>'
+    """
+    match = _CONDITION.match(condition)
+    if not match:
+        raise ValueError(f"Condición inválida: '{condition}'")
+    column, operator, value = match.groups()
+    return column, operator, float(value)
+
+
+class TargetGraph:
+    """
+    Topologically ordered set of TargetSpecs with a vectorized executor.
+    """
+
+    def __init__(self, specs: Iterable[TargetSpec]):
+        """
+        Validate and order the targets.
+
+        Args:
+            specs: Target specs, in output order
+
+        Raises:
+            ValueError: On duplicated targets, unknown transforms, invalid
+                gate conditions or dependency cycles
+        """
+        self.specs: Tuple[TargetSpec, ...] = tuple(specs)
+        self.targets = {spec.name: spec for spec in self.specs}
+        if len(self.targets) != len(self.specs):
+            raise ValueError("Hay targets duplicados en el grafo")
+
+        self._gates: Dict[str, List[List[Tuple[str, Any, float]]]] = {}
+        for spec in self.specs:
+            for target_input in spec.inputs:
+                if target_input.transform not in INPUT_TRANSFORMS:
+                    raise ValueError(f"Transformación desconocida '{target_input.transform}' en '{spec.name}'")
+            self._gates[spec.name] = [
+                [(column, _OPERATORS[operator], value)
+                 for column, operator, value in map(parse_condition, group)]
+                for group in spec.gate
+            ]
+
+        self.order: Tuple[TargetSpec, ...] = self._topological_order()
+
+    def dependencies(self, name: str) -> List[str]:
+        """Targets read by a target (as inputs or in its gate)."""
+        spec = self.targets[name]
+        sources = [target_input.source for target_input in spec.inputs]
+        sources += [column for group in self._gates[name] for column, _, _ in group]
+        return [source for source in dict.fromkeys(sources) if source in self.targets and source != name]
+
+    def _topological_order(self) -> Tuple[TargetSpec, ...]:
+        """Order targets so dependencies come first, keeping declaration order otherwise."""
+        ordered: List[TargetSpec] = []
+        done = set()
+        pending = list(self.specs)
+        while pending:
+            ready = [spec for spec in pending if all(dep in done for dep in self.dependencies(spec.name))]
+            if not ready:
+                names = ', '.join(spec.name for spec in pending)
+                raise ValueError(f"Dependencias circulares entre los targets: {names}")
+            for spec in ready:
+                ordered.append(spec)
+                done.add(spec.name)
+            pending = [spec for spec in pending if spec.name not in done]
+        return tuple(ordered)
+
+    def predict(self, features: pd.DataFrame, models: Dict[str, Any], stage: str = 'graph') -> Dict[str, np.ndarray]:
+        """
+        Predict every target with a model for all the rows of features.
+
+        Args:
+            features: Feature matrix (see build_feature_frame), one row per UF
+            models: Trained models dictionary
+            stage: Prefix of the timing spans
+
+        Returns:
+            Dict target -> predictions array (NaN where the target does not
+            apply), in declaration order. Targets without a model are omitted.
+        """
+        n_rows = len(features)
+        predictions: Dict[str, np.ndarray] = {}
+        batch = _Batch(features, predictions)
+
+        with span(f'{stage}.features'):
+            if any(spec.per_alcance for spec in self.specs):
+                batch.alcance_groups()
+
+        for spec in self.order:
+            if spec.name not in models:
+                continue
+
+            gate = self._gate_mask(spec, batch, n_rows)
+            values = np.full(n_rows, np.nan)
+            available = gate & batch.finite_sources(spec) if gate.any() else gate
+            if available.any():
+                if spec.per_alcance:
+                    self._predict_per_alcance(spec, models[spec.name], batch, available, values)
+                else:
+                    with span(f'model.{spec.name}'):
+                        values[available] = self._evaluate(spec, models[spec.name], batch, available)
+            predictions[spec.name] = values
+
+        return {spec.name: predictions[spec.name] for spec in self.specs if spec.name in predictions}
+
+    def _gate_mask(self, spec: TargetSpec, batch: "_Batch", n_rows: int) -> np.ndarray:
+        groups = self._gates[spec.name]
+        if not groups:
+            return np.ones(n_rows, dtype=bool)
+        mask = np.zeros(n_rows, dtype=bool)
+        for group in groups:
+            group_mask = np.ones(n_rows, dtype=bool)
+            for column, operator, value in group:
+                group_mask &= operator(batch.column(column), value)
+            mask |= group_mask
+        return mask
+
+    def _predict_per_alcance(self, spec: TargetSpec, result: Dict[str, Any], batch: "_Batch",
+                             available: np.ndarray, values: np.ndarray) -> None:
+        alcance_models = result.get('models') or {}
+        for alcance, alcance_mask in batch.alcance_groups():
+            entry = alcance_models.get(alcance)
+            if entry is None:
+                continue
+            rows = available & alcance_mask
+            if rows.any():
+                with span(f'model.{spec.name}.{alcance}'):
+                    values[rows] = self._evaluate(spec, entry, batch, rows)
+
+    @staticmethod
+    def _evaluate(spec: TargetSpec, entry: Dict[str, Any], batch: "_Batch", rows: np.ndarray) -> np.ndarray:
+        """Run one model entry on the selected rows (rows whose transformed inputs are not finite are NaN)."""
+        log_inputs = entry.get('log_transform') in ('input', 'both')
+        columns = []
+        for target_input in spec.inputs:
+            transform = target_input.transform
+            if transform == 'entry':
+                transform = 'log1p' if log_inputs else 'none'
+            columns.append(batch.transformed(target_input.source, transform)[rows])
+
+        X = np.column_stack(columns)
+        values = np.full(len(X), np.nan)
+        finite = np.isfinite(X).all(axis=1)
+        if not finite.all():
+            X = X[finite]
+        if len(X):
+            if spec.as_frame:
+                X = pd.DataFrame(X, columns=[target_input.label for target_input in spec.inputs])
+            # Compiled evaluators (and TransformedTargetRegressor) apply the inverse output transform
+            values[finite] = predict_entry(entry, X)
+        return values
+
+
+class _Batch:
+    """Columns of one prediction batch, each read and transformed once."""
+
+    def __init__(self, features: pd.DataFrame, predictions: Dict[str, np.ndarray]):
+        self.features = features
+        self.predictions = predictions
+        self._columns: Dict[Tuple[str, str], np.ndarray] = {}
+        self._alcance_groups: Optional[List[Tuple[Any, np.ndarray]]] = None
+
+    def column(self, source: str) -> np.ndarray:
+        """A feature column or a target's predictions (NaN if the target has no model)."""
+        if source in self.predictions:
+            return self.predictions[source]
+        key = (source, 'none')
+        if key not in self._columns:
+            if source in self.features.columns:
+                self._columns[key] = self.features[source].to_numpy(dtype=float)
+            else:
+                return np.full(len(self.features), np.nan)
+        return self._columns[key]
+
+    def transformed(self, source: str, transform: str) -> np.ndarray:
+        if transform == 'none':
+            return self.column(source)
+        key = (source, transform)
+        if key not in self._columns:
+            # Sources below -1 have no log: NaN marks the row as unavailable
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self._columns[key] = np.log1p(self.column(source))
+        return self._columns[key]
+
+    def finite_sources(self, spec: TargetSpec) -> np.ndarray:
+        """Rows where every input source of the target is available (not NaN)."""
+        mask = np.ones(len(self.features), dtype=bool)
+        for source in dict.fromkeys(target_input.source for target_input in spec.inputs):
+            mask &= np.isfinite(self.column(source))
+        return mask
+
+    def alcance_groups(self) -> List[Tuple[Any, np.ndarray]]:
+        """(alcance, row mask) per distinct alcance, in order of first appearance."""
+        if self._alcance_groups is None:
+            alcances = self.features[ALCANCE_COLUMN].to_numpy(dtype=object)
+            self._alcance_groups = [(alcance, alcances == alcance) for alcance in pd.unique(alcances)]
+        return self._alcance_groups
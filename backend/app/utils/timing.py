@@ -0,0 +1,201 @@
+"""
+Stage-level timing of the prediction pipeline.
+
+Code marks stages with span(name). When timing is enabled
+(PREDICTION_TIMING_ENABLED), each span is:
+
+- Added to the spans of the current request, returned as a Server-Timing header
+  (repeated stages are summed).
+- Aggregated into process-wide latency histograms, readable from
+  /api/v1/predict/timing.
+
+When disabled, span() returns a shared no-op context manager, so instrumented
+code only pays for one function call per stage.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import Config
+
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is unbounded)
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_NOOP = nullcontext()
+_enabled = Config.PREDICTION_TIMING_ENABLED
+
+# Spans of the current request: stage name -> (total ms, count); None outside a request
+_request_spans: ContextVar[Optional[Dict[str, Tuple[float, int]]]] = ContextVar('timing_spans', default=None)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool) -> None:
+    """Turn timing on or off at runtime."""
+    global _enabled
+    _enabled = enabled
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+def span(name: str):
+    """
+    Time a stage of the pipeline.
+
+    Usage:
+        with span('predict.load_models'):
+            ...
+
+    Args:
+        name: Stage name (dotted, e.g. 'model.1 - TRANSPORTE')
+
+    Returns:
+        Context manager (a shared no-op when timing is disabled)
+    """
+    if not _enabled:
+        return _NOOP
+    return _Span(name)
+
+
+def record(name: str, elapsed_ms: float) -> None:
+    """Add a measured duration to the current request and to the histograms."""
+    spans = _request_spans.get()
+    if spans is not None:
+        total, count = spans.get(name, (0.0, 0))
+        spans[name] = (total + elapsed_ms, count + 1)
+    histograms.observe(name, elapsed_ms)
+
+
+def start_request():
+    """Start collecting the spans of a request. Returns a token for finish_request."""
+    if not _enabled:
+        return None
+    return _request_spans.set({})
+
+
+def finish_request(token) -> Dict[str, Tuple[float, int]]:
+    """Stop collecting and return the request spans (stage -> (total ms, count))."""
+    if token is None:
+        return {}
+    spans = _request_spans.get() or {}
+    _request_spans.reset(token)
+    return spans
+
+
+_TOKEN_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def server_timing_header(spans: Dict[str, Tuple[float, int]]) -> str:
+    """
+    Format request spans as a Server-Timing header value.
+
+    Stage names are reduced to header tokens; the original name goes in desc.
+    """
+    entries = []
+    for name, (total, count) in spans.items():
+        ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+        token = _TOKEN_CHARS.sub('_', ascii_name).strip('_') or 'stage'
+        entry = f'{token};dur={total:.3f}'
+        if token != name or count > 1:
+            desc = name.replace('\\', '').replace('"', "'")
+            if count > 1:
+                desc = f"{desc} x{count}"
+            # Header values must be latin-1
+            desc = desc.encode('latin-1', 'replace').decode('latin-1')
+            entry += f';desc="{desc}"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+class TimingHistograms:
+    """Process-wide latency histograms per stage."""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, elapsed_ms: float) -> None:
+        bucket = len(self.buckets_ms)
+        for i, bound in enumerate(self.buckets_ms):
+            if elapsed_ms <= bound:
+                bucket = i
+                break
+
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(self.buckets_ms) + 1)}
+                self._stages[name] = stage
+            stage['count'] += 1
+            stage['total_ms'] += elapsed_ms
+            stage['max_ms'] = max(stage['max_ms'], elapsed_ms)
+            stage['buckets'][bucket] += 1
+
+    def _percentile(self, buckets: list, count: int, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None if beyond the last bound)."""
+        target = q * count
+        seen = 0
+        for i, n in enumerate(buckets):
+            seen += n
+            if seen >= target:
+                return self.buckets_ms[i] if i < len(self.buckets_ms) else None
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the histograms.
+
+        Returns:
+            {'enabled': bool, 'buckets_ms': [...], 'stages': [{stage, count,
+            total_ms, mean_ms, max_ms, p50_ms, p95_ms, p99_ms, buckets}]}
+            sorted by total time
+        """
+        with self._lock:
+            stages = [
+                dict(stage, stage=name, buckets=list(stage['buckets']))
+                for name, stage in self._stages.items()
+            ]
+
+        for stage in stages:
+            count = stage['count']
+            stage['mean_ms'] = round(stage['total_ms'] / count, 4) if count else 0.0
+            for q in (50, 95, 99):
+                stage[f'p{q}_ms'] = self._percentile(stage['buckets'], count, q / 100)
+            stage['total_ms'] = round(stage['total_ms'], 3)
+            stage['max_ms'] = round(stage['max_ms'], 3)
+
+        return {
+            'enabled': _enabled,
+            'buckets_ms': list(self.buckets_ms),
+            'stages': sorted(stages, key=lambda stage: stage['total_ms'], reverse=True)
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+
+# Shared by every request of the process
+histograms = TimingHistograms()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+Compara la serialización de respuestas grandes con el proveedor JSON por
+defecto de Flask (antes) y con FastJSONProvider (después), y el tamaño y costo
+de comprimirlas.
+
+Los payloads reproducen la forma de las respuestas reales:
+
+- predict:     /predict con 200 UFs de 45 items, con métricas por alcance
+- sweep:       /predict/sweep de 2000 puntos y 45 items
+- geometries:  /proyectos/<codigo>/geometries con 100 UFs de 1500 vértices
+- comparison:  /charts/item-comparison con 3000 puntos
+
+"Antes" incluye las conversiones que exigía el proveedor por defecto
+(tolist() de los arreglos NumPy, json.loads de cada geometría).
+
+Uso:
+    python benchmark_json.py [repeticiones]
+"""
+
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.json_provider import FastJSONProvider
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+NUM_ITEMS = 45
+ALCANCES = ['Segunda calzada', 'Mejoramiento', 'Rehabilitación', 'Puesta a punto', 'Nuevo']
+
+
+def _predict_payload(rng):
+    items = [f"{i} - ÍTEM DE DISEÑO {i}" for i in range(NUM_ITEMS)]
+    resultados = []
+    for numero in range(1, 201):
+        resultados.append({
+            'unidad_funcional': numero,
+            'longitud_km': float(rng.uniform(1, 50)),
+            'alcance': ALCANCES[numero % len(ALCANCES)],
+            'costo_estimado': float(rng.uniform(1e8, 1e10)),
+            'costo_por_km': float(rng.uniform(1e6, 1e8)),
+            'confianza': 0.75,
+            'items': [{
+                'item': nombre,
+                'item_tipo_id': i,
+                'causacion_estimada': round(float(rng.uniform(0, 1e9)), 2),
+                'predicted': True,
+                'is_parent': False,
+                'metrics': [{
+                    'alcance': alcance,
+                    'model': 'Ridge',
+                    'r2': float(rng.uniform()),
+                    'mae': float(rng.uniform(0, 1e6)),
+                    'rmse': float(rng.uniform(0, 1e6)),
+                    'mape': float(rng.uniform(0, 30)),
+                    'n_samples': int(rng.integers(3, 30))
+                } for alcance in ALCANCES[:2]]
+            } for i, nombre in enumerate(items)]
+        })
+    payload = {'proyecto_nombre': 'Benchmark', 'fase_id': 3, 'resultados': resultados}
+    return payload, payload
+
+
+def _sweep_payload(rng):
+    points = 2000
+    costs = [np.round(rng.uniform(0, 1e9, points), 2) for _ in range(NUM_ITEMS)]
+
+    def build(convert):
+        return {
+            'fase_id': 3,
+            'variables': ['longitud_km'],
+            'num_puntos': points,
+            'grid': {'longitud_km': np.linspace(1, 50, points).tolist()},
+            'costo_total': convert(np.sum(costs, axis=0)),
+            'items': [{
+                'item': f"{i} - ÍTEM",
+                'item_tipo_id': i,
+                'is_parent': False,
+                'predicted': True,
+                'causacion_estimada': convert(values)
+            } for i, values in enumerate(costs)]
+        }
+    return build(lambda values: values.tolist()), build(lambda values: values)
+
+
+def _geometries(rng):
+    geometries = []
+    for _ in range(100):
+        coordinates = np.cumsum(rng.normal(0, 1e-4, (1500, 2)), axis=0) + [-74.08, 4.6]
+        geometries.append(json.dumps({'type': 'LineString', 'coordinates': coordinates.tolist()}))
+    return geometries
+
+
+def _geometries_payload(geometries, loads):
+    return {
+        'type': 'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'id': index,
+            'geometry': loads(geometry),
+            'properties': {'id': index, 'numero': index + 1, 'longitud_km': 12.5, 'alcance': 'Nuevo'}
+        } for index, geometry in enumerate(geometries)]
+    }
+
+
+def _comparison_payload(rng):
+    points = [{
+        'codigo': f"P{i:05d}",
+        'nombre_proyecto': f"Proyecto {i}",
+        'alcance': ALCANCES[i % len(ALCANCES)],
+        'longitud_km': float(rng.uniform(1, 50)),
+        'longitud_total_proyecto': float(rng.uniform(10, 200)),
+        'peso_longitud': round(float(rng.uniform()), 4),
+        'costo_total_vp': float(rng.uniform(1e8, 1e10)),
+        'costo_millones': float(rng.uniform(100, 10000))
+    } for i in range(3000)]
+    payload = {'data': points, 'regression': {'slope': 1.5, 'intercept': 3.2, 'r2': 0.8}}
+    return payload, payload
+
+
+def _time(function, repeat):
+    function()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    rng = np.random.default_rng(0)
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    print(f"Backend rápido: {fast.backend}; brotli: {'sí' if brotli else 'no instalado'}; repeticiones: {repeat}\n")
+
+    geometries = _geometries(rng)
+    cases = {
+        'predict': _predict_payload(rng),
+        'sweep': _sweep_payload(rng),
+        'comparison': _comparison_payload(rng),
+    }
+
+    header = f"{'payload':<12}{'tamaño KB':>11}{'antes ms':>10}{'después ms':>12}{'mejora':>8}{'gzip KB':>10}{'gzip ms':>9}"
+    if brotli:
+        header += f"{'br KB':>9}{'br ms':>8}"
+    print(header)
+
+    with app.app_context():
+        rows = []
+        for name, (before_payload, after_payload) in cases.items():
+            rows.append((
+                name,
+                lambda payload=before_payload: default.response(payload).get_data(),
+                lambda payload=after_payload: fast.response(payload).get_data(),
+            ))
+        rows.append((
+            'geometries',
+            lambda: default.response(_geometries_payload(geometries, json.loads)).get_data(),
+            lambda: fast.response(_geometries_payload(geometries, fast.loads)).get_data(),
+        ))
+
+        for name, before, after in rows:
+            before_ms, body = _time(before, repeat)
+            after_ms, fast_body = _time(after, repeat)
+            assert json.loads(body) == json.loads(fast_body), f"{name}: el contenido difiere"
+
+            gzip_ms, compressed = _time(lambda: gzip.compress(fast_body, compresslevel=1), repeat)
+            line = (
+                f"{name:<12}{len(fast_body) / 1024:>11.0f}{before_ms:>10.1f}{after_ms:>12.1f}"
+                f"{before_ms / after_ms:>7.1f}x{len(compressed) / 1024:>10.0f}{gzip_ms:>9.1f}"
+            )
+            if brotli:
+                br_ms, compressed = _time(lambda: brotli.compress(fast_body, quality=4), repeat)
+                line += f"{len(compressed) / 1024:>9.0f}{br_ms:>8.1f}"
+            print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Genera los artefactos de servicio a partir de los pickles de entrenamiento.
+
+El entrenamiento ya escribe ambos artefactos; este script sirve para fases
+entrenadas antes de que existiera el formato de servicio, sin reentrenar.
+
+Uso:
+    python build_serving_artifacts.py              # Todas las fases en data/models
+    python build_serving_artifacts.py III          # Solo la fase III
+"""
+
+import os
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.adapters.model_adapter import LegacyModelAdapter
+from app.adapters.serving_artifact import ServingArtifactError, file_digest, write_serving_artifact
+
+
+MODELS_DIR = Path("data/models")
+
+
+def build(fase: str) -> bool:
+    pickle_path = MODELS_DIR / f"fase_{fase}_models.pkl"
+    data = LegacyModelAdapter._read_pickle(str(pickle_path))
+    if not data:
+        print(f"✗ No se pudo leer {pickle_path}")
+        return False
+
+    try:
+        manifest_path = write_serving_artifact(
+            MODELS_DIR, fase, data['models'], data.get('metadata'), data.get('summary'),
+            file_digest(pickle_path)
+        )
+    except ServingArtifactError as e:
+        print(f"✗ Fase {fase}: {e}")
+        return False
+
+    print(f"✓ Fase {fase}: {manifest_path}")
+    return True
+
+
+def main():
+    if len(sys.argv) > 1:
+        fases = sys.argv[1:]
+    else:
+        fases = sorted(
+            match.group(1)
+            for match in (re.fullmatch(r"fase_(\w+)_models\.pkl", p.name) for p in MODELS_DIR.glob("*.pkl"))
+            if match
+        )
+
+    if not fases:
+        print(f"No hay modelos entrenados en {MODELS_DIR}")
+        return 1
+
+    ok = all([build(fase) for fase in fases])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
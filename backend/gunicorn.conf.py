@@ -0,0 +1,20 @@
+"""
+Configuración de gunicorn.
+
+Uso:
+    gunicorn -c gunicorn.conf.py
+
+preload_app importa wsgi.py (y precarga los modelos) en el proceso maestro
+antes de crear los workers, de modo que todos comparten una sola copia.
+Compare la memoria por worker con: python memory_report.py <pid del maestro>
+"""
+
+import os
+
+wsgi_app = "wsgi:app"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Cargar la app (y los modelos) una vez, antes del fork
+preload_app = True
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Muestra la memoria del proceso maestro de gunicorn y de cada worker.
+
+RSS incluye las páginas compartidas con los demás procesos; PSS las reparte
+entre ellos, así que la suma de PSS es la memoria física real. Con los modelos
+precargados (wsgi.py + preload_app) el RSS por worker se mantiene pero el PSS
+baja, porque la mayor parte es memoria compartida con el maestro.
+
+Uso:
+    python memory_report.py <pid del maestro>
+    python memory_report.py $(cat gunicorn.pid)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.memory import child_pids, process_memory
+
+
+COLUMNS = ('rss_kb', 'pss_kb', 'shared_kb', 'private_kb')
+
+
+def _format_row(label: str, memory: dict) -> str:
+    values = ''.join(
+        f"{memory[key] / 1024:>12.1f}" if memory.get(key) is not None else f"{'-':>12}"
+        for key in COLUMNS
+    )
+    return f"{label:<18}{values}"
+
+
+def main():
+    if len(sys.argv) != 2 or not sys.argv[1].isdigit():
+        print(__doc__)
+        return 1
+
+    master_pid = int(sys.argv[1])
+    master = process_memory(master_pid)
+    if 'rss_kb' not in master:
+        print(f"✗ No se pudo leer la memoria del proceso {master_pid} (¿existe? ¿sistema Linux?)")
+        return 1
+
+    workers = [process_memory(pid) for pid in child_pids(master_pid)]
+
+    print(f"{'Proceso':<18}" + ''.join(f"{name.replace('_kb', ' MiB'):>12}" for name in COLUMNS))
+    print(_format_row(f"maestro {master_pid}", master))
+    for worker in workers:
+        print(_format_row(f"worker {worker['pid']}", worker))
+
+    if workers:
+        total_rss = sum(worker.get('rss_kb', 0) for worker in workers) + master['rss_kb']
+        total_pss = sum(worker.get('pss_kb') or 0 for worker in workers) + (master.get('pss_kb') or 0)
+        print(f"\nSuma RSS: {total_rss / 1024:.1f} MiB  (cuenta varias veces la memoria compartida)")
+        print(f"Suma PSS: {total_pss / 1024:.1f} MiB  (memoria física real)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
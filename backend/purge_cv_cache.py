@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""
+Vacía la caché de validación cruzada del entrenamiento (ver app/utils/cv_cache.py).
+
+La caché se invalida sola cuando cambian los datos, los candidatos o la versión
+de scikit-learn, y su tamaño está acotado por CV_CACHE_MAX_MB; este script sirve
+para liberar el espacio o forzar que todo se recalcule.
+
+Uso:
+    python purge_cv_cache.py              # Archivo de CV_CACHE_DB (instance/cv_cache.db por defecto)
+    python purge_cv_cache.py ruta.db      # Otro archivo de caché
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.cv_cache import CVCache, DEFAULT_DB_PATH
+
+
+def main() -> int:
+    db_path = sys.argv[1] if len(sys.argv) > 1 else os.getenv("CV_CACHE_DB", DEFAULT_DB_PATH)
+    if not os.path.exists(db_path):
+        print(f"No existe la caché {db_path}")
+        return 0
+
+    cache = CVCache(db_path)
+    deleted = cache.purge()
+    print(f"✓ {deleted} resultados eliminados de {db_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+import os
+import sys
+
+# app.config requires these at import time; the tests never use their values
+for name, value in {
+    'SECRET_KEY': 'test-secret',
+    'JWT_SECRET': 'test-jwt-secret',
+    'GESTIONA_API_URL': 'http://localhost',
+    'ALLOWED_CATEGORIES_ID': '1',
+    'ALLOWED_DEPARTMENTS': 'test',
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
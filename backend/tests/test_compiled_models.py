@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import RBF, ConstantKernel as C
+from sklearn.linear_model import BayesianRidge, ElasticNet, LinearRegression, Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVR
+
+from app.services.ml.ml_direction import build_direction_model
+from app.utils.compiled_models import CompiledKernelModel, CompiledLinearModel, compile_model, compile_models
+
+
+def _training_data(n_features=2, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.uniform(1.0, 50.0, size=(30, n_features)),
+                     columns=[f'x{i}' for i in range(n_features)])
+    y = 1000.0 + X.to_numpy() @ rng.uniform(10.0, 100.0, size=n_features) + rng.normal(0.0, 50.0, size=30)
+    return X, y
+
+
+def _new_rows(n_features=2, seed=1):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.uniform(0.5, 80.0, size=(20, n_features)),
+                        columns=[f'x{i}' for i in range(n_features)])
+
+
+LINEAR_MODELS = {
+    'Ridge': lambda: Ridge(alpha=1.0),
+    'Bayesian Ridge': BayesianRidge,
+    'ElasticNet': lambda: ElasticNet(alpha=0.1, l1_ratio=0.5, max_iter=10000),
+    'Linear Regression': LinearRegression,
+}
+
+
+@pytest.mark.parametrize('name', list(LINEAR_MODELS))
+def test_scaled_linear_pipeline_matches_predict(name):
+    X, y = _training_data()
+    model = Pipeline([('scaler', StandardScaler()), ('model', LINEAR_MODELS[name]())]).fit(X, y)
+
+    compiled = compile_model(model)
+
+    assert isinstance(compiled, CompiledLinearModel)
+    X_new = _new_rows()
+    np.testing.assert_allclose(compiled.predict(X_new), model.predict(X_new), rtol=1e-9)
+
+
+@pytest.mark.parametrize('name', list(LINEAR_MODELS))
+@pytest.mark.parametrize('func, inverse_func', [(np.log1p, np.expm1), (np.log, np.exp)])
+def test_log_target_pipeline_matches_predict(name, func, inverse_func):
+    X, y = _training_data()
+    model = TransformedTargetRegressor(
+        regressor=Pipeline([('scaler', StandardScaler()), ('model', LINEAR_MODELS[name]())]),
+        func=func, inverse_func=inverse_func
+    ).fit(X, y)
+
+    compiled = compile_model(model)
+
+    assert isinstance(compiled, CompiledLinearModel)
+    assert compiled.target_transform == func.__name__
+    X_new = _new_rows()
+    np.testing.assert_allclose(compiled.predict(X_new), model.predict(X_new), rtol=1e-9)
+
+
+def test_compile_models_skips_compiled_entries():
+    X, y = _training_data(n_features=1)
+    model = Pipeline([('scaler', StandardScaler()), ('model', Ridge())]).fit(X, y)
+    models = {
+        'target': {'models': {'Nuevo': {'model': model}, 'Mejoramiento': {'model': model}}},
+        'single': {'model': model},
+    }
+
+    assert compile_models(models) == 3
+    first = models['single']['compiled']
+    assert compile_models(models) == 3
+    assert models['single']['compiled'] is first
+    assert compile_models(models, recompile=True) == 3
+    assert models['single']['compiled'] is not first
+
+
+@pytest.mark.parametrize('gamma', ['scale', 'auto', 0.1])
+@pytest.mark.parametrize('log_target', [False, True])
+def test_rbf_svr_pipeline_matches_predict(gamma, log_target):
+    X, y = _training_data()
+    model = Pipeline([('scaler', StandardScaler()), ('model', SVR(kernel='rbf', C=100.0, epsilon=0.1, gamma=gamma))])
+    if log_target:
+        model = TransformedTargetRegressor(regressor=model, func=np.log1p, inverse_func=np.expm1)
+    model.fit(X, y)
+
+    compiled = compile_model(model)
+
+    assert isinstance(compiled, CompiledKernelModel)
+    X_new = _new_rows()
+    np.testing.assert_allclose(compiled.predict(X_new), model.predict(X_new), rtol=1e-7)
+
+
+def test_direction_model_matches_predict():
+    X, y = _training_data()
+    X.columns = ['A', 'B']
+    for column in ['A', 'B']:
+        X[column + ' LOG'] = np.log1p(X[column])
+    model = build_direction_model(['A', 'B'])
+    model.set_params(regressor__svr__C=80, regressor__svr__epsilon=0.01, regressor__svr__gamma=0.1)
+    model.fit(X, y)
+
+    compiled = compile_model(model)
+
+    assert isinstance(compiled, CompiledKernelModel)
+    X_new = _new_rows()
+    X_new.columns = ['A', 'B']
+    for column in ['A', 'B']:
+        X_new[column + ' LOG'] = np.log1p(X_new[column])
+    np.testing.assert_allclose(compiled.predict(X_new), model.predict(X_new), rtol=1e-7)
+
+
+@pytest.mark.filterwarnings('ignore::sklearn.exceptions.ConvergenceWarning')
+@pytest.mark.parametrize('log_target', [False, True])
+def test_gaussian_process_pipeline_matches_predict(log_target):
+    # Noise-free smooth target: the kernel has no noise term
+    X, _ = _training_data()
+    y = 2.0 + np.sin(X['x0'].to_numpy() / 10.0) + 0.02 * X['x1'].to_numpy()
+    gp = GaussianProcessRegressor(kernel=C(1.0, (1e-3, 1e6)) * RBF(1.0, (1e-6, 1e3)),
+                                  random_state=42, n_restarts_optimizer=1)
+    model = Pipeline([('scaler', StandardScaler()), ('model', gp)])
+    if log_target:
+        model = TransformedTargetRegressor(regressor=model, func=np.log1p, inverse_func=np.expm1)
+    model.fit(X, y)
+
+    compiled = compile_model(model)
+
+    assert isinstance(compiled, CompiledKernelModel)
+    X_new = _new_rows()
+    np.testing.assert_allclose(compiled.predict(X_new), model.predict(X_new), rtol=1e-7)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.linear_model import BayesianRidge, LinearRegression, Ridge
+from sklearn.model_selection import LeaveOneOut
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from app.utils.ml_utils import loo_predict
+
+
+def _refit_loo_predict(model, X, y):
+    """Reference: refit the model once per left-out row."""
+    y_pred = np.zeros(len(y))
+    for train_idx, test_idx in LeaveOneOut().split(X):
+        model.fit(X.iloc[train_idx], y.iloc[train_idx])
+        y_pred[test_idx] = model.predict(X.iloc[test_idx])
+    return y_pred
+
+
+def _data(n_features, n_rows=25, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.uniform(1.0, 60.0, size=(n_rows, n_features)),
+                     columns=[f'x{i}' for i in range(n_features)])
+    y = pd.Series(500.0 + X.to_numpy() @ rng.uniform(5.0, 50.0, size=n_features)
+                  + rng.normal(0.0, 40.0, size=n_rows))
+    return X, y
+
+
+def _scaled(model):
+    return Pipeline([('scaler', StandardScaler()), ('model', model)])
+
+
+def _log_target(model):
+    return TransformedTargetRegressor(regressor=model, func=np.log1p, inverse_func=np.expm1)
+
+
+MODELS = {
+    'Ridge': lambda: Ridge(alpha=1.0),
+    'LinearRegression': LinearRegression,
+    'scaled Ridge': lambda: _scaled(Ridge(alpha=10.0)),
+    'scaled LinearRegression': lambda: _scaled(LinearRegression()),
+    'log scaled Ridge': lambda: _log_target(_scaled(Ridge(alpha=0.1))),
+    'log scaled LinearRegression': lambda: _log_target(_scaled(LinearRegression())),
+    # No closed form: loo_predict falls back to the refit loop
+    'scaled BayesianRidge': lambda: _scaled(BayesianRidge()),
+}
+
+
+@pytest.mark.parametrize('name', list(MODELS))
+@pytest.mark.parametrize('n_features', [1, 3])
+def test_loo_predict_matches_refit_loop(name, n_features):
+    X, y = _data(n_features)
+    model = MODELS[name]()
+    reference = clone(model)
+
+    y_pred = loo_predict(model, X, y)
+
+    np.testing.assert_allclose(y_pred, _refit_loo_predict(reference, X, y), rtol=1e-8)
+    # The model is left fitted on the last training fold, as after the loop
+    np.testing.assert_allclose(model.predict(X), reference.predict(X), rtol=1e-8)
+
+
+def test_loo_predict_column_with_one_distinct_row():
+    X, y = _data(2)
+    X['x1'] = 0.0
+    X.loc[3, 'x1'] = 1.0
+    model = _scaled(Ridge(alpha=1.0))
+
+    y_pred = loo_predict(model, X, y)
+
+    np.testing.assert_allclose(y_pred, _refit_loo_predict(clone(model), X, y), rtol=1e-8)
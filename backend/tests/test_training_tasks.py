@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import BaseEstimator
+
+from app.services import models_management as mm
+from app.utils import ml_utils
+from app.utils.cv_cache import cv_cache
+
+
+LONGITUD_TARGET = '5 - TALUDES'
+
+
+@pytest.fixture
+def training_modes():
+    """Fresh CV scores and the cheapest deterministic selection, restored afterwards."""
+    cv_settings = cv_cache.settings()
+    selection_mode = ml_utils.get_selection_mode()
+    outlier_mode = ml_utils.get_outlier_mode()
+    cv_cache.configure(None)
+    ml_utils.set_selection_mode('halving')
+    ml_utils.set_outlier_mode('auto')
+    yield
+    cv_cache.configure(*cv_settings)
+    ml_utils.set_selection_mode(*selection_mode)
+    ml_utils.set_outlier_mode(outlier_mode)
+
+
+def _df_vp(n_rows=24, seed=0):
+    rng = np.random.default_rng(seed)
+    km = rng.uniform(1.0, 80.0, n_rows)
+    bridges = rng.integers(1, 12, n_rows).astype(float)
+    footbridges = rng.integers(1, 6, n_rows).astype(float)
+    noise = lambda: 1.0 + rng.normal(0.0, 0.1, n_rows)
+    return pd.DataFrame({
+        'CÓDIGO': [f'{i:07d}' for i in range(n_rows)],
+        'NOMBRE DEL PROYECTO': [f'Proyecto {i}' for i in range(n_rows)],
+        'ZONA': 'Andina',
+        'TIPO TERRENO': 'Montañoso',
+        # A single alcance keeps the per-alcance search to one slice
+        'ALCANCE': 'Nuevo',
+        'LONGITUD KM': km,
+        'PUENTES VEHICULARES UND': bridges,
+        'PUENTES VEHICULARES M2': bridges * rng.uniform(200.0, 900.0, n_rows),
+        'PUENTES PEATONALES UND': footbridges,
+        'TUNELES KM': 0.0,
+        LONGITUD_TARGET: 2e4 * km * noise(),
+        '10 - URBANISMO Y PAISAJISMO': 3e5 * footbridges * noise(),
+        '13 - CANTIDADES': (1e5 * bridges + 5e4 * footbridges) * noise(),
+    })
+
+
+def _assert_same(a, b, path='result'):
+    if isinstance(a, dict):
+        assert list(a) == list(b), path
+        for key in a:
+            _assert_same(a[key], b[key], f'{path}[{key!r}]')
+    elif isinstance(a, pd.DataFrame):
+        pd.testing.assert_frame_equal(a, b, check_exact=True, obj=path)
+    elif isinstance(a, pd.Series):
+        pd.testing.assert_series_equal(a, b, check_exact=True, obj=path)
+    elif isinstance(a, np.ndarray):
+        np.testing.assert_array_equal(a, b, err_msg=path)
+    elif isinstance(a, BaseEstimator):
+        assert type(a) is type(b) and repr(a) == repr(b), path
+    else:
+        assert a == b, path
+
+
+def test_parallel_training_matches_sequential(training_modes):
+    df_vp = _df_vp()
+    trainers = {
+        LONGITUD_TARGET: mm._train_longitud_target,
+        '10 - URBANISMO Y PAISAJISMO': mm._train_paisajismo_target,
+        '13 - CANTIDADES': mm._train_cantidades_target,
+    }
+
+    sequential = mm.run_training_tasks(df_vp, trainers, cpu_budget=1)
+    parallel = mm.run_training_tasks(df_vp, trainers, cpu_budget=2)
+
+    assert list(parallel) == list(trainers)
+    _assert_same(sequential, parallel)
+    # Same fitted models, not only the same hyperparameters
+    X = df_vp[['LONGITUD KM']]
+    np.testing.assert_array_equal(sequential[LONGITUD_TARGET]['models']['Nuevo']['model'].predict(X),
+                                  parallel[LONGITUD_TARGET]['models']['Nuevo']['model'].predict(X))
+    for target in ['10 - URBANISMO Y PAISAJISMO', '13 - CANTIDADES']:
+        X = sequential[target]['X']
+        np.testing.assert_array_equal(sequential[target]['model'].predict(X), parallel[target]['model'].predict(X))
@@ -1,3 +1,13 @@
+"""
+Punto de entrada WSGI para producción.
+
+Carga los modelos de todas las fases al crear la app. Con gunicorn y
+preload_app (ver gunicorn.conf.py) la carga ocurre una sola vez en el proceso
+maestro y los workers comparten esa memoria en lugar de cargar cada uno su copia:
+
+    gunicorn -c gunicorn.conf.py
+"""
+
 from app import create_app
 
-app = create_app()
+app = create_app(preload_models=True)